@@ -0,0 +1,360 @@
+"""Opt-in archive of each dictation's audio, and replay of archived sessions.
+
+    python archive.py list
+    python archive.py replay SESSION [--speed X] [--from S] [--to S] [--engine E]
+
+Sessions are stored in ARCHIVE_DIR as .dha files: a header, then the 16 kHz
+mono PCM16 audio in chunks (one per capture buffer, each framed with its
+first sample number), then an index of chunk positions and a trailer written
+when the session ends. The index makes seeking to a time one binary search;
+a file cut short by a crash has no index and is scanned instead. SESSION is
+a file name, a path, or "last". Archived sessions can also be re-transcribed
+in bulk with batch.py.
+"""
+import argparse
+import bisect
+import collections
+import os
+import struct
+import sys
+import threading
+import time
+
+import config
+from audio import CHANNELS, SAMPLE_RATE, SAMPLE_WIDTH, AudioCapture, PcmDevice
+
+ARCHIVE_DIR = os.path.join(config.CONFIG_DIR, "archive")
+ARCHIVE_EXTENSION = ".dha"
+FLUSH_INTERVAL = 1.0  # s between batched writes while a session is recording
+MAX_BYTES = 500 * 1024 * 1024
+MAX_AGE_DAYS = 30
+
+_HEADER = struct.Struct("<8sIHHd")  # magic, sample rate, channels, sample width, started (time.time())
+_HEADER_MAGIC = b"DHAUDIO1"
+_CHUNK = struct.Struct("<4sIQd")  # tag, PCM bytes, first sample, captured at (time.monotonic())
+_CHUNK_TAG = b"PCM "
+_INDEX_ENTRY = struct.Struct("<QQ")  # first sample, file offset of the chunk
+_TRAILER = struct.Struct("<4sQQ")  # tag, index offset, chunks
+_TRAILER_TAG = b"INDX"
+
+
+class ArchiveRecording:
+    """One session being archived.
+
+    `write` and `close` are called from the capture thread and only queue work;
+    the archive's writer thread does all file I/O.
+    """
+
+    def __init__(self, path: str, started: float, wake: threading.Event):
+        self.path = path
+        self.started = started
+        self._wake = wake
+        self._pending: collections.deque = collections.deque()
+        self._closed = False
+        self._file = None
+        self._pos = 0
+        self._samples = 0
+        self._index: list[bytes] = []
+        self.batches = 0  # writes made
+
+    def write(self, pcm, captured_at: float):
+        self._pending.append((bytes(pcm), captured_at))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def _flush(self) -> bool:
+        """Writer thread: write what has been queued as one batch; True once the session is finished."""
+        closed = self._closed  # read first: anything queued before the close is in the batch below
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        if batch and self._file is None:
+            self._file = open(self.path, "wb")
+            self._file.write(_HEADER.pack(_HEADER_MAGIC, SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH, self.started))
+            self._pos = _HEADER.size
+        parts = []
+        for pcm, captured_at in batch:
+            self._index.append(_INDEX_ENTRY.pack(self._samples, self._pos))
+            parts += (_CHUNK.pack(_CHUNK_TAG, len(pcm), self._samples, captured_at), pcm)
+            self._pos += _CHUNK.size + len(pcm)
+            self._samples += len(pcm) // (SAMPLE_WIDTH * CHANNELS)
+        if parts:
+            self._file.write(b"".join(parts))
+            self._file.flush()
+            self.batches += 1
+        if not closed:
+            return False
+        if self._file is not None:
+            self._file.write(b"".join(self._index) + _TRAILER.pack(_TRAILER_TAG, self._pos, len(self._index)))
+            self._file.close()
+        return True
+
+
+class AudioArchive:
+    """Writes sessions to `path` on a background thread and keeps the folder within limits.
+
+    While a session records, the writer wakes every `flush_interval` seconds and
+    writes everything captured since in one go; when none does, it sleeps until
+    the next one starts. After each session, the oldest files are deleted while
+    the folder holds more than `max_bytes`, and files older than `max_age_days`.
+    """
+
+    def __init__(self, path: str = ARCHIVE_DIR, max_bytes: int = MAX_BYTES, max_age_days: float = MAX_AGE_DAYS,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self._path = path
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._flush_interval = flush_interval
+        self._recordings: list[ArchiveRecording] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        os.makedirs(path, exist_ok=True)
+
+    def open_session(self, started: float | None = None) -> ArchiveRecording:
+        """A recording to pass to AudioCapture.start(archive=...)."""
+        started = time.time() if started is None else started
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + f"-{int(started * 1000) % 1000:03d}"
+        recording = ArchiveRecording(os.path.join(self._path, name + ARCHIVE_EXTENSION), started, self._wake)
+        with self._lock:
+            self._recordings.append(recording)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audio-archive", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return recording
+
+    def _run(self):
+        busy = False
+        while True:
+            self._wake.wait(self._flush_interval if busy else None)
+            self._wake.clear()
+            with self._lock:
+                recordings = list(self._recordings)
+            finished = []
+            for recording in recordings:
+                try:
+                    done = recording._flush()
+                except OSError:
+                    done = recording._closed  # disk full or the like: give up on this session's file
+                if done:
+                    finished.append(recording)
+            if finished:
+                with self._lock:
+                    for recording in finished:
+                        self._recordings.remove(recording)
+                self.enforce_retention()
+            busy = len(recordings) > len(finished)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every closed session is on disk; True unless `timeout` ran out."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not any(r._closed for r in self._recordings):
+                    return True
+            self._wake.set()
+            time.sleep(0.01)
+        return False
+
+    def enforce_retention(self):
+        """Delete the oldest finished sessions beyond the size and age limits."""
+        with self._lock:
+            open_paths = {r.path for r in self._recordings}
+        files = []
+        for path in list_sessions(self._path):
+            if path not in open_paths:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, st.st_size, st.st_mtime))
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - self.max_age_days * 86400
+        for path, size, mtime in files:  # oldest first
+            if total <= self.max_bytes and mtime >= cutoff:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def list_sessions(path: str = ARCHIVE_DIR) -> list[str]:
+    """Archived session files, oldest first."""
+    try:
+        names = sorted(n for n in os.listdir(path) if n.endswith(ARCHIVE_EXTENSION))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(path, n) for n in names]
+
+
+class ArchivedSession:
+    """Reads an archived session, seeking by time through its chunk index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Not an archived session: {path}")
+        magic, self.sample_rate, channels, width, self.started = _HEADER.unpack(header)
+        if magic != _HEADER_MAGIC or (channels, width) != (CHANNELS, SAMPLE_WIDTH):
+            raise ValueError(f"Not an archived session: {path}")
+        self._starts: list[int] = []  # first sample of each chunk
+        self._offsets: list[int] = []  # file offset of each chunk header
+        if not self._read_index():
+            self._scan()  # not closed properly (e.g. a crash): rebuild the index from the chunk headers
+        self.samples = 0
+        if self._offsets:
+            self._file.seek(self._offsets[-1])
+            _, size, first, _ = _CHUNK.unpack(self._file.read(_CHUNK.size))
+            self.samples = first + size // (SAMPLE_WIDTH * CHANNELS)
+
+    def _read_index(self) -> bool:
+        size = self._file.seek(0, os.SEEK_END)
+        if size < _HEADER.size + _TRAILER.size:
+            return False
+        self._file.seek(size - _TRAILER.size)
+        tag, index_at, count = _TRAILER.unpack(self._file.read(_TRAILER.size))
+        if tag != _TRAILER_TAG or index_at + count * _INDEX_ENTRY.size + _TRAILER.size != size:
+            return False
+        self._file.seek(index_at)
+        for first, offset in _INDEX_ENTRY.iter_unpack(self._file.read(count * _INDEX_ENTRY.size)):
+            self._starts.append(first)
+            self._offsets.append(offset)
+        return True
+
+    def _scan(self):
+        size = self._file.seek(0, os.SEEK_END)
+        pos, sample = _HEADER.size, 0
+        while pos + _CHUNK.size <= size:
+            self._file.seek(pos)
+            tag, pcm_size, first, _ = _CHUNK.unpack(self._file.read(_CHUNK.size))
+            if tag != _CHUNK_TAG or first != sample or pos + _CHUNK.size + pcm_size > size:
+                break  # torn write at the end
+            self._starts.append(first)
+            self._offsets.append(pos)
+            pos += _CHUNK.size + pcm_size
+            sample += pcm_size // (SAMPLE_WIDTH * CHANNELS)
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    def read(self, start: float = 0.0, end: float | None = None) -> bytes:
+        """The PCM16 audio from `start` to `end` seconds (the end of the session if None)."""
+        first = max(0, int(start * self.sample_rate))
+        last = self.samples if end is None else min(self.samples, int(end * self.sample_rate))
+        parts = []
+        i = bisect.bisect_right(self._starts, first) - 1
+        while first < last and i < len(self._offsets) and self._starts[i] < last:
+            self._file.seek(self._offsets[i])
+            _, size, chunk_first, _ = _CHUNK.unpack(self._file.read(_CHUNK.size))
+            pcm = self._file.read(size)
+            lo = max(first - chunk_first, 0) * SAMPLE_WIDTH
+            hi = min(last - chunk_first, size // SAMPLE_WIDTH) * SAMPLE_WIDTH
+            parts.append(pcm[lo:hi])
+            i += 1
+        return b"".join(parts)
+
+    def close(self):
+        self._file.close()
+
+
+def replay(path: str, worker, api_key: str, speed: float = 1.0, start: float = 0.0, end: float | None = None,
+           on_text=None, timeout: float = 60.0):
+    """Feed an archived session through AudioCapture and `worker` (a TranscriptionWorker), as if dictated.
+
+    Audio is played at `speed` times real time; returns the session's
+    SessionTrace once the worker has finished.
+    """
+    from PySide6.QtCore import Qt
+
+    from diagnostics import SessionTrace
+
+    session = ArchivedSession(path)
+    pcm = session.read(start, end)
+    session.close()
+    done = threading.Event()
+    trace = SessionTrace()
+    if on_text is not None:
+        worker.text_delta.connect(on_text, Qt.ConnectionType.DirectConnection)
+    worker.finished.connect(done.set, Qt.ConnectionType.DirectConnection)
+    capture = AudioCapture(device_factory=lambda: PcmDevice(pcm, speed), dc_block=False)
+    try:
+        capture.start()
+        trace.mark("device_start", capture.started_at)
+        worker.start(api_key, capture.queue, trace)
+        capture.device.finished.wait()
+        capture.stop()  # closes the ring: the stream ends and the session drains
+        if not done.wait(timeout):
+            worker.stop()
+            done.wait(5)
+    finally:
+        worker.finished.disconnect(done.set)
+        if on_text is not None:
+            worker.text_delta.disconnect(on_text)
+    trace.mark("end")
+    return trace
+
+
+def _resolve(name: str) -> str:
+    if name == "last":
+        sessions = list_sessions()
+        if not sessions:
+            raise FileNotFoundError(f"no archived sessions in {ARCHIVE_DIR}")
+        return sessions[-1]
+    if os.path.exists(name):
+        return name
+    return os.path.join(ARCHIVE_DIR, name if name.endswith(ARCHIVE_EXTENSION) else name + ARCHIVE_EXTENSION)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="List or replay archived dictation audio.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list archived sessions")
+    play = commands.add_parser("replay", help="transcribe an archived session again")
+    play.add_argument("session", help='file name, path, or "last"')
+    play.add_argument("--speed", type=float, default=1.0, help="playback speed vs real time")
+    play.add_argument("--from", dest="start", type=float, default=0.0, help="start at this many seconds")
+    play.add_argument("--to", dest="end", type=float, help="stop at this many seconds")
+    play.add_argument("--engine", choices=("mistral", "local", "auto"), help="default: as configured")
+    play.add_argument("--model", help="local model path (default: as configured)")
+    play.add_argument("--api-key", default=os.environ.get("MISTRAL_API_KEY"))
+    play.add_argument("--base-url", help="realtime endpoint, e.g. a local fake server")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path in list_sessions():
+            session = ArchivedSession(path)
+            print(f"{os.path.basename(path)}  {session.duration:7.1f} s  {os.path.getsize(path) / 1024:8.0f} KiB")
+            session.close()
+        return 0
+
+    import realtime
+    from transcription import TranscriptionWorker
+
+    cfg = config.load()
+    api_key = args.api_key or cfg.get("api_key")
+    engine = args.engine or cfg.get("engine", "mistral")
+    if engine != "local" and not api_key:
+        parser.error("no API key: pass --api-key, set MISTRAL_API_KEY or configure the app")
+    if args.base_url:
+        realtime.BASE_URL = args.base_url
+    worker = TranscriptionWorker()
+    worker.set_engine(engine, args.model or cfg.get("local_model_path", ""), int(cfg.get("fallback_connect_ms", 1500)))
+    path = _resolve(args.session)
+    trace = replay(path, worker, api_key, args.speed, args.start, args.end,
+                   on_text=lambda text: print(text, end="", flush=True))
+    record = trace.record()
+    print(f"\n\n{os.path.basename(path)}: first text {record['stages_ms'].get('first_text', '—')} ms, "
+          f"lag p50 {record['lag_p50_ms']} ms, p95 {record['lag_p95_ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,51 +1,678 @@
-import base64
+import asyncio
+import collections
 import queue
+import tempfile
+import threading
+import time
+import wave
 
 import miniaudio
+import numpy as np
+
+from dsp import FrontEnd, level_db
 
 SAMPLE_RATE = 16_000
 CHANNELS = 1
 BUFFERSIZE_MSEC = 100
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+CHUNK_BYTES = SAMPLE_RATE * BUFFERSIZE_MSEC // 1000 * CHANNELS * SAMPLE_WIDTH
+RING_SLOTS = 200
+PREROLL_MAX_MSEC = 2000
+STOP_AT_GRACE = 0.5  # s to wait for the buffer covering a `stop(at=...)` before cutting anyway
+OVERFLOW_POLICIES = ("spill", "drop-oldest", "drop-newest", "pause")
+SPILL_MAX_BYTES = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH * 600  # 10 minutes of audio on disk
+SPILL_MEMORY_CHUNKS = 50  # spilled chunks held in memory until the spill thread writes them out
+SPILL_THREAD_LINGER = 5.0  # s the spill thread waits for more before ending
 
 
-class AudioCapture:
-    """Captures microphone audio and puts base64-encoded PCM16 chunks into a queue."""
+class PcmRingBuffer:
+    """Preallocated ring of raw PCM16 chunks shared by the capture callback and the consumer.
 
-    def __init__(self):
-        self._queue: queue.Queue = queue.Queue(maxsize=200)
-        self._device: miniaudio.CaptureDevice | None = None
+    The capture side copies each buffer into a fixed slot once; the consumer gets
+    memoryview slices of those slots, so no further copies are made. A slice stays
+    valid until the next `get_nowait` call, which hands its slot back to the writer.
+    Mirrors the `queue.Queue` non-blocking API (`queue.Full` / `queue.Empty`); an asyncio
+    consumer can instead `await get()`, which the writer wakes via `call_soon_threadsafe`.
 
-    @property
-    def queue(self) -> queue.Queue:
-        return self._queue
+    `overflow` decides what a full ring (`slots` unread chunks) does with more
+    audio; None raises `queue.Full` so the writer can wait. The policies
+    (OVERFLOW_POLICIES) never raise: "drop-newest" discards the incoming chunk,
+    "drop-oldest" the oldest unread one (chunks are then copied out on read, so no
+    slot is ever held by the reader), "spill" keeps the chunks that don't fit in
+    a backlog read back in capture order (up to SPILL_MAX_BYTES, then it drops
+    the newest), and "pause" discards everything until the reader has caught up
+    to half the ring, so the transcript has one gap instead of many. Losses and
+    spills are counted in `stats()`; `on_loss(True / False)` is called when audio
+    starts being lost and once the ring has recovered.
 
-    def _recorder(self):
-        """Generator callback that receives captured audio bytes."""
-        _ = yield
+    The writer never touches the disk: spilled chunks are queued in memory (up
+    to SPILL_MEMORY_CHUNKS) and a spill thread moves them to a temporary file,
+    which the reader reads back. New audio goes into the ring again as soon as
+    it has room; every chunk carries a sequence number, so the reader still
+    returns ring and backlog chunks in capture order.
+    """
+
+    def __init__(
+        self,
+        slots: int = RING_SLOTS,
+        slot_bytes: int = CHUNK_BYTES,
+        overflow: str | None = None,
+        on_loss: callable = None,
+    ):
+        if overflow is not None and overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._capacity = slots  # unread chunks the ring holds
+        self._slots = slots + 1  # plus the one lent to the consumer
+        self._slot_bytes = slot_bytes
+        self._buf = bytearray(self._slots * slot_bytes)
+        self._view = memoryview(self._buf)
+        self._lengths = [0] * self._slots
+        self._stamps = [0.0] * self._slots  # time.monotonic() each slot was written
+        self._seqs = [0] * self._slots  # position of each slot's chunk in the stream
+        self._seq = 0
+        self.last_captured_at: float | None = None  # capture time of the chunk last handed out
+        self._head = 0  # next slot to write
+        self._tail = 0  # next slot to read
+        self._count = 0  # filled slots, including one lent to the consumer
+        self._lent = False
+        self._closed = False
+        self._lock = threading.Lock()
+        # Set while an asyncio consumer is parked in get(); cleared by whoever wakes it.
+        self._waiter_loop: asyncio.AbstractEventLoop | None = None
+        self._ready: asyncio.Event | None = None
+        self._overflow = overflow
+        self._on_loss = on_loss
+        self._out = bytearray(slot_bytes)  # chunks read from the spill file or copied out for drop-oldest
+        # Spill backlog, oldest first: on disk, then still in memory. Only the spill
+        # thread writes the file and moves chunks from _pending to _spilled.
+        self._spilled: collections.deque[tuple[int, int, int, float]] = collections.deque()  # (seq, offset, length, stamp)
+        self._pending: collections.deque[tuple[int, bytes, float]] = collections.deque()  # (seq, data, stamp)
+        self._backlog_bytes = 0
+        self._spill = None  # temporary file, opened by the spill thread
+        self._spill_end = 0
+        # Written in a circle: the backlog never exceeds SPILL_MAX_BYTES, plus one chunk being
+        # read and one left unused where the writer wrapped around.
+        self._spill_size = SPILL_MAX_BYTES + 2 * slot_bytes
+        self._spill_lock = threading.Lock()  # the file position; spill thread and reader only
+        self._spill_reads = 0  # chunks the reader has taken off _spilled but not read yet
+        self._spiller: threading.Thread | None = None
+        self._spill_wake = threading.Event()
+        self._spill_idle = threading.Event()  # set while nothing waits in memory to be spilled
+        self._spill_idle.set()
+        self._losing = False  # audio lost since the ring last had room to spare
+        self._queued_bytes = 0  # unread audio, in the ring and the backlog
+        self.dropped_bytes = 0
+        self.spilled_bytes = 0
+        self.max_depth_bytes = 0
+
+    def qsize(self) -> int:
+        with self._lock:
+            return self._count - (1 if self._lent else 0) + len(self._spilled) + len(self._pending)
+
+    def buffered_bytes(self) -> int:
+        """Total PCM bytes waiting to be read."""
+        with self._lock:
+            return self._queued_bytes
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def stats(self) -> dict:
+        """Audio lost, spilled out of the ring and the deepest backlog so far, in ms."""
+        ms = 1000 / (SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH)
+        return {
+            "overflow": self._overflow,
+            "dropped_ms": round(self.dropped_bytes * ms),
+            "spilled_ms": round(self.spilled_bytes * ms),
+            "max_depth_ms": round(self.max_depth_bytes * ms),
+        }
+
+    def put_nowait(self, data, captured_at: float | None = None):
+        """Copy `data` into the ring, splitting it across slots if it is larger than one.
+
+        `captured_at` (time.monotonic()) defaults to now.
+        """
+        src = memoryview(data).cast("B")
+        now = time.monotonic() if captured_at is None else captured_at
+        offset = 0
+        while offset < len(src):
+            size = min(self._slot_bytes, len(src) - offset)
+            piece = src[offset:offset + size]
+            offset += size
+            with self._lock:
+                losing, spilled = self._losing, self.spilled_bytes
+                slot = self._reserve(piece, now)
+                losing = self._losing and not losing
+                spilled = self.spilled_bytes != spilled
+                start_spiller = spilled and self._spiller is None
+                if start_spiller:
+                    self._spiller = threading.Thread(target=self._spill_run, name="capture-spill", daemon=True)
+            if losing and self._on_loss is not None:
+                self._on_loss(True)
+            if spilled:
+                self._spill_wake.set()
+                if start_spiller:
+                    self._spiller.start()
+            if slot is None:
+                continue  # dropped or spilled
+            # The slot is invisible to the reader until _count is bumped below.
+            start = slot * self._slot_bytes
+            self._view[start:start + size] = piece
+            with self._lock:
+                self._lengths[slot] = size
+                self._stamps[slot] = now
+                self._head = (slot + 1) % self._slots
+                self._count += 1
+                self._queued_bytes += size
+                self.max_depth_bytes = max(self.max_depth_bytes, self._queued_bytes)
+                loop, self._waiter_loop = self._waiter_loop, None
+            if loop is not None:
+                loop.call_soon_threadsafe(self._ready.set)
+
+    def _reserve(self, piece: memoryview, stamp: float) -> int | None:
+        """Under the lock: the slot to write `piece` into, or None if the overflow policy took it."""
+        if self._overflow == "pause" and self._losing:
+            self._drop(len(piece))
+            return None
+        self._seq += 1
+        if self._count - (1 if self._lent else 0) < self._capacity:
+            self._seqs[self._head] = self._seq
+            return self._head
+        if self._overflow is None:
+            self._seq -= 1
+            raise queue.Full
+        if self._overflow == "drop-oldest":
+            self._drop(self._lengths[self._tail])  # never lent in this mode
+            self._queued_bytes -= self._lengths[self._tail]
+            self._tail = (self._tail + 1) % self._slots
+            self._count -= 1
+            self._seqs[self._head] = self._seq
+            return self._head
+        if (self._overflow == "spill" and len(self._pending) < SPILL_MEMORY_CHUNKS
+                and self._backlog_bytes + len(piece) <= SPILL_MAX_BYTES):
+            self._pending.append((self._seq, bytes(piece), stamp))
+            self._spill_idle.clear()
+            self._backlog_bytes += len(piece)
+            self.spilled_bytes += len(piece)
+            self._queued_bytes += len(piece)
+            self.max_depth_bytes = max(self.max_depth_bytes, self._queued_bytes)
+            loop, self._waiter_loop = self._waiter_loop, None
+            if loop is not None:
+                loop.call_soon_threadsafe(self._ready.set)
+        else:
+            self._drop(len(piece))
+        return None
+
+    def _drop(self, size: int):
+        self.dropped_bytes += size
+        self._losing = True
+
+    def _spill_run(self):
+        """Spill thread: write chunks waiting in memory to the file, oldest first."""
+        while True:
+            self._spill_wake.clear()
+            with self._lock:
+                item = self._pending[0] if self._pending else None
+                if item is None:
+                    self._spill_idle.set()
+                    rewind = not self._spilled and not self._spill_reads and self._spill_end > 0
+                    if self._closed:
+                        self._spiller = None
+                        return
+            if item is None:
+                if rewind:
+                    with self._spill_lock:
+                        self._spill_end = 0  # drained: reuse the file from the start
+                        self._spill.truncate(0)
+                if not self._spill_wake.wait(SPILL_THREAD_LINGER):
+                    with self._lock:
+                        if not self._pending:
+                            self._spiller = None
+                            return
+                continue
+            seq, data, stamp = item
+            with self._spill_lock:
+                if self._spill is None:
+                    self._spill = tempfile.TemporaryFile(prefix="dictation_spill_")
+                offset = self._spill_end if self._spill_end + len(data) <= self._spill_size else 0
+                self._spill.seek(offset)
+                self._spill.write(data)
+                self._spill_end = offset + len(data)
+            with self._lock:
+                if self._pending and self._pending[0] is item:  # else the reader took it meanwhile
+                    self._pending.popleft()
+                    self._spilled.append((seq, offset, len(data), stamp))
+
+    def wait_spilled(self, timeout: float | None = None) -> bool:
+        """Wait until no spilled audio is waiting in memory (it's on disk or read); False on timeout."""
+        return self._spill_idle.wait(timeout)
+
+    def close(self):
+        """Mark the end of the stream; a parked `get()` returns None once drained."""
+        with self._lock:
+            self._closed = True
+            loop, self._waiter_loop = self._waiter_loop, None
+        self._spill_wake.set()
+        if loop is not None:
+            loop.call_soon_threadsafe(self._ready.set)
+
+    def get_nowait(self) -> memoryview:
+        """Return the oldest chunk as a view into the ring, releasing the previous one."""
+        from_disk = None
+        with self._lock:
+            if self._lent:
+                self._tail = (self._tail + 1) % self._slots
+                self._count -= 1
+                self._lent = False
+            backlog = bool(self._spilled or self._pending)
+            recovered = self._losing and self._count <= self._capacity // 2 and not backlog
+            if recovered:
+                self._losing = False
+            backlog_seq = self._spilled[0][0] if self._spilled else self._pending[0][0] if self._pending else None
+            if backlog_seq is not None and (self._count == 0 or backlog_seq < self._seqs[self._tail]):
+                if self._spilled:
+                    _, offset, length, self.last_captured_at = from_disk = self._spilled.popleft()
+                    self._spill_reads += 1
+                    chunk = memoryview(self._out)[:length]
+                else:
+                    _, data, self.last_captured_at = self._pending.popleft()
+                    length = len(data)
+                    chunk = memoryview(data)
+                    if not self._pending:
+                        self._spill_idle.set()
+                self._backlog_bytes -= length
+                self._queued_bytes -= length
+            elif self._count == 0:
+                chunk = None
+            else:
+                slot = self._tail
+                length = self._lengths[slot]
+                self.last_captured_at = self._stamps[slot]
+                start = slot * self._slot_bytes
+                chunk = self._view[start:start + length]
+                if self._overflow == "drop-oldest":
+                    self._out[:length] = chunk
+                    chunk = memoryview(self._out)[:length]
+                    self._tail = (slot + 1) % self._slots
+                    self._count -= 1
+                else:
+                    self._lent = True
+                self._queued_bytes -= length
+        if from_disk is not None:
+            with self._spill_lock:
+                self._spill.seek(from_disk[1])
+                self._spill.readinto(chunk)
+            with self._lock:
+                self._spill_reads -= 1
+        if recovered and self._on_loss is not None:
+            self._on_loss(False)
+        if chunk is None:
+            raise queue.Empty
+        return chunk
+
+    async def get(self) -> memoryview | None:
+        """Wait for the next chunk without polling; returns None after `close()`."""
         while True:
-            data = yield
-            b64 = base64.b64encode(data).decode("ascii")
             try:
-                self._queue.put_nowait(b64)
+                return self.get_nowait()
+            except queue.Empty:
+                pass
+            if self._ready is None:
+                self._ready = asyncio.Event()
+            self._ready.clear()
+            with self._lock:
+                # Re-check under the lock so a chunk written since get_nowait isn't missed.
+                if self._count > (1 if self._lent else 0) or self._spilled or self._pending:
+                    continue
+                if self._closed:
+                    return None
+                self._waiter_loop = asyncio.get_running_loop()
+            await self._ready.wait()
+
+
+class PrerollBuffer:
+    """Fixed-size circular buffer holding the most recent `msec` of PCM16 audio.
+
+    The backing store is allocated once, so an always-open mic costs exactly
+    `capacity` bytes however long it runs. Not thread-safe; AudioCapture guards it.
+    """
+
+    def __init__(self, msec: int):
+        msec = min(msec, PREROLL_MAX_MSEC)
+        self.capacity = SAMPLE_RATE * msec // 1000 * CHANNELS * SAMPLE_WIDTH
+        self._buf = bytearray(self.capacity)
+        self._pos = 0  # next byte to write
+        self._filled = 0
+
+    def __len__(self) -> int:
+        return self._filled
+
+    def write(self, data):
+        """Append `data`, overwriting the oldest audio once full."""
+        src = memoryview(data).cast("B")
+        if len(src) >= self.capacity:
+            src = src[len(src) - self.capacity:]
+        first = min(len(src), self.capacity - self._pos)
+        self._buf[self._pos:self._pos + first] = src[:first]
+        self._buf[:len(src) - first] = src[first:]
+        self._pos = (self._pos + len(src)) % self.capacity
+        self._filled = min(self.capacity, self._filled + len(src))
+
+    def drain_into(self, ring: PcmRingBuffer) -> bytes | None:
+        """Move the buffered audio, oldest first, into `ring` and empty the buffer; returns that audio."""
+        pcm = None
+        if self._filled:
+            start = (self._pos - self._filled) % self.capacity
+            if start + self._filled <= self.capacity:
+                pcm = self._buf[start:start + self._filled]
+            else:
+                pcm = self._buf[start:] + self._buf[:self._pos]
+            duration = self._filled / (SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH)
+            try:
+                ring.put_nowait(pcm, captured_at=time.monotonic() - duration)
             except queue.Full:
                 pass
+        self.clear()
+        return pcm
+
+    def clear(self):
+        self._pos = 0
+        self._filled = 0
+
+
+class PcmDevice:
+    """Stands in for miniaudio.CaptureDevice, feeding 16 kHz mono PCM16 bytes to the capture callback.
+
+    Buffers of BUFFERSIZE_MSEC are sent from a background thread at `speed` times
+    real time; once the audio is exhausted the device goes quiet, like a muted mic.
+    """
+
+    def __init__(self, pcm: bytes, speed: float = 1.0):
+        self._pcm = pcm
+        self._speed = speed
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.finished = threading.Event()
+
+    @property
+    def duration(self) -> float:
+        return len(self._pcm) / (SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS)
+
+    def start(self, callback_generator):
+        self._thread = threading.Thread(target=self._run, args=(callback_generator,), daemon=True)
+        self._thread.start()
+
+    def _run(self, gen):
+        interval = BUFFERSIZE_MSEC / 1000 / self._speed
+        next_at = time.monotonic()
+        for offset in range(0, len(self._pcm), CHUNK_BYTES):
+            if self._stop.is_set():
+                break
+            gen.send(bytearray(self._pcm[offset:offset + CHUNK_BYTES]))
+            next_at += interval
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
+        self.finished.set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        pass
 
-    def start(self):
-        """Open the mic stream."""
-        self._queue = queue.Queue(maxsize=200)
-        self._device = miniaudio.CaptureDevice(
-            input_format=miniaudio.SampleFormat.SIGNED16,
+
+class WavFileDevice(PcmDevice):
+    """A PcmDevice playing a 16 kHz mono PCM16 WAV file."""
+
+    def __init__(self, path: str, speed: float = 1.0):
+        with wave.open(path, "rb") as w:
+            if (w.getframerate(), w.getnchannels(), w.getsampwidth()) != (SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH):
+                raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz mono 16-bit PCM")
+            super().__init__(w.readframes(w.getnframes()), speed)
+
+
+def _open_mic() -> miniaudio.CaptureDevice:
+    """The default mic at its own sample rate, as float32 (the shared-mode mix format on Windows).
+
+    Leaving the rate to the device keeps miniaudio's resampler out of the path;
+    FrontEnd resamples instead. Only the channel downmix is left to miniaudio.
+    The rate it picked is only exposed on the device's internal ma_device
+    (miniaudio is pinned for that in requirements.txt); should that ever be
+    missing, the mic is reopened at SAMPLE_RATE and miniaudio resamples.
+    """
+    def open_at(rate: int) -> miniaudio.CaptureDevice:
+        return miniaudio.CaptureDevice(
+            input_format=miniaudio.SampleFormat.FLOAT32,
             nchannels=CHANNELS,
-            sample_rate=SAMPLE_RATE,
+            sample_rate=rate,
             buffersize_msec=BUFFERSIZE_MSEC,
         )
+
+    device = open_at(0)  # the device's native rate
+    rate = getattr(getattr(device, "_device", None), "sampleRate", 0)
+    if not rate:
+        device.close()
+        device, rate = open_at(SAMPLE_RATE), SAMPLE_RATE
+    device.sample_rate = rate
+    return device
+
+
+_SAMPLE_DTYPES = {miniaudio.SampleFormat.SIGNED16: np.int16, miniaudio.SampleFormat.FLOAT32: np.float32}
+
+
+class AudioCapture:
+    """Captures microphone audio into a ring buffer of raw PCM16 chunks.
+
+    `device_factory` returns the capture device to use on each start (the
+    default mic, or e.g. a WavFileDevice for benchmarks).
+
+    With a pre-roll (`preroll_ms`), the device can be kept open between
+    dictations via `open_preroll`: it then keeps the last `preroll_ms` of audio,
+    and `start` only moves that audio into a fresh ring buffer and redirects the
+    callback there, without reopening the device. `release` closes it again.
+
+    Captured buffers go through a FrontEnd built for the device's rate and
+    format (`sample_rate`, `format` and `nchannels` attributes, defaulting to
+    16 kHz mono int16): resampling, DC blocking (`dc_block`) and optional
+    automatic gain (`set_agc`), so the ring and pre-roll always hold 16 kHz PCM16.
+
+    Each dictation's ring buffer handles a backlog (the uplink stalling) with the
+    `overflow` policy, one of OVERFLOW_POLICIES; `on_loss(bool)` is called from
+    the capture or consumer thread when audio starts and stops being lost.
+    While recording, `on_level(db)` gets each buffer's RMS level in dBFS, from
+    the capture thread.
+
+    `stop(at=t)` ends the stream at time t (e.g. a key-up) rather than at the
+    call: the callback keeps recording until the buffer covering t arrives,
+    keeps its samples up to t and then closes the ring.
+
+    `start(archive=...)` also hands each recorded buffer, the pre-roll included,
+    to `archive.write(pcm, captured_at)` from the capture thread, and calls
+    `archive.close()` when the stream ends (see archive.ArchiveRecording).
+    """
+
+    def __init__(
+        self,
+        device_factory: callable = _open_mic,
+        preroll_ms: int = 0,
+        overflow: str = "spill",
+        on_loss: callable = None,
+        dc_block: bool = True,
+        agc: bool = False,
+        on_level: callable = None,
+    ):
+        self._device_factory = device_factory
+        self._dc_block = dc_block
+        self._agc = agc
+        self._front_end: FrontEnd | None = None
+        self._overflow = overflow
+        self._on_loss = on_loss
+        self._on_level = on_level
+        self._queue = PcmRingBuffer()
+        self._device: miniaudio.CaptureDevice | None = None
+        self._preroll = PrerollBuffer(preroll_ms) if preroll_ms > 0 else None
+        self._recording = False
+        self._archive = None  # the current dictation's ArchiveRecording, if any
+        self._stop_at: float | None = None  # pending stop(at=...) cut, time.monotonic()
+        self._cut = threading.Event()  # set once that cut has been made
+        self._lock = threading.Lock()  # guards the callback's target (ring or pre-roll)
+        self.started_at: float | None = None  # time.monotonic() the device last started
+
+    @property
+    def queue(self) -> PcmRingBuffer:
+        return self._queue
+
+    @property
+    def device(self):
+        return self._device
+
+    @property
+    def is_open(self) -> bool:
+        return self._device is not None
+
+    def set_preroll(self, msec: int):
+        """Change the pre-roll length; 0 turns it off and releases an idle device."""
+        with self._lock:
+            self._preroll = PrerollBuffer(msec) if msec > 0 else None
+        if msec <= 0:
+            self.release()
+
+    def set_overflow(self, policy: str):
+        """Overflow policy for the next dictation's ring buffer; one of OVERFLOW_POLICIES."""
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self._overflow = policy
+
+    def set_agc(self, enabled: bool):
+        """Turn automatic gain control on or off, also for an open device."""
+        self._agc = enabled
+        if self._front_end is not None:
+            self._front_end.agc = enabled
+
+    def _recorder(self):
+        """Generator callback that receives captured audio bytes (prime with next() first)."""
+        front_end = self._front_end
+        on_level = self._on_level
+        frame_bytes = CHANNELS * SAMPLE_WIDTH
+        while True:
+            data = front_end.process((yield))
+            arrived = time.monotonic()
+            with self._lock:
+                recording = self._recording
+                if recording and self._stop_at is not None and arrived >= self._stop_at:
+                    # This buffer ends at `arrived`; keep only what was captured up to the cut.
+                    late = int((arrived - self._stop_at) * SAMPLE_RATE) * frame_bytes
+                    data = data[:max(0, len(data) - late)]
+                    if data:
+                        self._queue.put_nowait(data)
+                        if self._archive is not None:
+                            self._archive.write(data, arrived)
+                    self._end_recording()
+                elif recording:
+                    self._queue.put_nowait(data)  # the overflow policy deals with a full ring
+                    if self._archive is not None:
+                        self._archive.write(data, arrived)
+                elif self._preroll is not None:
+                    self._preroll.write(data)
+            if recording and on_level is not None and data:
+                on_level(level_db(data))
+
+    def _open_device(self):
+        self._device = self._device_factory()
+        self._front_end = FrontEnd(
+            getattr(self._device, "sample_rate", SAMPLE_RATE),
+            _SAMPLE_DTYPES[getattr(self._device, "format", miniaudio.SampleFormat.SIGNED16)],
+            getattr(self._device, "nchannels", CHANNELS),
+            dc_block=self._dc_block,
+            agc=self._agc,
+        )
         gen = self._recorder()
         next(gen)
         self._device.start(gen)
 
-    def stop(self):
-        """Close the mic stream."""
-        if self._device is not None:
-            self._device.stop()
-            self._device.close()
-            self._device = None
+    def _close_device(self):
+        with self._lock:
+            device, self._device = self._device, None
+        if device is not None:
+            device.stop()
+            device.close()
+
+    def open_preroll(self):
+        """Open the device ahead of the next `start` so it collects pre-roll audio."""
+        if self._preroll is not None and self._device is None:
+            self._open_device()
+
+    def release(self):
+        """Close a device held open for the pre-roll; a later `start` reopens it."""
+        if self._device is not None and not self._recording:
+            self._close_device()
+            with self._lock:
+                if self._preroll is not None:
+                    self._preroll.clear()
+
+    def start(self, archive=None):
+        """Open the mic stream, starting with the pre-roll if the device is already open."""
+        ring = PcmRingBuffer(overflow=self._overflow, on_loss=self._on_loss)
+        with self._lock:
+            if self._stop_at is not None:
+                self._end_recording()  # the previous stream's cut is still pending: end it here
+            reuse = self._device is not None
+            if reuse:
+                # Under the lock the callback is between buffers: nothing is lost or duplicated.
+                if self._preroll is not None:
+                    preroll = self._preroll.drain_into(ring)
+                    if preroll and archive is not None:
+                        archive.write(preroll, time.monotonic())
+                self._queue = ring
+                self._archive = archive
+                self._recording = True
+        if not reuse:
+            self._queue = ring
+            self._archive = archive
+            self._recording = True
+            self._open_device()
+        self.started_at = time.monotonic()
+
+    def stop(self, at: float | None = None):
+        """End the mic stream, at time.monotonic() `at` if given (otherwise now).
+
+        The device stays open to refill the pre-roll if there is one.
+        """
+        with self._lock:
+            pending = at is not None and self._recording and self._device is not None
+            if pending:
+                self._stop_at = at
+                self._cut.clear()
+            else:
+                self._end_recording()
+        if pending:
+            threading.Thread(target=self._finish_cut, name="capture-stop", daemon=True).start()
+        elif self._preroll is None:
+            self._close_device()
+
+    def _end_recording(self):
+        """Under the lock: stop feeding the ring and close it."""
+        self._recording = False
+        self._stop_at = None
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        if self._preroll is not None:
+            self._preroll.clear()  # don't replay the end of this dictation into the next
+        self._queue.close()
+        self._cut.set()
+
+    def _finish_cut(self):
+        """Wait for the callback to make a pending `stop(at=...)` cut, then close the device if unused."""
+        self._cut.wait(STOP_AT_GRACE)
+        with self._lock:
+            if self._stop_at is not None:
+                self._end_recording()  # no audio arriving (device stalled)
+            if self._recording or self._preroll is not None:
+                return  # a new dictation already uses the device, or the pre-roll keeps it
+            device, self._device = self._device, None
+        if device is not None:
+            device.stop()
+            device.close()
@@ -0,0 +1,192 @@
+"""Headless batch transcription: stream a directory of audio files through the realtime pipeline.
+
+    python batch.py DIR [--out DIR] [--concurrency N] [--speed X] [--retries N]
+
+Takes 16 kHz mono PCM16 .wav files, raw .pcm files (same format, no header) and
+sessions saved by the audio archive (.dha, see archive.py).
+Writes one <name>.txt transcript per file and prints timing statistics. No Qt
+application or hotkeys are involved; sessions run concurrently on the shared
+event loop.
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import time
+import wave
+
+import config
+import realtime
+from audio import CHUNK_BYTES, PcmRingBuffer
+from diagnostics import SessionTrace, percentile
+
+AUDIO_EXTENSIONS = (".wav", ".pcm", ".dha")
+RETRY_BACKOFF = 1.0  # seconds before the first retry, doubled each time
+
+
+def read_pcm(path: str) -> bytes:
+    """Return the raw PCM16 payload of a .wav, .pcm or .dha file."""
+    if path.lower().endswith(".pcm"):
+        with open(path, "rb") as f:
+            return f.read()
+    if path.lower().endswith(".dha"):
+        from archive import ArchivedSession
+
+        session = ArchivedSession(path)
+        try:
+            return session.read()
+        finally:
+            session.close()
+    with wave.open(path, "rb") as w:
+        if (w.getframerate(), w.getnchannels(), w.getsampwidth()) != (realtime.SAMPLE_RATE, 1, 2):
+            raise ValueError(f"{path}: expected {realtime.SAMPLE_RATE} Hz mono 16-bit PCM")
+        return w.readframes(w.getnframes())
+
+
+async def _feed(ring: PcmRingBuffer, pcm: bytes, speed: float):
+    """Write `pcm` into the ring in capture-sized chunks at `speed` x real time (0 = unpaced)."""
+    interval = 0.0 if speed <= 0 else CHUNK_BYTES / (realtime.SAMPLE_RATE * 2) / speed
+    loop = asyncio.get_running_loop()
+    next_at = loop.time()
+    view = memoryview(pcm)
+    for offset in range(0, len(pcm), CHUNK_BYTES):
+        while True:
+            try:
+                ring.put_nowait(view[offset:offset + CHUNK_BYTES])
+                break
+            except queue.Full:
+                await asyncio.sleep(0.01)  # the uplink is behind; wait for slots
+        if interval:
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+    ring.close()
+
+
+async def transcribe_file(api_key: str, path: str, speed: float, warmup: str) -> dict:
+    """Stream one file through a realtime session; return its transcript and timings."""
+    # Decoding a large file would stall every other session on the shared loop.
+    pcm = await asyncio.get_running_loop().run_in_executor(None, read_pcm, path)
+    ring = PcmRingBuffer()
+    trace = SessionTrace()
+    parts: list[str] = []
+    feeder = asyncio.ensure_future(_feed(ring, pcm, speed))
+    try:
+        await realtime.run_session(
+            api_key, ring, lambda: True, warmup=warmup, trace=trace, on_text=parts.append,
+        )
+    finally:
+        feeder.cancel()
+    trace.mark("end")
+    record = trace.record()
+    audio_seconds = len(pcm) / (realtime.SAMPLE_RATE * 2)
+    elapsed = record["stages_ms"]["end"] / 1000
+    return {
+        "file": path,
+        "text": "".join(parts).strip(),
+        "audio_s": round(audio_seconds, 2),
+        "elapsed_s": round(elapsed, 2),
+        "realtime_factor": round(audio_seconds / elapsed, 2) if elapsed else None,
+        "first_text_ms": record["stages_ms"].get("first_text"),
+        "lag_p50_ms": record["lag_p50_ms"],
+        "lag_p95_ms": record["lag_p95_ms"],
+    }
+
+
+async def _transcribe_with_retry(api_key, path, args, limit: asyncio.Semaphore) -> dict:
+    async with limit:
+        for attempt in range(args.retries + 1):
+            try:
+                result = await transcribe_file(api_key, path, args.speed, args.warmup)
+                result["attempts"] = attempt + 1
+                return result
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if attempt < args.retries:
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+        return {"file": path, "error": error, "attempts": args.retries + 1}
+
+
+async def run_batch(api_key: str, paths: list[str], args) -> list[dict]:
+    limit = asyncio.Semaphore(args.concurrency)
+    results = []
+    pending = [asyncio.ensure_future(_transcribe_with_retry(api_key, p, args, limit)) for p in paths]
+    for future in asyncio.as_completed(pending):
+        result = await future
+        results.append(result)
+        _write_transcript(result, args.out)
+        _print_result(result)
+    return results
+
+
+def _write_transcript(result: dict, out_dir: str | None):
+    if "text" not in result:
+        return
+    base = os.path.splitext(os.path.basename(result["file"]))[0] + ".txt"
+    target = os.path.join(out_dir or os.path.dirname(result["file"]), base)
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(result["text"] + "\n")
+
+
+def _print_result(result: dict):
+    name = os.path.basename(result["file"])
+    if "error" in result:
+        print(f"FAIL {name}: {result['error']} (after {result['attempts']} attempts)", flush=True)
+    else:
+        print(f"ok   {name}: {result['audio_s']:.1f} s audio in {result['elapsed_s']:.1f} s "
+              f"({result['realtime_factor']}x), first text {result['first_text_ms']} ms", flush=True)
+
+
+def _collect(directory: str) -> list[str]:
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(AUDIO_EXTENSIONS)
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Transcribe a directory of audio files headlessly.")
+    parser.add_argument("directory")
+    parser.add_argument("--out", help="directory for transcripts (default: next to each file)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--speed", type=float, default=4.0, help="streaming speed vs real time, 0 = unpaced")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--warmup", choices=realtime.WARMUP_POLICIES, default="burst")
+    parser.add_argument("--api-key", default=os.environ.get("MISTRAL_API_KEY"))
+    parser.add_argument("--base-url", help="realtime endpoint, e.g. a local fake server")
+    parser.add_argument("--json", help="also write all results to this file")
+    args = parser.parse_args(argv)
+
+    api_key = args.api_key or config.load().get("api_key")
+    if not api_key:
+        parser.error("no API key: pass --api-key, set MISTRAL_API_KEY or configure the app")
+    if args.base_url:
+        realtime.BASE_URL = args.base_url
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    paths = _collect(args.directory)
+    if not paths:
+        parser.error(f"no {'/'.join(AUDIO_EXTENSIONS)} files in {args.directory}")
+
+    started = time.perf_counter()
+    future = asyncio.run_coroutine_threadsafe(run_batch(api_key, paths, args), realtime.get_event_loop())
+    results = future.result()
+    wall = time.perf_counter() - started
+
+    ok = [r for r in results if "error" not in r]
+    audio = sum(r["audio_s"] for r in ok)
+    firsts = [r["first_text_ms"] for r in ok if r["first_text_ms"] is not None]
+    p50 = percentile(firsts, 50)
+    print(f"\n{len(ok)}/{len(results)} files, {audio:.1f} s of audio in {wall:.1f} s "
+          f"({audio / wall:.1f}x real time), median first text "
+          f"{'—' if p50 is None else f'{p50:.0f} ms'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if len(ok) == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
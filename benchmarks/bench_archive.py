@@ -0,0 +1,209 @@
+"""Audio archive: capture callback latency with archiving on vs off, and archive integrity.
+
+Drives AudioCapture's capture callback with 48 kHz float32 buffers (the usual
+Windows mix format, so the front end resamples) at `--speed` times real time
+while a consumer thread drains the ring, once without and once with an
+AudioArchive recording the session (its flush interval scaled by the same
+speed, so it writes as often per second of audio as in the app). Runs
+alternate `--runs` times; reports callback time percentiles, how many capture
+buffers went into each disk write and how long each write took the writer
+thread.
+
+Then checks the archive: the file holds exactly the audio the ring delivered,
+reading a time range by seeking gives the same bytes as slicing, a file cut
+short mid-chunk (no index) still reads back up to the cut, and retention
+deletes the oldest sessions beyond the size limit.
+
+Exits non-zero on any integrity failure, if a disk write (the writer's whole
+batch: packing, write and flush) takes more than `--max-flush-us` of CPU at
+p99, or
+if archiving raises the callback's p99 by more than `--max-added-us`. The p99
+is compared as the median of the per-run p99s, and the limit is raised to
+the spread of the archive-off runs' p99s. On a loaded or single-core machine
+the baseline p99 varies by milliseconds from run to run; a difference
+smaller than that isn't the archive's. The writer's batch time is the direct
+bound: it is all the CPU a write can take from the capture thread.
+
+    python benchmarks/bench_archive.py [--seconds S] [--speed X] [--runs N] [--max-added-us US]
+                                       [--max-flush-us US]
+"""
+import argparse
+import os
+import queue
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from archive import FLUSH_INTERVAL, ArchivedSession, ArchiveRecording, AudioArchive, list_sessions  # noqa: E402
+from audio import BUFFERSIZE_MSEC, AudioCapture  # noqa: E402
+from dsp import FrontEnd  # noqa: E402
+
+DEVICE_RATE = 48_000
+
+
+def device_buffers(seconds: float) -> list[bytes]:
+    rng = np.random.default_rng(23)
+    n = DEVICE_RATE * BUFFERSIZE_MSEC // 1000
+    t = np.arange(n) / DEVICE_RATE
+    return [(0.1 * np.sin(2 * np.pi * (300 + 20 * i) * t) + 0.01 * rng.standard_normal(n)).astype(np.float32).tobytes()
+            for i in range(int(seconds * 1000 / BUFFERSIZE_MSEC))]
+
+
+def drain(ring, out: list, stop: threading.Event):
+    while True:
+        try:
+            out.append(bytes(ring.get_nowait()))
+        except queue.Empty:
+            if stop.is_set() and ring.empty():
+                return
+            time.sleep(0.002)
+
+
+def run(buffers: list[bytes], speed: float, archive: AudioArchive | None):
+    """Feed the buffers through the capture callback; return callback times, ring output and the recording."""
+    capture = AudioCapture()
+    capture._front_end = FrontEnd(DEVICE_RATE, np.float32)
+    recording = archive.open_session(time.time()) if archive is not None else None
+    capture._archive = recording
+    capture._recording = True
+    gen = capture._recorder()
+    next(gen)
+    received: list[bytes] = []
+    stop = threading.Event()
+    consumer = threading.Thread(target=drain, args=(capture.queue, received, stop))
+    consumer.start()
+    interval = BUFFERSIZE_MSEC / 1000 / speed
+    times = []
+    next_at = time.perf_counter()
+    for data in buffers:
+        started = time.perf_counter()
+        gen.send(data)
+        times.append(time.perf_counter() - started)
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+    capture.stop()  # closes the ring and the archive recording
+    stop.set()
+    consumer.join()
+    return sorted(times), b"".join(received), recording
+
+
+def check_integrity(path: str, delivered: bytes) -> list[str]:
+    errors = []
+    session = ArchivedSession(path)
+    whole = session.read()
+    if whole != delivered:
+        errors.append(f"archive holds {len(whole)} bytes, the ring delivered {len(delivered)} (or they differ)")
+    start, end = 12.345, 17.9
+    part = session.read(start, end)
+    if part != delivered[int(start * 16000) * 2:int(end * 16000) * 2]:
+        errors.append(f"read({start}, {end}) differs from the same slice of the whole")
+    session.close()
+
+    torn = path + ".torn.dha"
+    with open(path, "rb") as src, open(torn, "wb") as dst:
+        dst.write(src.read(os.path.getsize(path) // 2))  # mid-chunk, no index or trailer
+    session = ArchivedSession(torn)
+    recovered = session.read()
+    session.close()
+    os.remove(torn)
+    if not recovered or not delivered.startswith(recovered):
+        errors.append(f"torn file: read back {len(recovered)} bytes that aren't a prefix of the audio")
+    return errors
+
+
+def check_retention(directory: str) -> list[str]:
+    chunk = bytes(3200)
+    archive = AudioArchive(directory, max_bytes=3 * 12 * 3400)  # three sessions of 12 chunks
+    for n in range(6):
+        recording = archive.open_session(1_700_000_000 + n * 60)
+        for _ in range(12):
+            recording.write(chunk, time.monotonic())
+        recording.close()
+        archive.flush()
+    names = [os.path.basename(p) for p in list_sessions(directory)]
+    total = sum(os.path.getsize(p) for p in list_sessions(directory))
+    errors = []
+    if len(names) != 3 or total > archive.max_bytes:
+        errors.append(f"retention kept {len(names)} sessions, {total} bytes (limit {archive.max_bytes})")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0, help="audio per run")
+    parser.add_argument("--speed", type=float, default=20.0, help="capture speed relative to real time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-added-us", type=float, default=100.0)
+    parser.add_argument("--max-flush-us", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    flush_times = []
+    flush = ArchiveRecording._flush
+
+    def timed_flush(recording):
+        started = time.thread_time()  # CPU time: what the write takes from other threads, not its waits
+        try:
+            return flush(recording)
+        finally:
+            flush_times.append(time.thread_time() - started)
+
+    ArchiveRecording._flush = timed_flush
+
+    buffers = device_buffers(args.seconds)
+    directory = tempfile.mkdtemp()
+    try:
+        archive = AudioArchive(os.path.join(directory, "sessions"), flush_interval=FLUSH_INTERVAL / args.speed)
+        results = {"off": [], "on": []}
+        for _ in range(args.runs):
+            for mode in ("off", "on"):
+                times, delivered, recording = run(buffers, args.speed, archive if mode == "on" else None)
+                results[mode].append((times, delivered, recording))
+        archive.flush()
+
+        print(f"{len(buffers)} capture buffers of {BUFFERSIZE_MSEC} ms at {args.speed:.0f}x real time, "
+              f"{args.runs} runs each")
+        p99 = {}  # per run, µs
+        for mode, runs in results.items():
+            times = sorted(t for run_times, _, _ in runs for t in run_times)
+            p99[mode] = sorted(run_times[int(len(run_times) * 0.99)] * 1e6 for run_times, _, _ in runs)
+            print(f"  archive {mode:<3}  callback p50 {times[len(times) // 2] * 1e6:6.1f} µs  "
+                  f"p99 {statistics.median(p99[mode]):6.1f} µs (runs {p99[mode][0]:.0f}-{p99[mode][-1]:.0f})  "
+                  f"max {times[-1] * 1e6:7.1f} µs")
+        recordings = [recording for _, _, recording in results["on"]]
+        writes = sum(r.batches for r in recordings)
+        flush_times.sort()
+        flush_p99 = flush_times[int(len(flush_times) * 0.99)] * 1e6
+        print(f"  {len(buffers) * len(recordings) / max(writes, 1):.1f} capture buffers per disk write, "
+              f"{os.path.getsize(recordings[0].path) / args.seconds / 1024:.1f} KiB per second of audio")
+        print(f"  writer  batch p50 {flush_times[len(flush_times) // 2] * 1e6:6.1f} µs  "
+              f"p99 {flush_p99:6.1f} µs of CPU")
+
+        errors = []
+        added = statistics.median(p99["on"]) - statistics.median(p99["off"])
+        noise = p99["off"][-1] - p99["off"][0]
+        print(f"  archiving adds {added:.0f} µs to the p99 callback time "
+              f"(limit {max(args.max_added_us, noise):.0f} µs: {args.max_added_us:.0f}, or the off runs' spread)")
+        if added > max(args.max_added_us, noise):
+            errors.append(f"archiving adds {added:.0f} µs to the p99 callback time")
+        if flush_p99 > args.max_flush_us:
+            errors.append(f"a disk write takes the writer {flush_p99:.0f} µs of CPU at p99")
+        _, delivered, recording = results["on"][-1]
+        errors += check_integrity(recording.path, delivered)
+        errors += check_retention(os.path.join(directory, "retention"))
+    finally:
+        shutil.rmtree(directory)
+    for error in errors:
+        print(f"  !! {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
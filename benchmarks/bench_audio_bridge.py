@@ -0,0 +1,114 @@
+"""Measure how long captured chunks wait before `audio_stream` yields them.
+
+A fake capture thread stands in for miniaudio and writes a 100 ms PCM16 chunk
+into the ring buffer on a fixed cadence, stamping each with a sequence number.
+The consumer runs the real `audio_stream` (warmup disabled) on an asyncio loop
+and records when each chunk comes out. The pre-ring 50 ms polling loop is run
+over the same source for comparison. Fails if the bridge loses a chunk, its
+p95 wait exceeds --max-p95-ms or it is not faster than polling.
+
+    python benchmarks/bench_audio_bridge.py [--chunks N] [--interval-ms MS] [--max-p95-ms MS]
+"""
+import argparse
+import asyncio
+import os
+import queue
+import statistics
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import realtime  # noqa: E402
+from audio import CHUNK_BYTES, PcmRingBuffer  # noqa: E402
+
+
+class FakeCapture(threading.Thread):
+    """Writes sequence-stamped chunks into the ring at a fixed interval, like a capture device."""
+
+    def __init__(self, ring: PcmRingBuffer, chunks: int, interval: float):
+        super().__init__(daemon=True)
+        self._ring = ring
+        self._chunks = chunks
+        self._interval = interval
+        self.captured_at: list[float] = []
+
+    def run(self):
+        data = bytearray(CHUNK_BYTES)
+        next_at = time.perf_counter()
+        for seq in range(self._chunks):
+            next_at += self._interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            struct.pack_into("<I", data, 0, seq)
+            self.captured_at.append(time.perf_counter())
+            self._ring.put_nowait(data)
+        self._ring.close()
+
+
+async def _legacy_stream(ring: PcmRingBuffer, source: FakeCapture, chunks: int):
+    """The pre-bridge consumer: get_nowait with a 50 ms sleep when nothing is queued."""
+    seen = 0
+    while seen < chunks:
+        try:
+            yield ring.get_nowait()
+            seen += 1
+        except queue.Empty:
+            await asyncio.sleep(0.05)
+
+
+async def _measure(stream_factory, chunks: int, interval: float) -> list[float]:
+    ring = PcmRingBuffer()
+    source = FakeCapture(ring, chunks, interval)
+    waits = []
+    source.start()
+    async for chunk in stream_factory(ring, source, chunks):
+        yielded_at = time.perf_counter()
+        (seq,) = struct.unpack_from("<I", chunk, 0)
+        waits.append(yielded_at - source.captured_at[seq])
+    source.join()
+    return waits
+
+
+def _report(name: str, waits: list[float]) -> float:
+    """Print wait statistics and return the p95 in ms."""
+    ms = sorted(w * 1000 for w in waits)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(f"{name:<8} n={len(ms):<5} mean={statistics.mean(ms):7.3f} ms  "
+          f"p50={statistics.median(ms):7.3f} ms  p95={p95:7.3f} ms  max={ms[-1]:7.3f} ms")
+    return p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--interval-ms", type=float, default=100.0)
+    parser.add_argument("--max-p95-ms", type=float, default=5.0, help="a tenth of the old 50 ms poll")
+    args = parser.parse_args()
+    interval = args.interval_ms / 1000
+
+    realtime.WARMUP_DURATION = 0.0
+
+    def bridged(ring, source, chunks):
+        return realtime.audio_stream(ring, lambda: True)
+
+    waits = asyncio.run(_measure(bridged, args.chunks, interval))
+    bridge_p95 = _report("bridge", waits)
+    polling_p95 = _report("polling", asyncio.run(_measure(_legacy_stream, args.chunks, interval)))
+
+    failures = []
+    if len(waits) != args.chunks:
+        failures.append(f"the bridge yielded {len(waits)} of {args.chunks} chunks")
+    if bridge_p95 > args.max_p95_ms:
+        failures.append(f"bridge p95 wait {bridge_p95:.3f} ms is over {args.max_p95_ms} ms")
+    if bridge_p95 >= polling_p95:
+        failures.append(f"bridge p95 wait {bridge_p95:.3f} ms is no better than polling ({polling_p95:.3f} ms)")
+    for failure in failures:
+        print(f"  !! {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Capture ring buffer under a stalled uplink: memory and lost audio per overflow policy.
+
+Producer and consumer step in lockstep, counted in 100 ms chunks rather than
+timed, so every run loses exactly the same chunks: the consumer reads one
+chunk per chunk captured at first, then nothing for `--stall-s` seconds of
+audio (the uplink hanging), then two per chunk captured until it has caught
+up. With "spill" each step waits for the spill thread to have moved the
+overflow to disk, as it would have by the next capture buffer in the app.
+
+For each policy the chunk numbers read back must be strictly increasing (no
+reordering or duplicates), every chunk must be either read or counted as
+dropped, the loss must stay within what the policy allows, "spill" must count
+each chunk that didn't fit in the ring once and lose nothing, and the Python
+heap must not grow with the backlog. Exits non-zero on any violation.
+
+    python benchmarks/bench_backpressure.py [--stall-s S]
+"""
+import argparse
+import os
+import queue
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from audio import BUFFERSIZE_MSEC, CHUNK_BYTES, OVERFLOW_POLICIES, RING_SLOTS, PcmRingBuffer  # noqa: E402
+
+HEAP_LIMIT = 256 * 1024  # bytes; the spill index is the only thing allowed to grow, ~100 B per chunk
+LEAD_CHUNKS = 50  # read as captured before the stall
+
+
+def read(ring: PcmRingBuffer, received: list[int], n: int):
+    for _ in range(n):
+        try:
+            chunk = ring.get_nowait()
+        except queue.Empty:
+            return
+        received.append(int.from_bytes(chunk[:4], "little"))
+
+
+def run(policy: str, stall_chunks: int) -> dict:
+    total = LEAD_CHUNKS + stall_chunks * 3  # enough audio after the stall to catch up
+    losses = []
+    ring = PcmRingBuffer(overflow=policy, on_loss=losses.append)
+    received: list[int] = []
+    filler = bytes(CHUNK_BYTES - 4)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for n in range(total):
+        if n >= LEAD_CHUNKS + stall_chunks:
+            read(ring, received, 2)  # the uplink is back: before this chunk arrives
+        ring.put_nowait(n.to_bytes(4, "little") + filler)
+        ring.wait_spilled(5.0)
+        if n < LEAD_CHUNKS:
+            read(ring, received, 1)
+    ring.close()
+    while not ring.empty():
+        read(ring, received, 1)
+    heap = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    stats = ring.stats()
+    lost = total - len(received)
+    overflow = max(0, stall_chunks - RING_SLOTS)  # chunks that can't fit in the ring during the stall
+    errors = []
+    if any(b <= a for a, b in zip(received, received[1:])):
+        errors.append("chunks reordered or duplicated")
+    if lost * CHUNK_BYTES != ring.dropped_bytes:
+        errors.append(f"{lost} chunks missing but {ring.dropped_bytes // CHUNK_BYTES} counted as dropped")
+    if policy == "spill":
+        if lost:
+            errors.append("spill lost audio")
+        if ring.spilled_bytes != overflow * CHUNK_BYTES:
+            errors.append(f"spilled {ring.spilled_bytes // CHUNK_BYTES} chunks, {overflow} didn't fit in the ring")
+    # The ring holds RING_SLOTS unread chunks, so a stall costs what doesn't fit;
+    # "pause" then also discards until the reader is back to half the ring.
+    allowed = overflow + (RING_SLOTS - RING_SLOTS // 2 if policy == "pause" and overflow else 0)
+    if policy != "spill" and lost > allowed:
+        errors.append(f"lost {lost} chunks, more than the {allowed} the stall accounts for")
+    if lost and losses[:1] != [True]:
+        errors.append("loss not reported")
+    if heap > HEAP_LIMIT:
+        errors.append(f"heap grew by {heap} bytes")
+    return {"policy": policy, "lost": lost, "stats": stats, "heap": heap, "losses": losses, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stall-s", type=float, default=40.0, help="seconds of audio the uplink stalls for")
+    args = parser.parse_args()
+
+    print(f"stall of {args.stall_s:.0f} s of audio against a {RING_SLOTS * BUFFERSIZE_MSEC / 1000:.0f} s ring:")
+    failed = False
+    for policy in OVERFLOW_POLICIES:
+        result = run(policy, int(args.stall_s * 1000 / BUFFERSIZE_MSEC))
+        stats = result["stats"]
+        print(f"  {policy:<12} lost {stats['dropped_ms']:6d} ms  spilled {stats['spilled_ms']:6d} ms  "
+              f"max backlog {stats['max_depth_ms']:6d} ms  heap +{result['heap'] / 1024:6.1f} KiB  "
+              f"loss episodes {result['losses'].count(True)}")
+        for error in result["errors"]:
+            print(f"    !! {error}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
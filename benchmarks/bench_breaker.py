@@ -0,0 +1,156 @@
+"""How fast a dictation fails when the endpoint is down, and how fast it recovers.
+
+Runs the real TranscriptionWorker against FakeRealtimeServer and walks it
+through an outage: the server is killed (connections refused), brought back,
+paused (connections hang, like a black-holed host) and resumed. For each phase
+it reports the time from "hotkey" to the error, whether the circuit breaker
+opened, how long a dictation takes to be rejected while it is open, and how
+long the background prober takes to close it once the server is back. Also
+checks that the probe takes a 4xx handshake refusal for "up" and a 5xx for
+"down". Exits non-zero if a dictation hangs past its timeouts, the breaker
+doesn't recover or a probe status is misread.
+
+    python benchmarks/bench_breaker.py [--connect-ms MS] [--first-event-ms MS]
+"""
+import argparse
+import asyncio
+import functools
+import sys
+import threading
+import time
+
+from fake_realtime_server import FakeRealtimeServer
+from harness import Qt, fake_mic  # also puts the repo root on sys.path
+
+import diagnostics  # noqa: E402
+import realtime  # noqa: E402
+import transcription  # noqa: E402
+from audio import PcmRingBuffer  # noqa: E402
+
+
+def dictate(worker, timeout: float) -> tuple[str | None, float]:
+    """Dictate until the first text or an error; returns (error or None, seconds it took)."""
+    outcome = {}
+    settled = threading.Event()
+
+    def on_text(text):
+        outcome.setdefault("error", None)
+        settled.set()
+
+    def on_error(msg):
+        outcome.setdefault("error", msg)
+        settled.set()
+
+    worker.text_delta.connect(on_text, Qt.ConnectionType.DirectConnection)
+    worker.error.connect(on_error, Qt.ConnectionType.DirectConnection)
+    ring = PcmRingBuffer()
+    stop = threading.Event()
+    mic = threading.Thread(target=fake_mic, args=(ring, stop), daemon=True)
+    started = time.perf_counter()
+    mic.start()
+    worker.start("fake-key", ring)
+    ok = settled.wait(timeout)
+    elapsed = time.perf_counter() - started
+    worker.stop()
+    stop.set()
+    mic.join()
+    worker.text_delta.disconnect(on_text)
+    worker.error.disconnect(on_error)
+    if not ok:
+        raise AssertionError(f"dictation neither failed nor produced text within {timeout:.0f} s")
+    time.sleep(0.2)  # let the session wind down before the next phase
+    return outcome["error"], elapsed
+
+
+def wait_until_up(worker, timeout: float) -> float:
+    started = time.perf_counter()
+    while worker.endpoint_down:
+        if time.perf_counter() - started > timeout:
+            raise AssertionError(f"breaker still open {timeout:.0f} s after the server came back")
+        time.sleep(0.01)
+    return time.perf_counter() - started
+
+
+def report(phase: str, error: str | None, elapsed: float, worker):
+    state = "breaker open" if worker.endpoint_down else "breaker closed"
+    outcome = "text" if error is None else f"error: {error[:70]}"
+    print(f"  {phase:<26} {elapsed * 1000:7.0f} ms  {state:<14}  {outcome}")
+
+
+def check_probe_status() -> bool:
+    """The prober counts a refused handshake (4xx) as up and a server error (5xx) as down."""
+
+    async def answer(status: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(f"HTTP/1.1 {status} Status\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        writer.close()
+
+    async def probe(status: int) -> bool:
+        server = await asyncio.start_server(functools.partial(answer, status), "127.0.0.1", 0)
+        base_url, realtime.BASE_URL = realtime.BASE_URL, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        try:
+            await realtime.probe_endpoint(2.0)
+            return True
+        except Exception:
+            return False
+        finally:
+            realtime.BASE_URL = base_url
+            server.close()
+
+    results = {status: asyncio.run(probe(status)) for status in (401, 403, 404, 500, 502, 503)}
+    ok = all(up == (status < 500) for status, up in results.items())
+    print("probe: " + ", ".join(f"{status} {'up' if up else 'down'}" for status, up in results.items())
+          + ("" if ok else "  !! expected 4xx up, 5xx down"))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connect-ms", type=float, default=1000.0)
+    parser.add_argument("--first-event-ms", type=float, default=2000.0)
+    args = parser.parse_args()
+    connect, first_event = args.connect_ms / 1000, args.first_event_ms / 1000
+    bound = 2 * first_event + 2.0  # two connect attempts and the backoff between them
+
+    server = FakeRealtimeServer()
+    realtime.BASE_URL = server.start()
+    worker = transcription.TranscriptionWorker()
+    worker.set_timeouts(connect, first_event)
+    failed = not check_probe_status()
+    try:
+        print("phase                      hotkey->outcome")
+        report("server up", *dictate(worker, bound), worker)
+
+        server.kill()
+        report("killed: first dictation", *dictate(worker, bound), worker)
+        error, elapsed = dictate(worker, bound)
+        report("killed: breaker open", error, elapsed, worker)
+        failed |= not worker.endpoint_down or error is None
+        server.start()
+        print(f"  recovery after restart   {wait_until_up(worker, 40) * 1000:7.0f} ms")
+        report("restarted", *dictate(worker, bound), worker)
+
+        server.pause()
+        report("paused: first dictation", *dictate(worker, bound), worker)
+        error, elapsed = dictate(worker, bound)
+        report("paused: breaker open", error, elapsed, worker)
+        failed |= not worker.endpoint_down or error is None
+        server.resume()
+        print(f"  recovery after resume    {wait_until_up(worker, 40) * 1000:7.0f} ms")
+        error, elapsed = dictate(worker, bound)
+        report("resumed", error, elapsed, worker)
+        failed |= error is not None
+        print(diagnostics.summarize_endpoint(worker.endpoint_stats()))
+    except AssertionError as e:
+        print(f"FAILED: {e}")
+        failed = True
+    finally:
+        server.resume()
+        server.stop()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Dictation daemon: fan-out of dictation text to many local subscribers, with slow ones.
+
+End to end: runs the fake realtime server and `daemon.py serve` (a WAV
+fixture as the mic, a fresh config) as subprocesses, connects `--clients`
+subscribers, starts a dictation over the socket and stops it once the audio
+has played. Every subscriber must receive the same text, equal to the
+session's final text; reports how long text events took to reach them.
+
+Flood: an in-process DictationServer publishes `--events` text deltas at
+`--rate` per second to `--clients` subscribers that read everything and
+`--stalled` ones that never read; the words are padded so the flood carries
+three times MAX_PENDING_BYTES of text. Reports the publishing cost per event
+and the fast subscribers' delivery latency; every fast subscriber must receive
+the text exactly (lagging ones get deltas merged) and every stalled one must be
+disconnected rather than buffered without bound.
+
+Exits non-zero on any delivery failure, or if publishing an event costs more
+than `--max-publish-us`.
+
+    python benchmarks/bench_daemon.py [--clients N] [--stalled N] [--events N] [--rate R] [--max-publish-us US]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import daemon  # noqa: E402
+from fixtures import write_fixtures  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def address_in(directory: str, name: str) -> str:
+    if sys.platform == "win32":
+        return rf"\\.\pipe\dictation_hotkey-bench-{os.getpid()}-{name}"
+    return os.path.join(directory, f"{name}.sock")
+
+
+async def subscribe(address: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    reader, writer = await daemon.open_connection(address)
+    writer.write(b'{"op":"subscribe"}\n')
+    reply = json.loads(await reader.readline())
+    assert reply["event"] == "ok", reply
+    return reader, writer
+
+
+async def receive(reader: asyncio.StreamReader, latencies: list[float]) -> tuple[str, str | None]:
+    """Read events until "finished"; returns the text received and the final text."""
+    parts = []
+    while line := await reader.readline():
+        event = json.loads(line)
+        if event["event"] == "text":
+            latencies.append(time.monotonic() - event["at"])
+            parts.append(event["text"])
+        elif event["event"] == "finished":
+            return "".join(parts), event["text"]
+    return "".join(parts), None
+
+
+def percentiles(values: list[float]) -> str:
+    values = sorted(values)
+    if not values:
+        return "no samples"
+    return (f"p50 {values[len(values) // 2] * 1000:6.2f} ms  p99 {values[int(len(values) * 0.99)] * 1000:6.2f} ms  "
+            f"max {values[-1] * 1000:6.2f} ms")
+
+
+async def end_to_end(directory: str, clients: int, wav: str, speed: float) -> list[str]:
+    fake = subprocess.Popen([sys.executable, os.path.join(HERE, "fake_realtime_server.py"), "--token-ms", "20"],
+                            stdout=subprocess.PIPE, text=True)
+    address = address_in(directory, "e2e")
+    env = dict(os.environ, APPDATA=os.path.join(directory, "appdata"), HOME=directory)
+    server = None
+    try:
+        base_url = fake.stdout.readline().strip()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "..", "daemon.py"), "--address", address, "serve",
+             "--wav", wav, "--speed", str(speed), "--base-url", base_url, "--api-key", "fake-key"],
+            stdout=subprocess.PIPE, text=True, env=env)
+        server.stdout.readline()  # "listening on ..."
+        connections = [await subscribe(address) for _ in range(clients)]
+        latencies: list[float] = []
+        receivers = [asyncio.ensure_future(receive(reader, latencies)) for reader, _ in connections]
+
+        control, control_writer = await daemon.open_connection(address)
+        control_writer.write(b'{"op":"start"}\n')
+        reply = json.loads(await control.readline())
+        if reply["event"] != "ok":
+            return [f"start failed: {reply}"]
+        with open(wav, "rb") as f:
+            seconds = (len(f.read()) - 44) / 32000
+        await asyncio.sleep(seconds / speed + 0.5)
+        control_writer.write(b'{"op":"stop"}\n')
+        await control.readline()
+        results = await asyncio.wait_for(asyncio.gather(*receivers), 30)
+        for _, writer in connections:
+            writer.close()
+        control_writer.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        fake.terminate()
+        fake.wait()
+
+    final = results[0][1]
+    print(f"end to end: {clients} subscribers, {seconds:.1f} s of audio at {speed:.0f}x, "
+          f"{len(latencies) // clients} text events, {len(final or '')} characters")
+    print(f"  delivery  {percentiles(latencies)}")
+    errors = []
+    if not final:
+        errors.append("the session produced no text")
+    wrong = sum(1 for received, text in results if received.strip() != final or text != final)
+    if wrong:
+        errors.append(f"{wrong} of {clients} subscribers received different text")
+    return errors
+
+
+async def flood(directory: str, clients: int, stalled: int, events: int, rate: float) -> tuple[list[str], float]:
+    server = daemon.DictationServer(address=address_in(directory, "flood"))
+    server.start()
+    try:
+        connections = [await subscribe(server._address) for _ in range(clients)]
+        stalled_connections = [await subscribe(server._address) for _ in range(stalled)]
+        for _, writer in stalled_connections:
+            writer.transport.pause_reading()  # stop reading from the socket at all
+        latencies: list[float] = []
+        receivers = [asyncio.ensure_future(receive(reader, latencies)) for reader, _ in connections]
+
+        # Long enough words that a stalled subscriber's unread text passes MAX_PENDING_BYTES
+        # with room to spare for the kernel's socket buffers.
+        pad = "x" * max(0, 3 * daemon.MAX_PENDING_BYTES // events - 12)
+        words = [f" word{n}{pad}" for n in range(events)]
+        costs: list[float] = []
+
+        async def publish_all():
+            # On the server's loop, like text deltas arriving from a transcription session.
+            batch = max(1, int(rate / 200))
+            next_at = time.monotonic()
+            for start in range(0, events, batch):
+                for word in words[start:start + batch]:
+                    started = time.perf_counter()
+                    server.publish({"event": "text", "session": 1, "text": word})
+                    costs.append(time.perf_counter() - started)
+                next_at += batch / rate
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            # Without the text: the flood's is more than any client may have pending.
+            server.publish({"event": "finished", "session": 1, "text": "", "error": None})
+
+        started = time.monotonic()
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(publish_all(), server._loop))
+        results = await asyncio.wait_for(asyncio.gather(*receivers), 60)
+        elapsed = time.monotonic() - started
+        merged = sum(client.merged for client in server._clients)
+        for _, writer in connections + stalled_connections:
+            writer.close()
+    finally:
+        server.close()
+
+    costs.sort()
+    per_event = sum(costs) / len(costs)
+    print(f"flood: {events} text events at {rate:.0f}/s to {clients} subscribers + {stalled} stalled, "
+          f"{elapsed:.1f} s")
+    print(f"  publish   mean {per_event * 1e6:6.1f} µs  p99 {costs[int(len(costs) * 0.99)] * 1e6:6.1f} µs per event "
+          f"({per_event / (clients + stalled) * 1e9:.0f} ns per subscriber)")
+    print(f"  delivery  {percentiles(latencies)}  ({len(latencies)} events received, {merged} deltas merged "
+          f"for lagging subscribers)")
+    print(f"  stalled subscribers disconnected: {server.dropped_clients} of {stalled}")
+    errors = []
+    expected = "".join(words)
+    wrong = sum(1 for received, _ in results if received != expected)
+    if wrong:
+        errors.append(f"{wrong} of {clients} fast subscribers received different text")
+    if server.dropped_clients != stalled:
+        errors.append(f"{server.dropped_clients} subscribers were disconnected, expected the {stalled} stalled ones")
+    return errors, per_event
+
+
+async def main_async(args) -> list[str]:
+    directory = tempfile.mkdtemp()
+    try:
+        fixtures = write_fixtures(directory, args.seconds)
+        errors = await end_to_end(directory, args.clients, fixtures["continuous_speech"], args.speed)
+        flood_errors, per_event = await flood(directory, args.clients, args.stalled, args.events, args.rate)
+        errors += flood_errors
+        if per_event * 1e6 > args.max_publish_us:
+            errors.append(f"publishing costs {per_event * 1e6:.0f} µs per event")
+        return errors
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--stalled", type=int, default=3)
+    parser.add_argument("--events", type=int, default=40_000, help="text deltas in the flood")
+    parser.add_argument("--rate", type=float, default=2000.0, help="text deltas per second in the flood")
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of the end-to-end dictation")
+    parser.add_argument("--speed", type=float, default=4.0, help="playback speed of the dictation audio")
+    parser.add_argument("--max-publish-us", type=float, default=500.0)
+    args = parser.parse_args()
+
+    errors = asyncio.run(main_async(args))
+    for error in errors:
+        print(f"  !! {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Capture front end: CPU per second of audio, and chunk-boundary golden checks.
+
+Feeds a deterministic test signal (a speech-like tone sweep at a low level,
+noise and a DC offset) through dsp.FrontEnd for the formats a mic commonly
+delivers. For each one it reports the CPU time spent per second of audio, then
+checks that feeding the same input in one piece, in device-sized buffers and
+in random sizes down to single samples gives the same number of output samples
+and the same samples to within 1 LSB, and that the one-piece output matches
+the golden file in benchmarks/golden/. Exits non-zero on any mismatch.
+
+    python benchmarks/bench_dsp.py [--seconds S] [--update-golden]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dsp import SAMPLE_RATE, FrontEnd  # noqa: E402
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+GOLDEN_SECONDS = 2.0
+
+# name: (input rate, sample dtype, channels, front end options)
+CASES = {
+    "48k-f32": (48_000, np.float32, 1, {}),
+    "44k1-f32": (44_100, np.float32, 1, {}),
+    "48k-f32-stereo": (48_000, np.float32, 2, {}),
+    "16k-s16": (SAMPLE_RATE, np.int16, 1, {}),
+    "48k-f32-agc": (48_000, np.float32, 1, {"agc": True}),
+}
+
+
+def signal(rate: int, seconds: float, dtype, channels: int) -> bytes:
+    """A quiet tone sweep with bursts of silence, noise and a DC offset, as raw capture bytes."""
+    rng = np.random.default_rng(19)
+    t = np.arange(int(rate * seconds)) / rate
+    sweep = np.sin(2 * np.pi * (200 + 1800 * t / seconds) * t)
+    bursts = (np.sin(2 * np.pi * 2.5 * t) > -0.3).astype(float)  # ~60% "speech", 40% silence
+    x = 0.02 * sweep * bursts + 0.002 * rng.standard_normal(t.size) + 0.05
+    x = np.repeat(x[:, None], channels, axis=1) * np.linspace(1.0, 0.8, channels)
+    if dtype == np.int16:
+        return np.rint(x * 32767).astype(np.int16).tobytes()
+    return x.astype(np.float32).tobytes()
+
+
+def run(front_end: FrontEnd, data: bytes, sizes) -> np.ndarray:
+    """Feed `data` in pieces of the byte sizes `sizes` yields; return all output samples."""
+    out, pos = [], 0
+    while pos < len(data):
+        n = next(sizes)
+        out.append(front_end.process(data[pos:pos + n]))
+        pos += n
+    return np.frombuffer(b"".join(out), dtype=np.int16)
+
+
+def cpu_per_second(case, seconds: float) -> float:
+    rate, dtype, channels, options = case
+    frame = np.dtype(dtype).itemsize * channels
+    data = signal(rate, seconds, dtype, channels)
+    front_end = FrontEnd(rate, dtype, channels, **options)
+    buffer = rate // 10 * frame  # 100 ms device buffers, like AudioCapture
+    started = time.process_time()
+    run(front_end, data, iter(lambda: buffer, None))
+    return (time.process_time() - started) / seconds
+
+
+def check(name: str, case, update: bool) -> list[str]:
+    rate, dtype, channels, options = case
+    frame = np.dtype(dtype).itemsize * channels
+    data = signal(rate, GOLDEN_SECONDS, dtype, channels)
+    whole = run(FrontEnd(rate, dtype, channels, **options), data, iter(lambda: len(data), None))
+    errors = []
+
+    rng = np.random.default_rng(7)
+    chunkings = {
+        "device buffers": iter(lambda: rate // 10 * frame, None),
+        "odd buffers": iter(lambda: 441 * frame, None),
+        "single samples": iter(lambda: frame, None),
+        "random sizes": iter(lambda: int(rng.integers(1, 4000)) * frame, None),
+    }
+    for label, sizes in chunkings.items():
+        pieces = run(FrontEnd(rate, dtype, channels, **options), data, sizes)
+        if pieces.size != whole.size:
+            errors.append(f"{label}: {pieces.size} samples out, {whole.size} in one piece")
+            continue
+        diff = np.abs(pieces.astype(np.int32) - whole).max(initial=0)
+        if diff > 1:
+            errors.append(f"{label}: differs from one piece by up to {diff} LSB")
+
+    path = os.path.join(GOLDEN_DIR, f"frontend-{name}.pcm")
+    if update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(whole.tobytes())
+    elif not os.path.exists(path):
+        errors.append(f"no golden file {os.path.relpath(path)}; run with --update-golden")
+    else:
+        golden = np.fromfile(path, dtype=np.int16)
+        if golden.size != whole.size:
+            errors.append(f"golden: {whole.size} samples, golden file has {golden.size}")
+        elif (diff := np.abs(golden.astype(np.int32) - whole).max(initial=0)) > 1:
+            errors.append(f"golden: differs by up to {diff} LSB")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=30.0, help="audio per CPU measurement")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden files")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'format':<16} {'CPU per s of audio':>18}  chunking")
+    for name, case in CASES.items():
+        cpu = cpu_per_second(case, args.seconds)
+        errors = check(name, case, args.update_golden)
+        print(f"{name:<16} {cpu * 1000:15.2f} ms  {'ok' if not errors else 'FAILED'}")
+        for error in errors:
+            print(f"    !! {error}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Transcript history: append and search cost as the log grows past 100k sessions.
+
+Appends `--sessions` synthetic dictations (Zipf-distributed words, 10-60 per
+session, with stats like the app stores) to a TranscriptHistory in a temporary
+directory, with segment sealing and background compaction as in the app. After
+every 10k sessions it reports the mean and worst append time, the mean time of
+a mix of searches (a rare word, a common and a rare word, three common words)
+and of last(), the number of segments and the postings held in memory. At the
+end it reopens the history and checks that planted words are found in exactly
+the sessions that contain them. Exits non-zero if appends or searches in the
+last 10k got more than `--max-growth` times slower than in the first 10k, or on
+a wrong result.
+
+    python benchmarks/bench_history.py [--sessions N] [--max-growth X]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from history import TranscriptHistory  # noqa: E402
+
+BUCKET = 10_000
+VOCABULARY = 30_000
+PLANT_EVERY = 997  # sessions containing the word "zebrafinch"
+FLOOR_US = 20.0  # differences below this are timer noise, not growth
+
+
+def make_words(rng) -> list[str]:
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "de", "po", "an", "er", "is", "ul", "or"]
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(syllables, size=rng.integers(1, 5))))
+    return sorted(words)
+
+
+def make_session(rng, words: list[str], n: int) -> str:
+    ranks = np.minimum(rng.zipf(1.2, size=rng.integers(10, 60)), VOCABULARY) - 1
+    text = " ".join(words[r] for r in ranks)
+    if n % PLANT_EVERY == 0:
+        text += " zebrafinch"
+    return text.capitalize() + "."
+
+
+def time_searches(history: TranscriptHistory, queries: list[str]) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        history.search(query)
+    history.last()
+    return (time.perf_counter() - started) / (len(queries) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=120_000)
+    parser.add_argument("--max-growth", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(22)
+    words = make_words(rng)
+    common, rare = words[:50], words[-2000:]
+    queries = []
+    for i in range(60):
+        queries += [rare[i], f"{common[i % 50]} {rare[i + 100]}", " ".join(common[i % 10:i % 10 + 3])]
+
+    failed = False
+    with tempfile.TemporaryDirectory() as path:
+        history = TranscriptHistory(path)
+        stats = {"stages_ms": {"first_text": 412.0, "end": 3120.5}, "deltas": 14, "lag_p50_ms": 240.1}
+        rows = []
+        print(f"{'sessions':>9} {'append mean':>12} {'append max':>11} {'search':>9} {'segments':>9} "
+              f"{'postings in RAM':>16}")
+        for start in range(0, args.sessions, BUCKET):
+            texts = [make_session(rng, words, n) for n in range(start, min(start + BUCKET, args.sessions))]
+            times = []
+            for text in texts:
+                t = time.perf_counter()
+                history.append(text, time.time(), stats)
+                times.append(time.perf_counter() - t)
+            append_mean = sum(times) / len(times)
+            search = time_searches(history, queries)
+            rows.append((append_mean, search))
+            print(f"{start + len(texts):9d} {append_mean * 1e6:9.1f} µs {max(times) * 1e3:8.1f} ms "
+                  f"{search * 1e6:6.0f} µs {len(history._sealed) + 1:9d} {len(history._active_hashes):16d}")
+        history.close()
+
+        reopened = TranscriptHistory(path)
+        found = sorted(r["id"] for r in reopened.search("zebrafinch", limit=args.sessions))
+        expected = list(range(0, args.sessions, PLANT_EVERY))
+        last = reopened.last()
+        reopened.close()
+
+    errors = []
+    if found != expected:
+        errors.append(f"'zebrafinch' found in {len(found)} sessions, planted in {len(expected)}")
+    if last is None or last["id"] != args.sessions - 1:
+        errors.append(f"last() after reopening returned {last and last['id']}")
+    for label, index in (("append", 0), ("search", 1)):
+        first, final = rows[0][index], rows[-1][index]
+        if final * 1e6 > first * 1e6 * args.max_growth + FLOOR_US:
+            errors.append(f"{label} went from {first * 1e6:.1f} to {final * 1e6:.1f} µs")
+    for error in errors:
+        print(f"  !! {error}")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
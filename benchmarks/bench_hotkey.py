@@ -0,0 +1,278 @@
+"""Per-event cost of the global keyboard hook, plus modifier edge-case checks.
+
+Pushes synthetic `keyboard.KeyboardEvent` streams through the hook callback of
+`GlobalHotkey` without installing a real hook. Also checks push-to-talk: a
+hold combo starts on key-down and stops on key-up within 10 ms of the
+events' timestamps, reports those timestamps as the start and stop times,
+and handles auto-repeat and debounce per combo. The old implementation's OS
+modifier query (`keyboard.is_pressed`) is replaced by the stream's own key
+state, so the numbers are the hook's Python cost alone; on Windows each real
+`is_pressed` call comes on top, five of them for every press of a hotkey's key.
+The current hook never queries the OS.
+
+    python benchmarks/bench_hotkey.py [--events N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import keyboard
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import hotkey  # noqa: E402
+from harness import Qt  # noqa: E402
+
+COMBOS = ["Win+H", "Win+Shift+F23", "Ctrl+Alt+D"]
+SCAN_CODES = {"left ctrl": 29, "right ctrl": 29, "left shift": 42, "right shift": 54, "alt": 56,
+              "left windows": 91, "right windows": 92, "h": 35, "d": 32, "f23": 110, "esc": 1}
+OS_NAMES = {"left ctrl": "ctrl", "right ctrl": "ctrl", "left shift": "shift", "right shift": "shift",
+            "alt": "alt", "left windows": "win", "right windows": "win"}
+
+
+class FakeKeyboard:
+    """Synthetic key stream whose physical state stands in for the OS's."""
+
+    def __init__(self):
+        self.down: set[str] = set()
+
+    def event(self, kind: str, name: str, at: float | None = None) -> keyboard.KeyboardEvent:
+        """A key event stamped now, or at time.time() `at`."""
+        if kind == "down":
+            self.down.add(name)
+        else:
+            self.down.discard(name)
+        return keyboard.KeyboardEvent(kind, SCAN_CODES.get(name, 30), name=name, time=at)
+
+    def active_modifiers(self) -> set[str]:
+        return {OS_NAMES[n] for n in self.down if n in OS_NAMES}
+
+
+class LegacyHotkey(hotkey.GlobalHotkey):
+    """The previous hook: linear scan over combos, OS query on every key-name match."""
+
+    query = None  # the OS's held modifier names; set from the FakeKeyboard
+
+    def start(self):
+        self._parsed = [hotkey._parse_combo(c) for c in self._combos]
+        self._last_trigger = 0.0
+        self.on_event = self._on_event
+
+    def _on_event(self, event):
+        if not event.name:
+            return True
+        name = event.name.lower()
+        if event.event_type != "down":
+            return True
+        now = time.monotonic()
+        active = None
+        for modifiers, key in self._parsed:
+            if name == key:
+                if active is None:
+                    active = self.query()
+                if active == modifiers:
+                    if now - self._last_trigger > 1.0:
+                        self._last_trigger = now
+                        self.triggered.emit(now, False)
+                    return False
+        return True
+
+
+_alive = []  # GlobalHotkeys whose matcher is in use; the QObject owns the signal it fires
+
+
+def _make(cls, kb: FakeKeyboard, options: dict[str, dict] | None = None):
+    """Start a hotkey object without a real hook; returns (owner of `on_event`, fired list)."""
+    hk = cls(COMBOS, options) if options else cls(COMBOS)
+    fired = []
+    hk.triggered.connect(lambda at, hold: fired.append(1), Qt.ConnectionType.DirectConnection)
+    if cls is LegacyHotkey:
+        hk.query = kb.active_modifiers
+        hk.start()
+        return hk, fired
+    hook, hotkey.keyboard.hook = hotkey.keyboard.hook, lambda *a, **k: None
+    try:
+        hk.start()
+    finally:
+        hotkey.keyboard.hook = hook
+    _alive.append(hk)
+    return hk._matcher, fired
+
+
+def typing_stream(kb: FakeKeyboard, n: int) -> list[keyboard.KeyboardEvent]:
+    """Prose-like typing: mostly letters (plenty of 'h'), some Shift capitals and Ctrl chords."""
+    rng = random.Random(1)
+    events = []
+    letters = "etaoinshrdlucmfwypvbgkjqxz" + "hhh"
+    while len(events) < n:
+        r = rng.random()
+        key = rng.choice(letters)
+        if r < 0.08:
+            events += [kb.event("down", "left shift"), kb.event("down", key), kb.event("up", key),
+                       kb.event("up", "left shift")]
+        elif r < 0.10:
+            events += [kb.event("down", "left ctrl"), kb.event("down", key), kb.event("up", key),
+                       kb.event("up", "left ctrl")]
+        else:
+            events += [kb.event("down", key), kb.event("up", key)]
+    kb.down.clear()
+    return events
+
+
+def bench(cls, events, repeat: int = 5) -> float:
+    kb = FakeKeyboard()
+    hk, _ = _make(cls, kb)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for event in events:
+            hk.on_event(event)
+        best = min(best, (time.perf_counter_ns() - t0) / len(events))
+    return best
+
+
+def check_edge_cases():
+    def run(*steps, lose_up=(), unlock_after=None):
+        kb = FakeKeyboard()
+        hk, fired = _make(hotkey.GlobalHotkey, kb)
+        results = []
+        for i, (kind, name) in enumerate(steps):
+            event = kb.event(kind, name)
+            if not (kind == "up" and name in lose_up):  # else the hook never sees it
+                results.append(hk.on_event(event))
+            if i == unlock_after:
+                hk.resync(hotkey._modifier_mask(kb.active_modifiers()))  # as resync_modifiers on unlock
+        return hk, fired, results
+
+    # Left and right Win are tracked separately: releasing one keeps Win held.
+    _, fired, _ = run(("down", "left windows"), ("down", "right windows"), ("up", "left windows"),
+                      ("down", "h"))
+    assert fired == [1], "Win+H with right Win still held"
+    # Same scan code, different side: left/right Ctrl released in either order.
+    hk, _, _ = run(("down", "left ctrl"), ("down", "right ctrl"), ("up", "left ctrl"))
+    assert hk.mods == hotkey.MOD_CTRL, "right Ctrl still held"
+    hk, _, _ = run(("down", "left ctrl"), ("down", "right ctrl"), ("up", "right ctrl"), ("up", "left ctrl"))
+    assert hk.mods == 0, "both Ctrls released"
+    # Stuck key: Ctrl's up was lost (e.g. to the secure desktop); the resync on unlock drops it.
+    hk, fired, _ = run(("down", "left ctrl"), ("up", "left ctrl"), ("down", "left windows"), ("down", "h"),
+                       lose_up={"left ctrl"})
+    assert fired == [] and hk.mods == hotkey.MOD_CTRL | hotkey.MOD_WIN, "stuck Ctrl until resynced"
+    hk, fired, _ = run(("down", "left ctrl"), ("up", "left ctrl"), ("down", "left windows"), ("down", "h"),
+                       lose_up={"left ctrl"}, unlock_after=1)
+    assert fired == [1] and hk.mods == hotkey.MOD_WIN, "stuck Ctrl resynced"
+    # Extra modifiers held: Win+Shift+H is not Win+H, and the key passes through.
+    _, fired, results = run(("down", "left windows"), ("down", "left shift"), ("down", "h"))
+    assert fired == [] and results[-1] is True, "Win+Shift+H passes through"
+    # Auto-repeat of the hotkey key is suppressed but fires once.
+    _, fired, results = run(("down", "left windows"), ("down", "h"), ("down", "h"), ("down", "h"))
+    assert fired == [1] and results[-3:] == [False, False, False], "repeats suppressed"
+    # Three-modifier combo with a non-letter key.
+    _, fired, _ = run(("down", "left windows"), ("down", "right shift"), ("down", "f23"))
+    assert fired == [1], "Win+Shift+F23"
+    # Esc is reported only while watched, and always passed through.
+    kb = FakeKeyboard()
+    hk, _ = _make(hotkey.GlobalHotkey, kb)
+    owner = _alive[-1]
+    escapes = []
+    owner.escape_pressed.connect(lambda: escapes.append(1), Qt.ConnectionType.DirectConnection)
+    assert hk.on_event(kb.event("down", "esc")) is True and escapes == [], "Esc ignored when not watched"
+    owner.set_watch_escape(True)
+    assert hk.on_event(kb.event("down", "esc")) is True and escapes == [1], "Esc reported when watched"
+    print("modifier edge cases: ok")
+
+
+def check_push_to_talk():
+    hold = {"Win+H": {"mode": "hold"}}
+
+    def make(options):
+        kb = FakeKeyboard()
+        matcher, _ = _make(hotkey.GlobalHotkey, kb, options)
+        owner = _alive[-1]
+        log = []  # (kind, reported time.monotonic(), seconds from the event's timestamp to the decision)
+        pending = {}
+
+        def record(kind, at):
+            log.append((kind, at, time.time() - pending["event"].time))
+
+        owner.triggered.connect(lambda at, hold: record("start", at), Qt.ConnectionType.DirectConnection)
+        owner.released.connect(lambda at: record("stop", at), Qt.ConnectionType.DirectConnection)
+
+        def feed(kind, name, ago=None):
+            event = kb.event(kind, name, None if ago is None else time.time() - ago)
+            pending["event"] = event
+            return matcher.on_event(event), event
+        return feed, log
+
+    # Hold: start on key-down, auto-repeat swallowed, stop on key-up; decisions within 10 ms.
+    feed, log = make(hold)
+    feed("down", "left windows")
+    suppressed, down = feed("down", "h")
+    for _ in range(10):
+        assert feed("down", "h")[0] is False, "repeat suppressed"
+    _, up = feed("up", "h")
+    feed("up", "left windows")
+    assert [kind for kind, _, _ in log] == ["start", "stop"], f"hold: one start and one stop, got {log}"
+    assert suppressed is False, "combo key suppressed"
+    worst = max(delay for _, _, delay in log)
+    assert worst < 0.010, f"decision {worst * 1000:.1f} ms after the event"
+    # The reported times are the events' own, not when they were handled.
+    feed, log = make(hold)
+    feed("down", "left windows")
+    feed("down", "h", ago=0.8)
+    feed("up", "h", ago=0.3)
+    (_, started, _), (_, stopped, _) = log
+    assert abs((stopped - started) - 0.5) < 0.002, f"hold length {stopped - started:.3f} s, expected 0.5 s"
+    assert abs(time.monotonic() - stopped - 0.3) < 0.002, "stop time is the key-up's timestamp"
+    # Debounce: a key-up bounce right after the release doesn't start a new dictation.
+    feed, log = make(hold)
+    feed("down", "left windows")
+    feed("down", "h", ago=0.5)
+    feed("up", "h", ago=0.1)
+    feed("down", "h", ago=0.095)
+    feed("up", "h", ago=0.09)
+    feed("down", "h")  # a real new press, 100 ms after the release
+    assert [kind for kind, _, _ in log] == ["start", "stop", "start"], f"hold debounce, got {log}"
+    # Toggle, repeat "ignore": holding the key toggles once, however long.
+    feed, log = make({"Win+H": {"mode": "toggle", "debounce_ms": 200}})
+    feed("down", "left windows")
+    for i in range(40):
+        feed("down", "h", ago=2.0 - i * 0.033)
+    assert len(log) == 1, f"toggle ignores repeats, got {len(log)} triggers"
+    feed("up", "h", ago=0.6)
+    feed("down", "h", ago=0.5)
+    assert len(log) == 2 and log[-1][0] == "start", "toggle: a fresh press after the debounce triggers"
+    # Toggle, repeat "retrigger": repeats toggle again once the debounce has passed.
+    feed, log = make({"Win+H": {"mode": "toggle", "debounce_ms": 300, "repeat": "retrigger"}})
+    feed("down", "left windows")
+    for i in range(31):
+        feed("down", "h", ago=1.1 - i * 0.033)
+    assert len(log) == 4, f"retrigger on the first repeat 300 ms after each trigger (0, 0.33, 0.66, 0.99 s), got {len(log)}"
+    print(f"push-to-talk: ok (start/stop decided within {worst * 1000:.2f} ms of the key events)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+
+    check_edge_cases()
+    check_push_to_talk()
+    events = typing_stream(FakeKeyboard(), args.events)
+    legacy = bench(LegacyHotkey, events)
+    current = bench(hotkey.GlobalHotkey, events)
+    print(f"{len(events)} events of synthetic typing (hook cost, excluding OS queries):")
+    print(f"  legacy : {legacy:7.0f} ns/event")
+    print(f"  current: {current:7.0f} ns/event")
+    kb = FakeKeyboard()
+    calls = []
+    legacy_hk, _ = _make(LegacyHotkey, kb)
+    legacy_hk.query = lambda: calls.append(1) or kb.active_modifiers()
+    for event in events:
+        legacy_hk.on_event(event)
+    print(f"  legacy OS modifier queries: {len(calls)} ({len(calls) * 5} is_pressed calls); current: none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Idle footprint: memory and threads between dictations, before and after the idle release.
+
+Runs the app in a fresh interpreter (offscreen Qt, throwaway config dir with
+`--idle-s` as the idle release timeout) against the fake realtime server, with
+a WAV fixture as the mic. It dictates once, waits for the idle release, then
+dictates again. Reports RSS and thread counts once the app is up, right after
+the dictation and after the release, and how long the second dictation took
+to get a session and its first text compared with the first, i.e. what
+rebuilding the released parts costs the next hotkey.
+
+Exits non-zero if the idle RSS exceeds `--max-idle-mb`, if the release
+doesn't end the threads the dictation started, or if either dictation fails.
+
+Off Windows the keyboard hook, Win32 calls and sounds are replaced with no-ops
+in the child; everything else is the real app.
+
+    python benchmarks/bench_idle.py [--idle-s S] [--max-idle-mb MB]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, ".."))
+sys.path.insert(0, ROOT)
+
+from fixtures import write_fixtures  # noqa: E402
+
+CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+if sys.platform != "win32":
+    import ctypes
+
+    class _NoOp:  # any DLL, function or attribute; calls succeed
+        def __getattr__(self, name):
+            value = _NoOp()
+            setattr(self, name, value)
+            return value
+
+        def __call__(self, *args, **kwargs):
+            return 1
+
+    ctypes.windll = _NoOp()
+    import keyboard
+    keyboard.hook = _NoOp()
+import main
+if sys.platform != "win32":
+    main._play_sound = lambda name: None
+import audio, footprint, realtime
+from PySide6.QtCore import QTimer, Qt
+from PySide6.QtWidgets import QApplication
+
+realtime.BASE_URL = {base_url!r}
+results = {{"snapshots": {{}}, "sessions": []}}
+traces = []
+
+
+def scenario(app):
+    app._core.audio._device_factory = lambda: audio.WavFileDevice({wav!r}, 4.0)
+    app._core.session_started.connect(traces.append, Qt.ConnectionType.DirectConnection)
+    results["snapshots"]["ready"] = footprint.snapshot()
+    yield 0.5
+    for n in range(2):
+        app._start_recording(hotkey_at=time.monotonic())
+        yield {seconds} / 4.0 + 0.3
+        app._stop_recording()
+        deadline = time.monotonic() + 15
+        while (app._recording or app._traces) and time.monotonic() < deadline:
+            yield 0.05
+        results["sessions"].append(traces[-1].record() if traces else None)
+        if n == 0:
+            results["snapshots"]["after dictation"] = footprint.snapshot()
+            deadline = time.monotonic() + {idle_s} + 15
+            while app._idle_footprint is None and time.monotonic() < deadline:
+                yield 0.1
+            results["snapshots"]["idle"] = app._idle_footprint
+            results["event_loop_after_release"] = realtime.has_event_loop()
+            results["overlay_after_release"] = app._overlay_widget is not None
+
+
+def run(steps):
+    try:
+        delay = next(steps)
+    except StopIteration:
+        print("RESULTS " + json.dumps(results), flush=True)
+        sys.stdout.flush()
+        os._exit(0)
+    QTimer.singleShot(int(delay * 1000), lambda: run(steps))
+
+
+ensure = main.App._ensure_components
+def ensure_then_run(self):
+    ready = self._components_ready
+    ensure(self)
+    if not ready:
+        QTimer.singleShot(0, lambda: run(scenario(self)))
+main.App._ensure_components = ensure_then_run
+main.main()
+"""
+
+
+def fmt_snapshot(snapshot: dict | None) -> str:
+    if snapshot is None:
+        return "(not reached)"
+    rss = "?" if snapshot["rss_mb"] is None else f"{snapshot['rss_mb']:6.1f} MB"
+    return f"{rss}  {snapshot['threads']:3d} threads ({snapshot['python_threads']} Python)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--idle-s", type=int, default=2, help="idle release timeout in the child")
+    parser.add_argument("--seconds", type=float, default=4.0, help="length of each dictation's audio")
+    parser.add_argument("--max-idle-mb", type=float, default=200.0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    fake = subprocess.Popen([sys.executable, os.path.join(HERE, "fake_realtime_server.py"), "--token-ms", "20"],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        base_url = fake.stdout.readline().strip()
+        wav = write_fixtures(directory, args.seconds)["speech_with_pauses"]
+        os.makedirs(os.path.join(directory, "dictation_hotkey"))
+        with open(os.path.join(directory, "dictation_hotkey", "config.json"), "w") as f:
+            json.dump({"api_key": "fake-key", "idle_release_timeout": args.idle_s, "history": False}, f)
+        env = dict(os.environ, APPDATA=directory)
+        if sys.platform != "win32":
+            env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        code = CHILD.format(root=ROOT, base_url=base_url, wav=wav, seconds=args.seconds, idle_s=args.idle_s)
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                             timeout=args.idle_s + 4 * args.seconds + 60)
+    finally:
+        fake.terminate()
+        fake.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+    lines = [line for line in out.stdout.splitlines() if line.startswith("RESULTS ")]
+    if not lines:
+        print(out.stderr)
+        sys.exit("the app didn't finish the scenario")
+    results = json.loads(lines[-1][len("RESULTS "):])
+
+    snapshots = results["snapshots"]
+    for name in ("ready", "after dictation", "idle"):
+        print(f"{name:<16} {fmt_snapshot(snapshots.get(name))}")
+    print(f"after the release: event loop {'running' if results['event_loop_after_release'] else 'stopped'}, "
+          f"overlay {'kept' if results['overlay_after_release'] else 'released'}")
+
+    errors = []
+    sessions = results["sessions"]
+    if len(sessions) != 2 or any(s is None or "first_text" not in s.get("stages_ms", {}) for s in sessions):
+        errors.append("a dictation produced no text")
+    else:
+        for stage, label in (("session_created", "Hotkey → session ready"), ("first_text", "Hotkey → first text")):
+            print(f"{label:<24} first {sessions[0]['stages_ms'][stage]:6.0f} ms   "
+                  f"after the release {sessions[1]['stages_ms'][stage]:6.0f} ms")
+    idle = snapshots.get("idle")
+    if idle is None:
+        errors.append("the idle release didn't happen")
+    else:
+        if idle["rss_mb"] is not None and idle["rss_mb"] > args.max_idle_mb:
+            errors.append(f"idle RSS {idle['rss_mb']:.1f} MB is over the {args.max_idle_mb:.0f} MB ceiling")
+        if idle["threads"] >= snapshots["after dictation"]["threads"] or results["event_loop_after_release"]:
+            errors.append("the release left the dictation's threads running")
+    for error in errors:
+        print(f"  !! {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
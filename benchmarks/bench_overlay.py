@@ -0,0 +1,163 @@
+"""Overlay repaints under a flood of text deltas and level updates (offscreen Qt).
+
+Shows the real OverlayWidget in recording mode and feeds it `--delta-rate`
+text deltas and `--level-rate` level updates per second from a worker thread,
+posted as queued calls to the overlay's slots: the same cross-thread delivery
+as the signals main.py connects from the transcription and capture threads.
+(`QMetaObject.invokeMethod` rather than `Signal.emit`: in PySide6 6.12 on
+Python 3.11 every emit drops a reference to True, and the thousands a flood
+takes abort the interpreter.)
+Counts paint events on the overlay window and its children over the run and
+compares them with the number of display frames that passed; also measures
+how late a 5 ms probe timer fires, i.e. whether the event loop stays
+responsive. Exits non-zero if the overlay repaints more than once per frame,
+the event loop stalls, or the preview doesn't end with the last text sent.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_overlay.py [--seconds S] [--delta-rate N] [--level-rate N]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PySide6.QtCore import Q_ARG, QEvent, QEventLoop, QMetaObject, QObject, Qt, QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from overlay import PREVIEW_CHARS, OverlayWidget  # noqa: E402
+
+STALL_LIMIT_MS = 50.0
+
+
+class PaintCounter(QObject):
+    """Event filter counting paint events per widget."""
+
+    def __init__(self):
+        super().__init__()
+        self.counts: dict[str, int] = {}
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            name = type(obj).__name__
+            self.counts[name] = self.counts.get(name, 0) + 1
+        return super().eventFilter(obj, event)
+
+
+class Feeder:
+    """Sends text deltas and level updates at fixed rates from a worker thread, in 1 ms bursts."""
+
+    def __init__(self, overlay: OverlayWidget, delta_rate: float, level_rate: float):
+        self._overlay = overlay
+        self._delta_rate = delta_rate
+        self._level_rate = level_rate
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.sent: list[str] = []
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _post(self, slot: str, arg):
+        QMetaObject.invokeMethod(self._overlay, slot, Qt.ConnectionType.QueuedConnection, arg)
+
+    def _run(self):
+        started = time.perf_counter()
+        deltas = levels = 0
+        while not self._stop.wait(0.001):
+            elapsed = time.perf_counter() - started
+            while deltas < elapsed * self._delta_rate:
+                text = f" w{deltas}"
+                self.sent.append(text)
+                self._post("append_preview", Q_ARG(str, text))
+                deltas += 1
+            while levels < elapsed * self._level_rate:
+                self._post("set_level", Q_ARG(float, -60.0 + 55.0 * ((levels * 7) % 11) / 10))
+                levels += 1
+
+
+def measure(app: QApplication, overlay: OverlayWidget, counter: PaintCounter,
+            seconds: float, delta_rate: float, level_rate: float):
+    counter.counts.clear()
+
+    lateness = []
+    probe = QTimer()
+    probe.setInterval(5)
+    last = [time.perf_counter()]
+
+    def on_probe():
+        now = time.perf_counter()
+        lateness.append((now - last[0]) * 1000 - 5)
+        last[0] = now
+
+    probe.timeout.connect(on_probe)
+
+    feeder = Feeder(overlay, delta_rate, level_rate)
+    started = time.perf_counter()
+    probe.start()
+    feeder.start()
+    QTimer.singleShot(round(seconds * 1000), feeder.stop)
+    loop = QEventLoop(app)  # not app.exec(): quitting the application would close the overlay
+    QTimer.singleShot(round(seconds * 1000) + 100, loop.quit)  # let the last frame and the meter decay settle
+    loop.exec()
+    probe.stop()
+    elapsed = time.perf_counter() - started
+    return dict(counter.counts), sorted(lateness), feeder.sent, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--delta-rate", type=float, default=2000.0, help="text deltas per second")
+    parser.add_argument("--level-rate", type=float, default=500.0, help="level updates per second")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    overlay = OverlayWidget()
+    overlay.reset_live()
+    overlay.show_status("🎙️ Listening...", recording=True)
+    frame_ms = overlay._frame_timer.interval()
+    counter = PaintCounter()
+    for widget in [overlay, *overlay.findChildren(QObject)]:
+        widget.installEventFilter(counter)
+
+    idle, _, _, idle_elapsed = measure(app, overlay, counter, 1.0, 0.0, 0.0)
+    counts, lateness, sent, elapsed = measure(app, overlay, counter, args.seconds, args.delta_rate, args.level_rate)
+
+    frames = elapsed * 1000 / frame_ms
+    paints = counts.get("OverlayWidget", 0)
+    idle_paints = idle.get("OverlayWidget", 0) / idle_elapsed * elapsed  # the pulsing dot alone
+    expected = "".join(sent)[-PREVIEW_CHARS:].strip()
+    preview = overlay._preview.strip()
+    worst = lateness[-1] if lateness else 0.0
+    p99 = lateness[int(len(lateness) * 0.99)] if lateness else 0.0
+
+    print(f"{len(sent)} deltas and ~{args.level_rate * args.seconds:.0f} level updates in {args.seconds:.1f} s, "
+          f"frame {frame_ms} ms ({frames:.0f} frames)")
+    print(f"  overlay repaints: {paints} ({paints / frames:.2f} per frame; "
+          f"{idle_paints:.0f} expected from the pulsing dot alone)")
+    print("  by widget: " + ", ".join(f"{name} {n}" for name, n in sorted(counts.items())))
+    print(f"  event loop lateness: p99 {p99:.1f} ms, max {worst:.1f} ms")
+
+    errors = []
+    if paints > frames + 5:
+        errors.append(f"{paints} repaints in {frames:.0f} frames")
+    if worst > STALL_LIMIT_MS:
+        errors.append(f"event loop stalled for {worst:.0f} ms")
+    if not preview or not expected.endswith(preview.lstrip("…")):
+        errors.append(f"preview {preview[-30:]!r} doesn't end with the last text sent {expected[-30:]!r}")
+    for error in errors:
+        print(f"  !! {error}")
+    # Skip interpreter teardown: some PySide6 builds crash destroying widgets that have painted.
+    sys.stdout.flush()
+    os._exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
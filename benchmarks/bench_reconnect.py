@@ -0,0 +1,138 @@
+"""Dictations over a flaky connection: reconnect, replay and de-duplication.
+
+Runs the real TranscriptionWorker against FakeRealtimeServer in its
+`encoded_words` mode, with the server aborting the connection at random audio
+messages (`--drop-rate`). The fake mic speaks word n as 300 ms of samples with
+value n followed by 100 ms of silence, so the final text must be exactly
+"w1 w2 ... wN": a gap means replayed audio was lost, a repeat means the overlap
+with the reopened session wasn't removed. Exits non-zero on any mismatch and
+reports reconnects and the extra time they cost against drop-free runs.
+
+A scripted case then drops the connection after 8 words, and the two reopened
+connections each after 2 words. Those words repeat the replayed audio, so the
+client is still holding them back when the connection drops again. The text
+must still come out exact.
+
+    python benchmarks/bench_reconnect.py [--trials N] [--words N] [--drop-rate P] [--speed X]
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from fake_realtime_server import FakeRealtimeServer
+from harness import Qt  # also puts the repo root on sys.path
+
+import diagnostics  # noqa: E402
+import realtime  # noqa: E402
+import transcription  # noqa: E402
+from audio import CHUNK_BYTES, PcmRingBuffer  # noqa: E402
+
+
+def speak(ring: PcmRingBuffer, words: int, speed: float):
+    """Write words 1..`words` as encoded audio in 100 ms chunks, `speed` times real time; then close."""
+    samples = CHUNK_BYTES // 2
+    next_at = time.perf_counter()
+    for n in range(1, words + 1):
+        for value in (n, n, n, 0):
+            ring.put_nowait(value.to_bytes(2, "little", signed=True) * samples)
+            next_at += 0.1 / speed
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+    ring.close()
+
+
+def dictate(worker, words: int, speed: float) -> tuple[str, diagnostics.SessionTrace, float]:
+    """One dictation; returns (typed text, trace, seconds from the end of speech to the last text)."""
+    text = []
+    done = threading.Event()
+    worker.text_delta.connect(text.append, Qt.ConnectionType.DirectConnection)
+    worker.session_finished.connect(done.set, Qt.ConnectionType.DirectConnection)
+    ring = PcmRingBuffer()
+    trace = diagnostics.SessionTrace()
+    worker.start("fake-key", ring, trace)
+    speak(ring, words, speed)
+    stopped = time.perf_counter()
+    worker.stop(drain_timeout=30.0)
+    finished = done.wait(40)
+    worker.text_delta.disconnect(text.append)
+    worker.session_finished.disconnect(done.set)
+    if not finished:
+        raise RuntimeError("dictation didn't finish")
+    return "".join(text), trace, time.perf_counter() - stopped
+
+
+def run(words: int, speed: float, trials: int, drop_rate: float, seed: int) -> tuple[list[int], list[float], int]:
+    server = FakeRealtimeServer(encoded_words=True, token_delay=0.02, drop_rate=drop_rate, drop_seed=seed)
+    realtime.BASE_URL = server.start()
+    worker = transcription.TranscriptionWorker()
+    expected = " ".join(f"w{n}" for n in range(1, words + 1))
+    reconnects, tails = [], []
+    try:
+        for trial in range(trials):
+            text, trace, tail = dictate(worker, words, speed)
+            if "error" in trace.extra:
+                raise AssertionError(f"trial {trial}: session failed: {trace.extra['error']}")
+            if text != expected:
+                got, want = text.split(), expected.split()
+                first = next((i for i, (a, b) in enumerate(zip(got, want)) if a != b), min(len(got), len(want)))
+                raise AssertionError(f"trial {trial}: text diverges at word {first}: "
+                                     f"got {got[first:first + 5]}, expected {want[first:first + 5]}")
+            reconnects.append(trace.extra.get("reconnects", 0))
+            tails.append(tail)
+    finally:
+        server.stop()
+    return reconnects, tails, sum(s["dropped"] for s in server.sessions)
+
+
+def held_back_drops(speed: float) -> str:
+    """Three drops, the last two while the reopened session's text is held back; returns the failure, if any."""
+    words = 16
+    server = FakeRealtimeServer(encoded_words=True, token_delay=0.02, drop_after_words={0: 8, 1: 2, 2: 2})
+    realtime.BASE_URL = server.start()
+    try:
+        text, trace, _ = dictate(transcription.TranscriptionWorker(), words, speed)
+    finally:
+        server.stop()
+    expected = " ".join(f"w{n}" for n in range(1, words + 1))
+    replayed = [session["text"].split() for session in server.sessions[1:3]]
+    if [session["dropped"] for session in server.sessions[:3]] != [True] * 3:
+        return "the scripted drops didn't all happen"
+    if any(len(r) != 2 or any(int(w[1:]) > 8 for w in r) for r in replayed):
+        return f"the reopened sessions didn't repeat already emitted words: {replayed}"
+    if text != expected:
+        return f"text after drops inside a held-back phrase: got {text!r}, expected {expected!r}"
+    if trace.extra.get("reconnects") != 3:
+        return f"{trace.extra.get('reconnects', 0)} reconnects, expected 3"
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--drop-rate", type=float, default=0.01, help="chance per audio message of a drop")
+    parser.add_argument("--speed", type=float, default=4.0, help="mic speed relative to real time")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _, clean, _ = run(args.words, args.speed, args.trials, 0.0, args.seed)
+    try:
+        reconnects, flaky, drops = run(args.words, args.speed, args.trials, args.drop_rate, args.seed)
+    except AssertionError as e:
+        print(f"FAILED: {e}")
+        sys.exit(1)
+    print(f"{args.trials} dictations of {args.words} words, drop rate {args.drop_rate:.0%} per audio message:")
+    print(f"  connections dropped: {drops}, reconnects: {sum(reconnects)} (max {max(reconnects)} in one dictation)")
+    print("  text: exact in every dictation, no gaps or repeats")
+    print(f"  end of speech -> last text: clean p50={statistics.median(clean) * 1000:6.0f} ms, "
+          f"flaky p50={statistics.median(flaky) * 1000:6.0f} ms  max={max(flaky) * 1000:6.0f} ms")
+    failure = held_back_drops(args.speed)
+    if failure:
+        print(f"FAILED: {failure}")
+        sys.exit(1)
+    print("  two drops inside a held-back phrase: exact text")
+
+
+if __name__ == "__main__":
+    main()
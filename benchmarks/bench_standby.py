@@ -0,0 +1,59 @@
+"""Time from hotkey to first text delta, with and without a standby session.
+
+Runs the real TranscriptionWorker against FakeRealtimeServer. Each trial starts
+a fake mic that writes 100 ms speech chunks into a ring buffer and records when
+the first `text_delta` arrives. `--connect-ms` and `--session-ms` emulate
+handshake and session creation latency of the real endpoint. Fails unless the
+standby median is below the cold one by at least half of that latency.
+
+    python benchmarks/bench_standby.py [--trials N] [--connect-ms MS] [--session-ms MS]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from fake_realtime_server import FakeRealtimeServer
+from harness import time_to_first_delta  # also puts the repo root on sys.path
+
+import realtime  # noqa: E402
+import transcription  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--connect-ms", type=float, default=150.0)
+    parser.add_argument("--session-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    server = FakeRealtimeServer(connect_delay=args.connect_ms / 1000, session_delay=args.session_ms / 1000)
+    realtime.BASE_URL = server.start()
+    worker = transcription.TranscriptionWorker()
+
+    medians = {}
+    for standby in (False, True):
+        worker.set_standby("fake-key" if standby else None)
+        times = []
+        for _ in range(args.trials):
+            if standby:
+                time.sleep(args.connect_ms / 1000 + args.session_ms / 1000 + 1.5)  # let the standby warm up
+            times.append(time_to_first_delta(worker) * 1000)
+        label = "standby" if standby else "cold"
+        medians[label] = statistics.median(times)
+        print(f"{label:<8} hotkey->first delta: mean={statistics.mean(times):7.1f} ms  "
+              f"min={min(times):7.1f} ms  max={max(times):7.1f} ms")
+    worker.set_standby(None)
+    server.stop()
+
+    required = (args.connect_ms + args.session_ms) / 2
+    saved = medians["cold"] - medians["standby"]
+    print(f"standby saves {saved:.1f} ms of median first delta (at least {required:.1f} ms required)")
+    if saved < required:
+        print(f"  !! standby saves only {saved:.1f} ms, less than half the {args.connect_ms + args.session_ms:.0f} ms "
+              "it takes to connect")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
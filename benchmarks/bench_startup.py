@@ -0,0 +1,146 @@
+"""Cold-start cost: per-module import time and time until the tray is up.
+
+Runs the app in fresh interpreters (offscreen Qt, throwaway config dir) and
+reports, like `python -X importtime`, which modules `main` pulls in before the
+tray appears and what the background preload costs afterwards. Time-to-tray is
+measured from process spawn to `TrayIcon.show`, time-to-ready to the moment the
+audio/transcription/overlay components are built. Exits non-zero when the
+median time-to-tray exceeds `--budget-ms`, so it can gate regressions.
+
+Off Windows the keyboard hook and Win32 calls (session notifications,
+SendInput) are replaced with no-ops in the child; everything else is the real
+startup path.
+
+    python benchmarks/bench_startup.py [--runs N] [--budget-ms MS] [--top N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+CHILD = r"""
+import os, sys, time
+sys.path.insert(0, {root!r})
+if sys.platform != "win32":
+    import ctypes
+
+    class _NoOp:  # any DLL, function or attribute; calls succeed
+        def __getattr__(self, name):
+            value = _NoOp()
+            setattr(self, name, value)
+            return value
+
+        def __call__(self, *args, **kwargs):
+            return 1
+
+    ctypes.windll = _NoOp()
+    import keyboard
+    keyboard.hook = _NoOp()
+import main
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+show = main.TrayIcon.show
+def timed_show(self):
+    show(self)
+    print("tray", time.time(), flush=True)
+main.TrayIcon.show = timed_show
+
+ensure = main.App._ensure_components
+def timed_ensure(self):
+    try:
+        ensure(self)
+        print("ready", time.time(), flush=True)
+    finally:
+        QTimer.singleShot(0, QApplication.quit)
+main.App._ensure_components = timed_ensure
+main.main()
+"""
+
+
+def _env(config_dir: str) -> dict:
+    env = dict(os.environ, APPDATA=config_dir)
+    if sys.platform != "win32":
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def time_to_tray(config_dir: str) -> tuple[float, float]:
+    """One cold start; returns (ms to tray, ms to components ready)."""
+    spawned = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT)],
+        env=_env(config_dir), capture_output=True, text=True, timeout=60,
+    )
+    stamps = dict(line.split() for line in out.stdout.splitlines() if line.startswith(("tray ", "ready ")))
+    if "tray" not in stamps or "ready" not in stamps:
+        raise RuntimeError(f"startup probe failed:\n{out.stderr}")
+    return (float(stamps["tray"]) - spawned) * 1000, (float(stamps["ready"]) - spawned) * 1000
+
+
+def import_profile(code: str, config_dir: str) -> list[tuple[str, int, int, int]]:
+    """`-X importtime` entries of running `code`: (module, depth, self us, cumulative us)."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=_env(config_dir), cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+    entries = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def _print_top(title: str, entries, top: int, depth: int = 0):
+    """Total of the top-level imports, then the costliest entries at `depth`."""
+    print(f"{title}: {sum(e[3] for e in entries if e[1] == 0) / 1000:.1f} ms")
+    level = [e for e in entries if e[1] == depth]
+    for name, _, self_us, cumulative_us in sorted(level, key=lambda e: -e[3])[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f})  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    from main import DEFERRED_MODULES
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, "dictation_hotkey"))
+        with open(os.path.join(config_dir, "dictation_hotkey", "config.json"), "w") as f:
+            json.dump({"api_key": "bench"}, f)  # skip the first-run settings prompt
+
+        startup = import_profile("import main", config_dir)
+        _print_top("Imports before the tray (interpreter + import main)", startup, args.top, depth=1)
+        eager = {e[0] for e in startup} & set(DEFERRED_MODULES)
+        if eager:
+            print(f"  !! deferred modules imported eagerly: {', '.join(sorted(eager))}")
+        loaded = {e[0] for e in startup}
+        deferred = import_profile("import main; " + "; ".join(f"import {m}" for m in DEFERRED_MODULES), config_dir)
+        _print_top("Background preload", [e for e in deferred if e[0] not in loaded], args.top)
+
+        runs = [time_to_tray(config_dir) for _ in range(args.runs)]
+    tray = statistics.median(r[0] for r in runs)
+    ready = statistics.median(r[1] for r in runs)
+    print(f"time to tray : {tray:7.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"time to ready: {ready:7.0f} ms")
+    if tray > args.budget_ms:
+        print("time to tray is over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Throughput and ordering of TypingWorker with a recording SendInput fake.
+
+Streams text deltas into the worker the way `App._on_text_delta` does and
+checks that the recorded key events spell the input back in order. Reports
+SendInput calls, time spent in `type()` (what the GUI thread pays) and time
+until everything is typed, per pacing policy.
+
+    python benchmarks/bench_typing.py [--deltas N] [--delta-chars N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from typing_output import KEYEVENTF_KEYUP, PACING_POLICIES, TypingWorker  # noqa: E402
+
+
+class RecordingBackend:
+    """Stands in for SendInputBackend; records what would have reached the OS."""
+
+    def __init__(self):
+        self.calls = 0
+        self.pastes = 0
+        self.units: list[int] = []
+
+    def send(self, inputs, count: int) -> int:
+        self.calls += 1
+        for i in range(count):
+            if not inputs[i].ki.dwFlags & KEYEVENTF_KEYUP:
+                self.units.append(inputs[i].ki.wScan)
+        return count
+
+    def paste(self, text: str):
+        self.pastes += 1
+        data = text.encode("utf-16-le")
+        self.units.extend(int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2))
+
+    def text(self) -> str:
+        return b"".join(u.to_bytes(2, "little") for u in self.units).decode("utf-16-le")
+
+
+def _deltas(n: int, size: int) -> list[str]:
+    sample = "The quick brown fox jumps over the lazy dog, déjà vu 🎙️. "
+    text = sample * (n * size // len(sample) + 1)
+    return [text[i * size:(i + 1) * size] for i in range(n)]
+
+
+def _run(pacing: str, paste_threshold: int, deltas: list[str]):
+    backend = RecordingBackend()
+    worker = TypingWorker(backend=backend, pacing=pacing, paste_threshold=paste_threshold)
+    worker.start()
+    t0 = time.perf_counter()
+    caller = 0.0
+    for delta in deltas:
+        c0 = time.perf_counter()
+        worker.type(delta)
+        caller += time.perf_counter() - c0
+    worker.wait_idle()
+    total = time.perf_counter() - t0
+    worker.stop()
+    expected = "".join(deltas)
+    assert backend.text() == expected, f"{pacing}: typed text out of order or incomplete"
+    return backend, caller, total, len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deltas", type=int, default=50)
+    parser.add_argument("--delta-chars", type=int, default=40)
+    args = parser.parse_args()
+
+    deltas = _deltas(args.deltas, args.delta_chars)
+    print(f"{'policy':<16} {'SendInput':>9} {'pastes':>6} {'type() total':>13} {'all typed':>10} {'chars/s':>9}")
+    for pacing in PACING_POLICIES:
+        for threshold in (0, 200):
+            backend, caller, total, chars = _run(pacing, threshold, deltas)
+            label = pacing + (" +paste" if threshold else "")
+            print(f"{label:<16} {backend.calls:>9} {backend.pastes:>6} {caller * 1000:>10.2f} ms "
+                  f"{total * 1000:>7.0f} ms {chars / total:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Per-chunk cost, upstream savings and behaviour of the VoiceActivityGate.
+
+Synthesizes WAV fixtures (speech-like voiced bursts with pauses, hiss only,
+continuous speech) or takes real 16 kHz mono PCM16 WAVs, feeds them through
+the gate in 100 ms chunks and reports bytes sent vs captured and CPU time per
+chunk against the 100 ms chunk budget.
+
+On the synthetic fixtures it also checks the gate: every chunk of a speech
+burst is sent, in order; each pause is cut down to the hangover plus the
+pre-roll; hiss alone sends nothing; `auto_stop` expires after exactly that
+many seconds without speech, not a chunk earlier or later, and never within
+the shorter pauses; and the sent/captured counters equal the bytes actually
+passed in and returned. Exits non-zero on any failed check.
+
+    python benchmarks/bench_vad.py [--wav FILE ...] [--seconds S]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from audio import CHUNK_BYTES  # noqa: E402
+from vad import SAMPLE_RATE, VoiceActivityGate  # noqa: E402
+from fixtures import synthetic_fixtures  # noqa: E402
+
+
+def _pcm(wav_bytes: bytes) -> bytes:
+    with wave.open(io.BytesIO(wav_bytes)) as w:
+        if (w.getframerate(), w.getnchannels(), w.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            raise ValueError("expected 16 kHz mono PCM16")
+        return w.readframes(w.getnframes())
+
+
+CHUNK_S = CHUNK_BYTES / (SAMPLE_RATE * 2)
+SPURT_S, PERIOD_S = 1.0, 2.5  # the speech_with_pauses fixture: 1 s of talking every 2.5 s
+
+
+def chunks_of(pcm: bytes) -> list[memoryview]:
+    view = memoryview(pcm)
+    return [view[offset:offset + CHUNK_BYTES] for offset in range(0, len(pcm) - CHUNK_BYTES + 1, CHUNK_BYTES)]
+
+
+def gate_through(gate: VoiceActivityGate, pcm: bytes) -> tuple[list[list[int]], list[bool], int]:
+    """Feed `pcm`; returns the input chunk numbers sent after each chunk, `expired` after each, bytes returned."""
+    chunks = chunks_of(pcm)
+    number = {bytes(c): i for i, c in enumerate(chunks)}  # the fixtures' hiss makes every chunk unique
+    sent, expired, returned = [], [], 0
+    for chunk in chunks:
+        out = gate.process(chunk)
+        returned += sum(len(c) for c in out)
+        sent.append([number[bytes(c)] for c in out])
+        expired.append(gate.expired)
+    return sent, expired, returned
+
+
+def check_gate(fixtures: dict[str, bytes]) -> list[str]:
+    errors = []
+    gate = VoiceActivityGate()
+    pause_limit = round((gate.hangover + gate._preroll_bytes / (SAMPLE_RATE * 2)) / CHUNK_S)
+    per_period = round(PERIOD_S / CHUNK_S)
+    in_spurt = round(SPURT_S / CHUNK_S)
+
+    pcm = _pcm(fixtures["speech_with_pauses"])
+    sent, _, returned = gate_through(gate, pcm)
+    order = [i for out in sent for i in out]
+    if order != sorted(order) or len(set(order)) != len(order):
+        errors.append("speech_with_pauses: chunks sent out of order or twice")
+    sent_set = set(order)
+    total = len(sent)
+    spurts = [range(start, min(start + in_spurt, total)) for start in range(0, total, per_period)]
+    missing = [i for spurt in spurts for i in spurt if i not in sent_set]
+    if missing:
+        errors.append(f"speech_with_pauses: {len(missing)} chunks of speech bursts held back, e.g. {missing[:5]}")
+    for spurt, following in zip(spurts, spurts[1:]):
+        pause = [i for i in range(spurt.stop, following.start) if i in sent_set]
+        if len(pause) > pause_limit:
+            errors.append(f"speech_with_pauses: {len(pause)} chunks of the pause before chunk {following.start} "
+                          f"sent, more than hangover + pre-roll ({pause_limit})")
+            break
+    stats = gate.stats()
+    if (stats["bytes_sent"], stats["bytes_captured"], stats["chunks"]) != (returned, len(sent) * CHUNK_BYTES, total):
+        errors.append(f"counters {stats} don't match {returned} bytes returned of {total} chunks passed in")
+
+    gate = VoiceActivityGate()
+    sent, _, returned = gate_through(gate, _pcm(fixtures["hiss_only"]))
+    if returned or gate.bytes_sent:
+        errors.append(f"hiss_only: {returned} bytes sent")
+
+    auto_stop = 1.0
+    for name, expect_at in (("hiss_only", round(auto_stop / CHUNK_S) - 1),
+                            ("speech_with_pauses", in_spurt + round(auto_stop / CHUNK_S) - 1)):
+        gate = VoiceActivityGate(auto_stop=auto_stop)
+        _, expired, _ = gate_through(gate, _pcm(fixtures[name]))
+        at = expired.index(True) if True in expired else None
+        if at != expect_at:
+            errors.append(f"{name}: auto_stop {auto_stop:g} s expired at chunk {at}, expected {expect_at}")
+    gate = VoiceActivityGate(auto_stop=(PERIOD_S - SPURT_S) + 0.2)
+    _, expired, _ = gate_through(gate, _pcm(fixtures["speech_with_pauses"]))
+    if any(expired):
+        errors.append(f"speech_with_pauses: auto_stop {gate.auto_stop:g} s expired within a "
+                      f"{PERIOD_S - SPURT_S:g} s pause")
+    return errors
+
+
+def run(name: str, pcm: bytes):
+    gate = VoiceActivityGate()
+    costs = []
+    for chunk in chunks_of(pcm):
+        t0 = time.perf_counter()
+        gate.process(chunk)
+        costs.append(time.perf_counter() - t0)
+    us = sorted(c * 1e6 for c in costs)
+    s = gate.stats()
+    print(f"{name:<20} sent {s['bytes_sent'] / max(s['bytes_captured'], 1):6.1%} of captured  "
+          f"speech {s['speech_chunks']:>4}/{s['chunks']:<4} chunks  "
+          f"p50={statistics.median(us):6.1f} us  p99={us[int(len(us) * 0.99) - 1]:6.1f} us  "
+          f"({us[int(len(us) * 0.99) - 1] / 1e5:.4%} of the 100 ms budget)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wav", nargs="*", default=[])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    fixtures = synthetic_fixtures(args.seconds)
+    for path in args.wav:
+        with open(path, "rb") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    for name, data in fixtures.items():
+        run(name, _pcm(data))
+
+    errors = check_gate(synthetic_fixtures(args.seconds))
+    for error in errors:
+        print(f"  !! {error}")
+    if errors:
+        sys.exit(1)
+    print("gate checks: ok (speech kept, pauses trimmed, hiss dropped, auto_stop on time, counters exact)")
+
+
+if __name__ == "__main__":
+    main()
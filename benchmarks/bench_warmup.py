@@ -0,0 +1,66 @@
+"""Compare warmup policies: hotkey to first mic audio upstream and to first text delta.
+
+Replays a recorded event timeline (benchmarks/recordings/short_phrase.jsonl by
+default) from FakeRealtimeServer, so session creation and token timings match
+what the real endpoint produced. Fails unless the `off` and `adaptive` median
+first delta beat `paced`, which streams its warmup silence at real time first,
+by at least --min-gain-ms.
+
+    python benchmarks/bench_warmup.py [--trials N] [--recording PATH] [--jitter-ms MS]
+                                      [--min-gain-ms MS]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+from fake_realtime_server import FakeRealtimeServer, load_recording
+from harness import run_until_first_delta  # also puts the repo root on sys.path
+
+import realtime  # noqa: E402
+import transcription  # noqa: E402
+
+RECORDING = os.path.join(os.path.dirname(__file__), "recordings", "short_phrase.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--recording", default=RECORDING)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--min-gain-ms", type=float, default=500.0, help="required lead over paced")
+    args = parser.parse_args()
+
+    server = FakeRealtimeServer(timeline=load_recording(args.recording), jitter=args.jitter_ms / 1000)
+    realtime.BASE_URL = server.start()
+    worker = transcription.TranscriptionWorker()
+
+    medians = {}
+    print(f"{'policy':<9} {'to first audio':>15} {'to first delta':>15}")
+    for policy in realtime.WARMUP_POLICIES:
+        worker.set_warmup_policy(policy)
+        to_audio, to_delta = [], []
+        for _ in range(args.trials):
+            before = len(server.sessions)
+            stamps = run_until_first_delta(worker)
+            session = server.sessions[before]  # same process, so perf_counter stamps compare
+            to_audio.append((session["first_speech_at"] - stamps["hotkey"]) * 1000)
+            to_delta.append((stamps["first"] - stamps["hotkey"]) * 1000)
+        medians[policy] = statistics.median(to_delta)
+        print(f"{policy:<9} {statistics.mean(to_audio):>12.1f} ms {statistics.mean(to_delta):>12.1f} ms")
+    server.stop()
+
+    failures = [
+        f"{policy} median first delta {medians[policy]:.1f} ms is not {args.min_gain_ms:.0f} ms below "
+        f"paced ({medians['paced']:.1f} ms)"
+        for policy in ("off", "adaptive")
+        if medians[policy] > medians["paced"] - args.min_gain_ms
+    ]
+    for failure in failures:
+        print(f"  !! {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
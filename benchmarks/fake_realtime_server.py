@@ -0,0 +1,330 @@
+"""Local stand-in for the Mistral realtime transcription websocket.
+
+Speaks the same JSON events as `mistralai.extra.realtime`: sends
+`session.created` after the handshake, accepts `session.update` and
+`input_audio.append/flush/end`, answers non-silent audio with
+`transcription.text.delta` events and finishes with `transcription.done`.
+
+    server = FakeRealtimeServer(session_delay=0.2)
+    base_url = server.start()   # e.g. "ws://127.0.0.1:54321", use as BASE_URL
+    ...
+    server.stop()
+
+`pause` makes it stop answering (handshakes and open sessions hang, like a
+black-holed host) until `resume`; `kill` drops every connection and stops
+listening, like a crashed server, and `start` brings it back on the same port.
+
+Instead of synthesizing words it can replay a recording (see `load_recording`),
+or transcribe audio that encodes word numbers (`encoded_words`), and it can
+drop connections at random (`drop_rate`) to exercise reconnects, or refuse
+handshakes (`reject_connections`) to exercise retries.
+"""
+import array
+import asyncio
+import base64
+import json
+from http import HTTPStatus
+import random
+import threading
+import time
+import uuid
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+DEFAULT_WORDS = ("Hello", " world,", " this", " is", " a", " test.")
+
+
+def load_recording(path: str) -> list[tuple[float, dict]]:
+    """Load a recorded event timeline from JSONL lines of {"t": seconds, "event": {...}}.
+
+    `t` of `session.created` is measured from the websocket opening; `t` of every
+    other event from the first non-silent audio the client sent.
+    """
+    timeline = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                timeline.append((float(entry["t"]), entry["event"]))
+    return timeline
+
+
+class FakeRealtimeServer:
+    """Realtime transcription endpoint running on its own loop thread.
+
+    `connect_delay` stalls the websocket handshake, `session_delay` delays
+    `session.created`, and every `ms_per_word` of non-silent audio produces the
+    next word `token_delay` seconds after it arrives. With a `timeline` the
+    recorded events are replayed at their recorded offsets instead, each shifted
+    by up to `jitter` seconds.
+
+    With `encoded_words`, audio is read as word numbers instead: each run of
+    samples with the same value n > 0 is transcribed as " w<n>", so a test can
+    check exactly which audio made it into the text. `drop_rate` is the chance
+    that any audio message makes the server abort the connection without a
+    close frame, like a network drop; `drop_seed` makes the drops repeatable.
+    `drop_after_words` maps a connection's index (0 for the first) to the number
+    of words it sends before it is aborted the same way. Handshakes whose index
+    is in `reject_connections` are refused with HTTP 401, like a bad API key.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        connect_delay: float = 0.0,
+        session_delay: float = 0.0,
+        token_delay: float = 0.05,
+        ms_per_word: int = 300,
+        words: tuple[str, ...] = DEFAULT_WORDS,
+        timeline: list[tuple[float, dict]] | None = None,
+        jitter: float = 0.0,
+        encoded_words: bool = False,
+        drop_rate: float = 0.0,
+        drop_seed: int | None = None,
+        drop_after_words: dict[int, int] | None = None,
+        reject_connections: set[int] | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.connect_delay = connect_delay
+        self.session_delay = session_delay
+        self.token_delay = token_delay
+        self.ms_per_word = ms_per_word
+        self.words = words
+        self.timeline = timeline
+        self.jitter = jitter
+        self.encoded_words = encoded_words
+        self.drop_rate = drop_rate
+        self._drops = random.Random(drop_seed)
+        self.drop_after_words = drop_after_words or {}
+        self.reject_connections = reject_connections or set()
+        self.handshakes = 0
+        self.sessions: list[dict] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._stop: asyncio.Event | None = None
+        self._resumed: asyncio.Event | None = None
+        self._paused = False
+        self._connections: set = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        """Start serving in a background thread and return the base URL."""
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join()
+            self._loop = None
+
+    def pause(self):
+        """Stop answering: new handshakes and open sessions hang until `resume`."""
+        self._paused = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._resumed.clear)
+
+    def resume(self):
+        self._paused = False
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._resumed.set)
+
+    def kill(self):
+        """Drop every connection without a close frame and stop listening."""
+        if self._loop is not None:
+            def abort():
+                for ws in self._connections:
+                    ws.transport.abort()
+                self._stop.set()
+
+            self._loop.call_soon_threadsafe(abort)
+            self._thread.join()
+            self._loop = None
+
+    def _run(self, started: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._serve(started))
+        self._loop.close()
+
+    async def _serve(self, started: threading.Event):
+        self._stop = asyncio.Event()
+        self._resumed = asyncio.Event()
+        if not self._paused:
+            self._resumed.set()
+        async with serve(self._handler, self.host, self.port, process_request=self._process_request) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            await self._stop.wait()
+
+    async def _process_request(self, connection, request):
+        await self._resumed.wait()
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        self.handshakes += 1
+        if self.handshakes - 1 in self.reject_connections:
+            return connection.respond(HTTPStatus.UNAUTHORIZED, "Unauthorized\n")
+        return None
+
+    async def _send(self, ws, payload: dict):
+        await self._resumed.wait()
+        try:
+            await ws.send(json.dumps(payload))
+        except ConnectionClosed:
+            pass  # the client hung up, e.g. a session stopped without draining
+
+    async def _handler(self, ws):
+        stats = {"connected_at": time.perf_counter(), "audio_bytes": 0, "speech_bytes": 0,
+                 "first_audio_at": None, "first_speech_at": None, "text": "", "dropped": False}
+        drop_after = self.drop_after_words.get(len(self.sessions))
+        self.sessions.append(stats)
+        self._connections.add(ws)
+        session_event = {
+            "type": "session.created",
+            "session": {
+                "request_id": uuid.uuid4().hex,
+                "model": "fake-realtime",
+                "audio_format": {"encoding": "pcm_s16le", "sample_rate": 16000},
+            },
+        }
+        session_delay = self.session_delay
+        replay: list[tuple[float, dict]] = []
+        if self.timeline is not None:
+            for offset, event in self.timeline:
+                if event.get("type") == "session.created":
+                    session_delay, session_event = offset, event
+                else:
+                    replay.append((offset, event))
+        if session_delay:
+            await asyncio.sleep(self._jittered(session_delay))
+        await self._send(ws, session_event)
+        stats["session_at"] = time.perf_counter()
+
+        bytes_per_word = 16000 * 2 * self.ms_per_word // 1000
+        next_word = 0
+        word_number = 0  # encoded_words: sample value of the current run
+        pending: set[asyncio.Task] = set()
+
+        async def emit(word: str):
+            await asyncio.sleep(self._jittered(self.token_delay))
+            if stats["dropped"]:
+                return
+            stats["text"] += word
+            await self._send(ws, {"type": "transcription.text.delta", "text": word})
+            if drop_after is not None and len(stats["text"].split()) >= drop_after:
+                stats["dropped"] = True
+                ws.transport.abort()
+
+        async def emit_recorded(offset: float, event: dict):
+            await asyncio.sleep(self._jittered(offset))
+            if event.get("type") == "transcription.text.delta":
+                stats["text"] += event.get("text", "")
+            await self._send(ws, event)
+
+        try:
+            async for raw in ws:
+                await self._resumed.wait()
+                msg = json.loads(raw)
+                kind = msg.get("type")
+                if kind == "input_audio.append":
+                    audio = base64.b64decode(msg["audio"])
+                    now = time.perf_counter()
+                    stats["audio_bytes"] += len(audio)
+                    if stats["first_audio_at"] is None:
+                        stats["first_audio_at"] = now
+                    if self.drop_rate and self._drops.random() < self.drop_rate:
+                        stats["dropped"] = True
+                        ws.transport.abort()
+                        break
+                    if self.encoded_words:
+                        for value in array.array("h", audio):
+                            if value != word_number:
+                                word_number = value
+                                if value > 0:
+                                    task = asyncio.create_task(emit(f" w{value}"))
+                                    pending.add(task)
+                                    task.add_done_callback(pending.discard)
+                        continue
+                    if audio.count(0) == len(audio):
+                        continue
+                    if stats["first_speech_at"] is None:
+                        stats["first_speech_at"] = now
+                        for offset, event in replay:
+                            if event.get("type") != "transcription.done":
+                                task = asyncio.create_task(emit_recorded(offset, event))
+                                pending.add(task)
+                                task.add_done_callback(pending.discard)
+                    if replay:
+                        continue
+                    # The first word fires on the first speech; later ones every ms_per_word.
+                    stats["speech_bytes"] += len(audio)
+                    while next_word < len(self.words) and stats["speech_bytes"] > next_word * bytes_per_word:
+                        task = asyncio.create_task(emit(self.words[next_word]))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                        next_word += 1
+                elif kind == "input_audio.end":
+                    if pending:
+                        await asyncio.wait(pending)
+                    await self._send(ws, {
+                        "type": "transcription.done",
+                        "model": "fake-realtime",
+                        "text": stats["text"],
+                        "usage": {"prompt_audio_seconds": stats["audio_bytes"] // 32000},
+                        "language": None,
+                    })
+                    break
+        except Exception:
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            self._connections.discard(ws)
+            stats["closed_at"] = time.perf_counter()
+
+    def _jittered(self, delay: float) -> float:
+        if not self.jitter:
+            return delay
+        return max(0.0, delay + random.uniform(-self.jitter, self.jitter))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake realtime transcription server.")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--recording", help="JSONL event timeline to replay instead of synthesized words")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--connect-ms", type=float, default=0.0)
+    parser.add_argument("--session-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=50.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="chance per audio message of a dropped connection")
+    args = parser.parse_args()
+
+    server = FakeRealtimeServer(
+        port=args.port,
+        connect_delay=args.connect_ms / 1000,
+        session_delay=args.session_ms / 1000,
+        token_delay=args.token_ms / 1000,
+        timeline=load_recording(args.recording) if args.recording else None,
+        jitter=args.jitter_ms / 1000,
+        drop_rate=args.drop_rate,
+    )
+    print(server.start(), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Synthetic 16 kHz mono PCM16 WAV fixtures shared by the benchmarks."""
+import io
+import os
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16_000
+
+
+def to_wav(samples: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(np.clip(samples, -32768, 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def synthetic_fixtures(seconds: float) -> dict[str, bytes]:
+    """WAV bytes keyed by name: voiced bursts with pauses, hiss only, and continuous speech."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    hiss = rng.normal(0, 30, t.size)
+    # Voiced speech stand-in: a 140 Hz harmonic stack with syllable-rate modulation.
+    voiced = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 8)) * 4000
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    talk_spurts = (t % 2.5) < 1.0  # 1 s of talking, 1.5 s pause
+    return {
+        "speech_with_pauses": to_wav(voiced * syllables * talk_spurts + hiss),
+        "hiss_only": to_wav(hiss),
+        "continuous_speech": to_wav(voiced * syllables + hiss),
+    }
+
+
+def write_fixtures(directory: str, seconds: float) -> dict[str, str]:
+    """Write the synthetic fixtures as .wav files; return paths keyed by name."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, data in synthetic_fixtures(seconds).items():
+        path = os.path.join(directory, f"{name}.wav")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths[name] = path
+    return paths
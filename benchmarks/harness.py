@@ -0,0 +1,61 @@
+"""Shared helpers for driving the real TranscriptionWorker from benchmarks."""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PySide6.QtCore import Qt  # noqa: E402
+
+from audio import CHUNK_BYTES, PcmRingBuffer  # noqa: E402
+
+SPEECH_CHUNK = bytes([1, 2]) * (CHUNK_BYTES // 2)
+
+
+def fake_mic(ring: PcmRingBuffer, stop: threading.Event):
+    """Write a non-silent 100 ms chunk every 100 ms until `stop` is set, then close the ring."""
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        ring.put_nowait(SPEECH_CHUNK)
+        next_at += 0.1
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+    ring.close()
+
+
+def time_to_first_delta(worker, api_key: str = "fake-key", timeout: float = 15.0) -> float:
+    """Press the "hotkey" (start a fake mic and the worker); return seconds until the first text delta."""
+    stamps = run_until_first_delta(worker, api_key, timeout)
+    return stamps["first"] - stamps["hotkey"]
+
+
+def run_until_first_delta(worker, api_key: str = "fake-key", timeout: float = 15.0) -> dict:
+    """Like `time_to_first_delta`, but return the raw perf_counter stamps ("hotkey", "first")."""
+    first = threading.Event()
+    done = threading.Event()
+    stamps = {}
+
+    def on_delta(text):
+        if not first.is_set():
+            stamps["first"] = time.perf_counter()
+            first.set()
+
+    worker.text_delta.connect(on_delta, Qt.ConnectionType.DirectConnection)
+    worker.finished.connect(done.set, Qt.ConnectionType.DirectConnection)
+    ring = PcmRingBuffer()
+    stop = threading.Event()
+    mic = threading.Thread(target=fake_mic, args=(ring, stop), daemon=True)
+
+    stamps["hotkey"] = time.perf_counter()
+    mic.start()
+    worker.start(api_key, ring)
+    ok = first.wait(timeout)
+    worker.stop()
+    stop.set()
+    mic.join()
+    done.wait(5)
+    worker.text_delta.disconnect(on_delta)
+    worker.finished.disconnect(done.set)
+    if not ok:
+        raise RuntimeError(f"no text delta within {timeout:.0f} s")
+    return stamps
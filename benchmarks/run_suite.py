@@ -0,0 +1,203 @@
+"""End-to-end benchmark suite against a local fake realtime server.
+
+Each WAV fixture is played through a WavFileDevice into the real pipeline
+(AudioCapture -> audio_stream -> TranscriptionWorker) while the fake server
+runs in a subprocess, so CPU time and peak RSS are the client's alone.
+Reports time to first token, audio-to-text lag percentiles, CPU and peak RSS
+per fixture and server profile. Save a run with --json and pass it back with
+--baseline to see relative changes.
+
+First it runs batch.py over the fixtures against an in-process fake server that
+refuses one handshake, and fails unless every file gets its transcript, no more
+than --concurrency sessions are open at once and the refused file is retried.
+
+    python benchmarks/run_suite.py [--sessions N] [--seconds S] [--wav FILE ...]
+                                   [--concurrency N] [--json OUT] [--baseline OLD.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fixtures import write_fixtures
+from harness import Qt  # also puts the repo root on sys.path
+
+import batch  # noqa: E402
+import realtime  # noqa: E402
+import transcription  # noqa: E402
+from audio import AudioCapture, WavFileDevice  # noqa: E402
+from diagnostics import SessionTrace, percentile  # noqa: E402
+from fake_realtime_server import FakeRealtimeServer  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROFILES = {
+    "words": [],
+    "recorded": ["--recording", os.path.join(HERE, "recordings", "short_phrase.jsonl"), "--jitter-ms", "30"],
+    "slow-connect": ["--connect-ms", "250", "--session-ms", "150", "--token-ms", "120", "--jitter-ms", "40"],
+}
+
+
+def _start_server(extra_args: list[str]) -> tuple[subprocess.Popen, str]:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_realtime_server.py"), *extra_args],
+        stdout=subprocess.PIPE, text=True,
+    )
+    return proc, proc.stdout.readline().strip()
+
+
+def run_session(worker, wav_path: str, speed: float) -> SessionTrace:
+    """Dictate one file: play it through the capture pipeline, then let the session drain."""
+    done = threading.Event()
+    worker.finished.connect(done.set, Qt.ConnectionType.DirectConnection)
+    capture = AudioCapture(device_factory=lambda: WavFileDevice(wav_path, speed))
+    trace = SessionTrace()
+    capture.start()
+    trace.mark("device_start", capture.started_at)
+    worker.start("fake-key", capture.queue, trace)
+    capture.device.finished.wait()
+    capture.stop()  # closes the ring: the stream ends and the server sends transcription.done
+    if not done.wait(30):
+        worker.stop()
+        done.wait(5)
+    worker.finished.disconnect(done.set)
+    trace.mark("end")
+    return trace
+
+
+def run_profile(name: str, server_args: list[str], fixtures: dict[str, str], sessions: int, speed: float):
+    proc, base_url = _start_server(server_args)
+    realtime.BASE_URL = base_url
+    worker = transcription.TranscriptionWorker()
+    results = {}
+    try:
+        for fixture, path in fixtures.items():
+            ttft, lags = [], []
+            cpu0, wall0 = time.process_time(), time.perf_counter()
+            for _ in range(sessions):
+                trace = run_session(worker, path, speed)
+                record = trace.record()
+                if "first_text" in record["stages_ms"]:
+                    ttft.append(record["stages_ms"]["first_text"])
+                lags.extend(lag * 1000 for lag in trace.lags)
+            cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+            results[fixture] = {
+                "ttft_p50_ms": percentile(ttft, 50),
+                "lag_p50_ms": percentile(lags, 50),
+                "lag_p95_ms": percentile(lags, 95),
+                "lag_p99_ms": percentile(lags, 99),
+                "cpu_pct": 100 * cpu / wall,
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            }
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def _max_open(sessions: list[dict]) -> int:
+    """Most server sessions open at the same time."""
+    edges = sorted([(s["connected_at"], 1) for s in sessions] + [(s["closed_at"], -1) for s in sessions])
+    open_now = peak = 0
+    for _, step in edges:
+        open_now += step
+        peak = max(peak, open_now)
+    return peak
+
+
+def check_batch(fixture_dir: str, concurrency: int) -> list[str]:
+    """Run batch.main over `fixture_dir` with the first handshake refused; return what went wrong."""
+    server = FakeRealtimeServer(token_delay=0.02, reject_connections={0})
+    base_url = server.start()
+    out = tempfile.mkdtemp(prefix="dictation-batch-")
+    report = os.path.join(out, "results.json")
+    backoff, batch.RETRY_BACKOFF = batch.RETRY_BACKOFF, 0.1
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = batch.main([fixture_dir, "--out", out, "--concurrency", str(concurrency), "--speed", "4",
+                               "--api-key", "fake-key", "--base-url", base_url, "--json", report])
+    finally:
+        batch.RETRY_BACKOFF = backoff
+        server.stop()
+    with open(report, "r", encoding="utf-8") as f:
+        results = json.load(f)
+
+    failures = []
+    names = sorted(os.path.splitext(os.path.basename(p))[0] for p in batch._collect(fixture_dir))
+    transcripts = sorted(os.path.splitext(n)[0] for n in os.listdir(out) if n.endswith(".txt"))
+    if code != 0 or transcripts != names:
+        failures.append(f"batch: exit code {code}, transcripts {transcripts}, expected one each for {names}")
+    for result in results:
+        name = os.path.splitext(os.path.basename(result["file"]))[0]
+        if "speech" in name and not result.get("text"):
+            failures.append(f"batch: no text for {name}")
+    peak = _max_open(server.sessions)
+    if peak != concurrency:
+        failures.append(f"batch: {peak} sessions open at once with --concurrency {concurrency}")
+    retried = [r for r in results if r.get("attempts") == 2]
+    if server.handshakes != len(names) + 1 or len(retried) != 1 or len(results) != len(names):
+        failures.append(f"batch: {server.handshakes} handshakes and {len(retried)} retried files "
+                        f"for {len(names)} files with one handshake refused")
+    print(f"batch: {len(results)} files, {peak} sessions at once, {len(retried)} retried after a refused handshake")
+    return failures
+
+
+def _fmt(value, baseline=None) -> str:
+    if value is None:
+        return f"{'—':>9}"
+    text = f"{value:9.1f}"
+    if baseline:
+        text += f" ({(value - baseline) / baseline:+.0%})"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of the synthetic fixtures")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed relative to real time")
+    parser.add_argument("--wav", nargs="*", default=[], help="extra 16 kHz mono PCM16 WAV files")
+    parser.add_argument("--profile", nargs="*", choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument("--concurrency", type=int, default=2, help="batch sessions at once in the batch check")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="dictation-bench-")
+    fixtures = write_fixtures(tmp, args.seconds)
+    failures = check_batch(tmp, args.concurrency)
+    fixtures.pop("hiss_only")  # produces no tokens, so no latency to measure
+    for path in args.wav:
+        fixtures[os.path.splitext(os.path.basename(path))[0]] = path
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    columns = ("ttft_p50_ms", "lag_p50_ms", "lag_p95_ms", "lag_p99_ms", "cpu_pct", "peak_rss_mb")
+    print(f"{'profile':<13} {'fixture':<20} " + " ".join(f"{c:>9}" for c in columns))
+    for profile in args.profile:
+        results[profile] = run_profile(profile, PROFILES[profile], fixtures, args.sessions, args.speed)
+        for fixture, row in results[profile].items():
+            base = baseline.get(profile, {}).get(fixture, {})
+            print(f"{profile:<13} {fixture:<20} " + " ".join(_fmt(row[c], base.get(c)) for c in columns))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"  !! {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,32 @@ DEFAULTS = {
     "hotkey_copilot": False,
     "hotkey_win_h": True,
     "hotkey_custom": "",
+    "hotkey_options": {},  # combo -> {"mode": "toggle" | "hold", "debounce_ms": int, "repeat": "ignore" | "retrigger"}
     "language": "",
+    "engine": "mistral",
+    "local_model_path": "",
+    "fallback_connect_ms": 1500,
     "start_with_windows": False,
+    "warmup_policy": "adaptive",
+    "typing_pacing": "batched",
+    "paste_threshold": 200,
+    "vad": False,
+    "vad_auto_stop": 0,
+    "standby": False,
+    "standby_idle_timeout": 300,
+    "drain_timeout_ms": 4000,
+    "preroll_ms": 0,
+    "preroll_idle_timeout": 600,
+    "capture_overflow": "spill",
+    "agc": False,
+    "history": True,
+    "archive_audio": False,
+    "archive_max_mb": 500,
+    "ipc_server": False,
+    "idle_release_timeout": 900,
+    "reconnect_attempts": 4,
+    "connect_timeout_ms": 5000,
+    "first_event_timeout_ms": 8000,
 }
 
 STARTUP_DIR = os.path.join(
@@ -21,6 +45,8 @@ STARTUP_DIR = os.path.join(
 )
 SHORTCUT_PATH = os.path.join(STARTUP_DIR, "Dictation Hotkey.lnk")
 
+COPILOT_COMBOS = ["Win+C", "Win+Shift+F23"]
+
 
 def load() -> dict:
     """Load config from disk, returning defaults for missing keys."""
@@ -37,7 +63,7 @@ def get_hotkey_combos(cfg: dict) -> list[str]:
     """Convert config booleans/string into a list of hotkey combo strings."""
     combos = []
     if cfg.get("hotkey_copilot"):
-        combos.extend(["Win+C", "Win+Shift+F23"])
+        combos.extend(COPILOT_COMBOS)
     if cfg.get("hotkey_win_h"):
         combos.append("Win+H")
     custom = cfg.get("hotkey_custom", "").strip()
@@ -46,6 +72,15 @@ def get_hotkey_combos(cfg: dict) -> list[str]:
     return combos
 
 
+def get_hotkey_options(cfg: dict) -> dict[str, dict]:
+    """Stored mode / debounce / repeat options of each combo from `get_hotkey_combos`.
+
+    Missing options fall back to hotkey.HOTKEY_DEFAULTS and hotkey.DEBOUNCE_MS.
+    """
+    stored = cfg.get("hotkey_options", {})
+    return {combo: dict(stored.get(combo, {})) for combo in get_hotkey_combos(cfg)}
+
+
 def save(config: dict):
     """Save config to disk."""
     os.makedirs(CONFIG_DIR, exist_ok=True)
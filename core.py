@@ -0,0 +1,169 @@
+import os
+import threading
+
+from PySide6.QtCore import QObject, Qt, Signal
+
+import diagnostics
+from audio import AudioCapture, _open_mic
+from transcription import TranscriptionWorker
+
+NO_API_KEY = "Set API key first"
+OFFLINE = "Offline: can't reach the server"
+
+
+class DictationCore(QObject):
+    """The dictation pipeline without any UI: AudioCapture -> TranscriptionWorker, one dictation at a time.
+
+    Owns the capture device (and its pre-roll), the transcription worker and
+    the audio archive, and starts and stops dictations for whoever drives it:
+    the tray app from its hotkey, and IPC clients through daemon.py. Thread-safe;
+    text and session events come from `transcription`'s signals, start and
+    stop from the signals below (emitted on the thread that caused them).
+    """
+
+    session_started = Signal(object)  # SessionTrace, just before transcription starts
+    recording_stopped = Signal(str)  # "stopped", "ended" (the session ended on its own) or "error"
+
+    def __init__(self, device_factory: callable = _open_mic, on_loss: callable = None, on_level: callable = None,
+                 parent=None):
+        super().__init__(parent)
+        self.audio = AudioCapture(device_factory=device_factory, on_loss=on_loss, on_level=on_level)
+        self.transcription = TranscriptionWorker()
+        self.archive = None  # AudioArchive once archiving was turned on
+        self._config: dict = {}
+        self._recording = False
+        self._trace: diagnostics.SessionTrace | None = None
+        self._lock = threading.RLock()
+        self._release_timer: threading.Timer | None = None  # releases a mic held open for the pre-roll
+        # Direct: these run on the event loop thread, whether or not a Qt event loop is running.
+        self.transcription.error.connect(self._on_error, Qt.ConnectionType.DirectConnection)
+        self.transcription.active_ended.connect(self._on_active_ended, Qt.ConnectionType.DirectConnection)
+
+    @property
+    def recording(self) -> bool:
+        return self._recording
+
+    def apply_config(self, cfg: dict):
+        with self._lock:
+            self._config = cfg
+            self.audio.set_preroll(int(cfg.get("preroll_ms", 0)))
+            self.audio.set_overflow(cfg.get("capture_overflow", "spill"))
+            self.audio.set_agc(cfg.get("agc", False))
+            if cfg.get("archive_audio", False):
+                if self.archive is None:
+                    from archive import AudioArchive
+
+                    self.archive = AudioArchive()
+                self.archive.max_bytes = int(cfg.get("archive_max_mb", 500)) * 1024 * 1024
+            if not self._recording:
+                self.hold_preroll()
+        worker = self.transcription
+        worker.set_engine(
+            cfg.get("engine", "mistral"),
+            cfg.get("local_model_path", ""),
+            int(cfg.get("fallback_connect_ms", 1500)),
+        )
+        worker.set_warmup_policy(cfg.get("warmup_policy", "adaptive"))
+        worker.set_reconnect_attempts(int(cfg.get("reconnect_attempts", 4)))
+        worker.set_timeouts(
+            float(cfg.get("connect_timeout_ms", 5000)) / 1000,
+            float(cfg.get("first_event_timeout_ms", 8000)) / 1000,
+        )
+        worker.set_vad(cfg.get("vad", False), float(cfg.get("vad_auto_stop", 0)))
+        api_key = cfg.get("api_key", "")
+        enabled = cfg.get("standby", False) and api_key and cfg.get("engine", "mistral") != "local"
+        worker.set_standby(api_key if enabled else None, float(cfg.get("standby_idle_timeout", 300)))
+
+    def readiness(self) -> str | None:
+        """Why a dictation can't start right now (NO_API_KEY or OFFLINE), or None."""
+        engine = self._config.get("engine", "mistral")
+        if not self._config.get("api_key") and engine != "local":
+            return NO_API_KEY
+        if engine == "mistral" and self.transcription.endpoint_down:
+            return OFFLINE
+        return None
+
+    def start(self, hotkey_at: float | None = None) -> diagnostics.SessionTrace | None:
+        """Start a dictation; returns its trace, or None if one is already recording."""
+        with self._lock:
+            if self._recording:
+                return None
+            self._cancel_release()
+            trace = diagnostics.SessionTrace(hotkey_at)
+            recording = None
+            if self.archive is not None and self._config.get("archive_audio", False):
+                recording = self.archive.open_session(trace.started)
+                trace.extra["audio_file"] = os.path.basename(recording.path)
+            self.audio.start(archive=recording)
+            trace.mark("device_start", self.audio.started_at)
+            self._recording = True
+            self._trace = trace
+            self.session_started.emit(trace)
+            self.transcription.start(self._config.get("api_key", ""), self.audio.queue, trace)
+        return trace
+
+    def stop(self, at: float | None = None, reason: str = "stopped") -> bool:
+        """End the dictation; `at` (time.monotonic()) is the key event that ended it, if any.
+
+        The session keeps transcribing the audio already captured, up to the
+        configured drain timeout. Returns False if nothing was recording.
+        """
+        with self._lock:
+            if not self._recording:
+                return False
+            self._recording = False
+            if at is not None:
+                self._trace.mark("stop", at)
+            self.audio.stop(at)  # closes the ring: the stream ends once the audio up to `at` is sent
+            self.hold_preroll()
+            self.transcription.stop(int(self._config.get("drain_timeout_ms", 4000)) / 1000)
+        self.recording_stopped.emit(reason)
+        return True
+
+    def release(self):
+        """Stop any dictation and close the mic, pre-roll included (e.g. when the session locks)."""
+        self.stop()
+        with self._lock:
+            self._cancel_release()
+            self.audio.release()
+
+    def hold_preroll(self):
+        """Keep the mic open for the pre-roll (if enabled) until the idle timeout."""
+        with self._lock:
+            if self._config.get("preroll_ms", 0) <= 0:
+                return
+            try:
+                self.audio.open_preroll()
+            except Exception:
+                return  # no usable mic right now; the next dictation opens it cold
+            self._cancel_release()
+            self._release_timer = threading.Timer(
+                int(self._config.get("preroll_idle_timeout", 600)), self._release_idle)
+            self._release_timer.daemon = True
+            self._release_timer.start()
+
+    def _cancel_release(self):
+        if self._release_timer is not None:
+            self._release_timer.cancel()
+            self._release_timer = None
+
+    def _release_idle(self):
+        with self._lock:
+            if not self._recording:
+                self.audio.release()
+
+    def _on_error(self, msg: str):
+        with self._lock:
+            if not self._recording:
+                return
+            self._recording = False
+            self.audio.stop()
+            self.hold_preroll()
+        self.recording_stopped.emit("error")
+
+    def _on_active_ended(self, trace: diagnostics.SessionTrace | None):
+        # Under the lock, and only for this dictation's session: a draining session ending
+        # while `start` sets up the next one must not stop it.
+        with self._lock:
+            if self._recording and trace is self._trace:
+                self.stop(reason="ended")
@@ -0,0 +1,444 @@
+"""Local IPC server streaming dictation text to other programs, and the headless daemon.
+
+    python daemon.py serve [--wav FILE] [--speed X] [--base-url URL] [--api-key KEY]
+    python daemon.py listen | start | stop | status
+
+Clients connect to a Unix socket (a named pipe on Windows) and exchange JSON
+objects, one per line. Requests: {"op": "subscribe"}, {"op": "unsubscribe"},
+{"op": "start"}, {"op": "stop"} and {"op": "status"}; each gets an
+{"event": "ok", "op": ...} or {"event": "error", "op": ..., "message": ...}
+reply ("start" also returns the "session" number). Subscribers receive:
+
+    {"event": "started", "session": n}
+    {"event": "text", "session": n, "text": "..."}       text to append, in order
+    {"event": "state", "state": "listening" | "reconnecting" | "fallback"}
+    {"event": "stopped", "session": n, "reason": "stopped" | "ended" | "error"}
+    {"event": "finished", "session": n, "text": "...", "error": "..." | null}
+    {"event": "error", "message": "..."}
+
+Every event carries "at", the daemon's time.monotonic() when it was sent.
+A subscriber that reads slower than text arrives gets consecutive text
+events merged; one that falls more than MAX_PENDING_BYTES behind is
+disconnected, so a stuck client never holds up the others or the dictation.
+
+`serve` runs the dictation core without the tray app, hotkey or typing (with
+`--wav`, a WAV file stands in for the mic on every dictation); the tray app
+serves the same protocol when "Let other programs receive dictation" is on.
+`listen` prints the text of every dictation; `start`, `stop` and `status`
+send that request.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import config
+import realtime
+
+LINE_LIMIT = 64 * 1024  # longest request line accepted
+MAX_PENDING_BYTES = 1024 * 1024  # per client, queued here and in the socket's write buffer
+MERGE_LIMIT = 4096  # characters of text merged into one event for a lagging client
+
+if sys.platform == "win32":
+    import getpass
+
+    ADDRESS = rf"\\.\pipe\dictation_hotkey-{getpass.getuser()}"
+else:
+    ADDRESS = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+                           f"dictation_hotkey-{os.getuid()}.sock")
+
+
+def _encode(event: dict) -> bytes:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+async def open_connection(address: str = ADDRESS) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Connect to a DictationServer; returns an asyncio reader and writer."""
+    if sys.platform == "win32":
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_PENDING_BYTES)
+        protocol = asyncio.StreamReaderProtocol(reader)
+        transport, _ = await loop.create_pipe_connection(lambda: protocol, address)
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+    # Events can be longer than requests: "finished" holds a whole dictation.
+    return await asyncio.open_unix_connection(address, limit=MAX_PENDING_BYTES)
+
+
+class _Queued:
+    """An event waiting to be written to one client: encoded once for all, or merged text."""
+
+    __slots__ = ("event", "line", "parts")
+
+    def __init__(self, event: dict, line: bytes):
+        self.event = event
+        self.line = line
+        self.parts: list[str] | None = None
+
+    def merge(self, event: dict) -> bool:
+        """Append a text event of the same session; False if it can't be merged."""
+        if self.event["event"] != "text" or self.event["session"] != event["session"]:
+            return False
+        if self.parts is None:
+            self.parts = [self.event["text"]]
+            self.event = dict(self.event)  # the original is shared with the other clients
+            self.line = None
+        elif sum(map(len, self.parts)) >= MERGE_LIMIT:
+            return False
+        self.parts.append(event["text"])
+        return True
+
+    def encode(self) -> bytes:
+        if self.line is None:
+            self.event["text"] = "".join(self.parts)
+            self.line = _encode(self.event)
+        return self.line
+
+
+class _Client:
+    """One connection: a queue of events to write, drained by its own writer task."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.queue: collections.deque[_Queued] = collections.deque()
+        self.queued_bytes = 0
+        self.merged = 0
+        self.closed = False
+        self._wake = asyncio.Event()
+
+    def send(self, event: dict, line: bytes) -> bool:
+        """Queue an event; False if this disconnected the client for being too far behind."""
+        if self.closed:
+            return True  # going away; the connection handler forgets it
+        if self.queue and event["event"] == "text" and self.queue[-1].merge(event):
+            self.merged += 1
+            self.queued_bytes += len(event["text"].encode())  # what the merged line grows by
+        else:
+            self.queue.append(_Queued(event, line))
+            self.queued_bytes += len(line)
+        if self.queued_bytes + self.writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+            self.close()
+            return False
+        self._wake.set()
+        return True
+
+    async def write_loop(self):
+        try:
+            while not self.closed:
+                await self._wake.wait()
+                self._wake.clear()
+                lines = [queued.encode() for queued in self.queue]
+                self.queue.clear()
+                self.queued_bytes = 0
+                if lines:
+                    self.writer.write(b"".join(lines))
+                    await self.writer.drain()
+        except (ConnectionError, OSError):
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.clear()
+            self._wake.set()
+            self.writer.transport.abort()
+
+
+class DictationServer:
+    """Serves DictationCore events and start/stop requests to local clients (see the module docstring).
+
+    Runs on the shared event loop. Each event is encoded once and queued for
+    every subscriber; each client has its own writer task, so publishing never
+    waits for a client. Without a `core` it only relays what `publish` is given.
+    """
+
+    def __init__(self, core=None, address: str = ADDRESS):
+        self._core = core
+        self._address = address
+        self._loop = None  # the shared event loop while listening
+        self._servers = []
+        self._clients: set[_Client] = set()
+        self._subscribers: set[_Client] = set()
+        self._sessions: dict = {}  # SessionTrace -> session number
+        self._heads: collections.deque[int] = collections.deque()  # sessions whose text is still coming, oldest first
+        self._last_session = 0
+        self.dropped_clients = 0  # disconnected for falling behind
+        if core is not None:
+            from PySide6.QtCore import Qt
+
+            # Direct: handed straight to the event loop by _defer, without a Qt event loop in between.
+            direct = Qt.ConnectionType.DirectConnection
+            core.session_started.connect(self._on_session_started, direct)
+            core.recording_stopped.connect(self._on_recording_stopped, direct)
+            core.transcription.text_delta.connect(self._on_text, direct)
+            core.transcription.status_changed.connect(self._on_state, direct)
+            core.transcription.error.connect(self._on_error, direct)
+            core.transcription.session_finished.connect(self._on_session_finished, direct)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def listening(self) -> bool:
+        return bool(self._servers)
+
+    def start(self):
+        """Start listening; raises OSError if the address is taken by a running server."""
+        self._loop = realtime.get_event_loop()  # anew: the app stops the loop when idle
+        asyncio.run_coroutine_threadsafe(self._listen(), self._loop).result()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+
+    async def _listen(self):
+        def protocol():
+            return asyncio.StreamReaderProtocol(asyncio.StreamReader(limit=LINE_LIMIT), self._on_client)
+
+        if sys.platform == "win32":
+            self._servers = await self._loop.start_serving_pipe(protocol, self._address)
+            return
+        if os.path.exists(self._address):
+            try:
+                _, writer = await asyncio.open_unix_connection(self._address)
+            except OSError:
+                os.remove(self._address)  # left over from a process that didn't exit cleanly
+            else:
+                writer.close()
+                raise OSError(f"Another dictation server is listening on {self._address}")
+        # Bound under a umask that leaves the socket owner-only from the start: chmod
+        # after the bind would let other users connect in between.
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            sock.bind(self._address)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(umask)
+        server = await self._loop.create_unix_server(protocol, sock=sock)
+        self._servers = [server]
+
+    async def _close(self):
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        for client in list(self._clients):
+            client.close()
+        if sys.platform != "win32" and os.path.exists(self._address):
+            os.remove(self._address)
+
+    # -- events --------------------------------------------------------------
+
+    def _defer(self, callback: callable, *args) -> bool:
+        """Unless on the server's loop, schedule `callback(*args)` there; True if the caller should return.
+
+        Session bookkeeping and publishing only happen on the loop, in the order
+        the core's signals were emitted, whichever thread emitted them.
+        """
+        if not self._servers:
+            return True  # not listening
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            self._loop.call_soon_threadsafe(callback, *args)
+        return not on_loop
+
+    def publish(self, event: dict):
+        """Send an event to every subscriber; from any thread."""
+        if self._defer(self.publish, event):
+            return
+        event["at"] = time.monotonic()
+        line = _encode(event)
+        for client in list(self._subscribers):
+            if not client.send(event, line):
+                self._drop(client)
+
+    def _drop(self, client: _Client):
+        if client in self._clients:
+            self.dropped_clients += 1
+        self._subscribers.discard(client)
+        self._clients.discard(client)
+
+    def _on_session_started(self, trace):
+        if self._defer(self._on_session_started, trace):
+            return
+        self._last_session += 1
+        self._sessions[trace] = self._last_session
+        self._heads.append(self._last_session)
+        self.publish({"event": "started", "session": self._last_session})
+
+    def _on_recording_stopped(self, reason: str):
+        if self._defer(self._on_recording_stopped, reason):
+            return
+        self.publish({"event": "stopped", "session": self._last_session, "reason": reason})
+
+    def _on_text(self, text: str):
+        if self._defer(self._on_text, text):
+            return
+        if self._heads:
+            self.publish({"event": "text", "session": self._heads[0], "text": text})
+
+    def _on_state(self, state: str):
+        self.publish({"event": "state", "state": state})
+
+    def _on_error(self, message: str):
+        self.publish({"event": "error", "message": message})
+
+    def _on_session_finished(self, trace):
+        if self._defer(self._on_session_finished, trace):
+            return
+        session = self._sessions.pop(trace, None)
+        if session is None:
+            return
+        if self._heads and self._heads[0] == session:
+            self._heads.popleft()
+        self.publish({"event": "finished", "session": session, "text": "".join(trace.text).strip(),
+                      "error": trace.extra.get("error")})
+
+    # -- clients -------------------------------------------------------------
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(writer)
+        self._clients.add(client)
+        writing = asyncio.ensure_future(client.write_loop())
+        try:
+            while not client.closed:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request["op"]
+                except (ValueError, TypeError, KeyError):
+                    self._reply(client, {"event": "error", "op": None, "message": "Bad request"})
+                    continue
+                self._reply(client, await self._handle(client, op))
+        except (ConnectionError, OSError, ValueError):
+            pass  # ValueError: a line over LINE_LIMIT
+        finally:
+            client.close()
+            self._subscribers.discard(client)
+            self._clients.discard(client)
+            writing.cancel()
+
+    def _reply(self, client: _Client, reply: dict):
+        reply["at"] = time.monotonic()
+        client.send(reply, _encode(reply))
+
+    async def _handle(self, client: _Client, op: str) -> dict:
+        loop = asyncio.get_running_loop()
+        if op == "subscribe":
+            self._subscribers.add(client)
+        elif op == "unsubscribe":
+            self._subscribers.discard(client)
+        elif op == "status":
+            recording = self._core is not None and self._core.recording
+            return {"event": "status", "op": op, "recording": recording, "subscribers": len(self._subscribers)}
+        elif op in ("start", "stop") and self._core is None:
+            return {"event": "error", "op": op, "message": "No dictation core"}
+        elif op == "start":
+            problem = self._core.readiness()
+            if problem is not None:
+                return {"event": "error", "op": op, "message": problem}
+            # Off the loop: opening the mic can take a while.
+            trace = await loop.run_in_executor(None, self._core.start)
+            if trace is None:
+                return {"event": "error", "op": op, "message": "Already recording"}
+            return {"event": "ok", "op": op, "session": self._sessions.get(trace)}
+        elif op == "stop":
+            if not await loop.run_in_executor(None, self._core.stop):
+                return {"event": "error", "op": op, "message": "Not recording"}
+        else:
+            return {"event": "error", "op": op, "message": f"Unknown op: {op}"}
+        return {"event": "ok", "op": op}
+
+
+async def _request(address: str, op: str) -> dict:
+    reader, writer = await open_connection(address)
+    writer.write(_encode({"op": op}))
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply
+
+
+async def _listen_forever(address: str):
+    reader, writer = await open_connection(address)
+    writer.write(_encode({"op": "subscribe"}))
+    while line := await reader.readline():
+        event = json.loads(line)
+        if event["event"] == "text":
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "finished":
+            print(flush=True)
+        elif event["event"] == "error":
+            print(f"\n[error: {event['message']}]", flush=True)
+
+
+def serve(args) -> int:
+    from audio import WavFileDevice
+    from core import DictationCore
+
+    cfg = config.load()
+    if args.api_key:
+        cfg["api_key"] = args.api_key
+    if args.base_url:
+        realtime.BASE_URL = args.base_url
+    if args.wav:
+        core = DictationCore(device_factory=lambda: WavFileDevice(args.wav, args.speed))
+    else:
+        core = DictationCore()
+    core.apply_config(cfg)
+    server = DictationServer(core, args.address)
+    server.start()
+    print(f"listening on {args.address}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        core.release()
+        server.close()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Local dictation server and client.")
+    parser.add_argument("--address", default=ADDRESS, help="socket path or pipe name")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("serve", help="run the dictation core headless and serve clients")
+    run.add_argument("--wav", help="16 kHz mono PCM16 WAV played as the mic on every dictation")
+    run.add_argument("--speed", type=float, default=1.0, help="playback speed of --wav vs real time")
+    run.add_argument("--api-key", default=os.environ.get("MISTRAL_API_KEY"))
+    run.add_argument("--base-url", help="realtime endpoint, e.g. a local fake server")
+    commands.add_parser("listen", help="print the text of every dictation")
+    for op in ("start", "stop", "status"):
+        commands.add_parser(op, help=f"send a {op} request")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve(args)
+    try:
+        if args.command == "listen":
+            asyncio.run(_listen_forever(args.address))
+            return 0
+        reply = asyncio.run(_request(args.address, args.command))
+    except KeyboardInterrupt:
+        return 0
+    except OSError as e:
+        print(f"can't reach the dictation server at {args.address}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(reply))
+    return 0 if reply["event"] != "error" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import json
+import math
+import os
+import threading
+import time
+
+import config
+
+SESSIONS_FILE = os.path.join(config.CONFIG_DIR, "sessions.jsonl")
+MAX_FILE_BYTES = 1_000_000
+BACKUP_COUNT = 3
+
+# Stages in the order a session passes through them; each is stamped once.
+STAGES = (
+    "hotkey",
+    "device_start",
+    "connect",
+    "session_created",
+    "first_audio_sent",
+    "first_mic_audio_sent",
+    "first_text",
+    "first_typed",
+)
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+
+class SessionTrace:
+    """Timestamps (time.monotonic) of one dictation session, filled in from several threads.
+
+    Audio-to-text lag is measured per text delta as the time since the oldest
+    mic chunk sent after the previous delta was captured.
+    """
+
+    def __init__(self, hotkey_at: float | None = None):
+        self.started = time.time()
+        self.marks: dict[str, float] = {}
+        self.lags: list[float] = []
+        self.deltas = 0
+        self.chars_typed = 0
+        self.text: list[str] = []  # the text deltas emitted, for the transcript history
+        self.extra: dict = {}
+        self._oldest_unanswered: float | None = None
+        self._lock = threading.Lock()
+        self.mark("hotkey", hotkey_at)
+
+    def mark(self, stage: str, at: float | None = None):
+        """Record when `stage` was first reached."""
+        with self._lock:
+            self.marks.setdefault(stage, time.monotonic() if at is None else at)
+
+    def chunk_sent(self, captured_at: float | None):
+        """Record an audio chunk going upstream; `captured_at` is None for generated silence."""
+        now = time.monotonic()
+        with self._lock:
+            self.marks.setdefault("first_audio_sent", now)
+            if captured_at is not None:
+                self.marks.setdefault("first_mic_audio_sent", now)
+                if self._oldest_unanswered is None:
+                    self._oldest_unanswered = captured_at
+
+    def text_received(self):
+        now = time.monotonic()
+        with self._lock:
+            self.marks.setdefault("first_text", now)
+            self.deltas += 1
+            if self._oldest_unanswered is not None:
+                self.lags.append(now - self._oldest_unanswered)
+                self._oldest_unanswered = None
+
+    def text_typed(self, chars: int):
+        now = time.monotonic()
+        with self._lock:
+            self.marks.setdefault("first_typed", now)
+            self.marks["last_typed"] = now
+            self.chars_typed += chars
+
+    def record(self) -> dict:
+        """Summarise the session as a JSON-serialisable dict (milliseconds from the hotkey)."""
+        with self._lock:
+            origin = self.marks["hotkey"]
+            stages = {
+                stage: round((self.marks[stage] - origin) * 1000, 1)
+                for stage in STAGES + ("stop", "last_typed", "end")
+                if stage in self.marks
+            }
+            lags = [lag * 1000 for lag in self.lags]
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "stages_ms": stages,
+                "deltas": self.deltas,
+                "chars_typed": self.chars_typed,
+                "lag_p50_ms": _round(percentile(lags, 50)),
+                "lag_p95_ms": _round(percentile(lags, 95)),
+                **self.extra,
+            }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+
+def _rotate(path: str):
+    for i in range(BACKUP_COUNT - 1, 0, -1):
+        src = f"{path}.{i}"
+        if os.path.exists(src):
+            os.replace(src, f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def append_record(record: dict, path: str = SESSIONS_FILE):
+    """Append one session record, rotating the file once it grows past MAX_FILE_BYTES."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        if os.path.getsize(path) >= MAX_FILE_BYTES:
+            _rotate(path)
+    except FileNotFoundError:
+        pass
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_records(limit: int = 50, path: str = SESSIONS_FILE) -> list[dict]:
+    """Return the most recent `limit` records from the current log file."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-limit:]
+    except FileNotFoundError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def summarize(records: list[dict]) -> str:
+    """Human-readable latency summary over `records`, for the tray's Diagnostics dialog."""
+    if not records:
+        return "No dictation sessions recorded yet."
+
+    def stage(name):
+        return [r["stages_ms"][name] for r in records if name in r.get("stages_ms", {})]
+
+    def fmt(value):
+        return "—" if value is None else f"{value:.0f} ms"
+
+    lines = [f"Last {len(records)} sessions (median / p95):"]
+    for label, name in (
+        ("Hotkey → mic open", "device_start"),
+        ("Hotkey → session ready", "session_created"),
+        ("Hotkey → first audio sent", "first_mic_audio_sent"),
+        ("Hotkey → first text", "first_text"),
+        ("Hotkey → first typed", "first_typed"),
+    ):
+        values = stage(name)
+        lines.append(f"{label}: {fmt(percentile(values, 50))} / {fmt(percentile(values, 95))}")
+    p50s = [r["lag_p50_ms"] for r in records if r.get("lag_p50_ms") is not None]
+    p95s = [r["lag_p95_ms"] for r in records if r.get("lag_p95_ms") is not None]
+    lines.append(f"Audio → text lag: {fmt(percentile(p50s, 50))} / {fmt(percentile(p95s, 95))}")
+    drains = [
+        r["stages_ms"]["end"] - r["stages_ms"]["stop"]
+        for r in records
+        if "stop" in r.get("stages_ms", {}) and "end" in r["stages_ms"]
+    ]
+    lines.append(f"Stop → last text: {fmt(percentile(drains, 50))} / {fmt(percentile(drains, 95))}")
+    captures = [r["capture"] for r in records if "capture" in r]
+    lossy = [c for c in captures if c["dropped_ms"]]
+    if lossy or any(c["spilled_ms"] for c in captures):
+        lines.append(
+            f"Upload backlog: {sum(c['dropped_ms'] for c in lossy)} ms of audio lost in {len(lossy)} sessions, "
+            f"deepest {max(c['max_depth_ms'] for c in captures)} ms"
+        )
+    lines.append(f"\nLog: {SESSIONS_FILE}")
+    return "\n".join(lines)
+
+
+def summarize_endpoint(stats: dict) -> str:
+    """One-paragraph summary of EndpointHealth.stats() for the Diagnostics dialog."""
+
+    def fmt(value):
+        return "—" if value is None else f"{value * 1000:.0f} ms"
+
+    lines = [
+        f"Endpoint: {'down (rejecting dictations)' if stats['state'] == 'open' else 'up'}, "
+        f"connect {fmt(stats['latency_p50'])} / {fmt(stats['latency_p95'])} over {stats['connects']} connects"
+    ]
+    failures = stats["recent_failures"]
+    if failures:
+        at, reason = failures[-1]
+        when = time.strftime("%H:%M:%S", time.localtime(at))
+        lines.append(f"{len(failures)} recent connect failures, last at {when}: {reason}")
+    if stats.get("probes"):
+        lines.append(f"Background probes found it back up {stats['probes']} times, probe {fmt(stats['probe_latency_p50'])}")
+    return "\n".join(lines)
+
+
+def summarize_footprint(now: dict, idle: dict | None) -> str:
+    """Memory and threads now and after the last idle release (footprint.snapshot()s), for the Diagnostics dialog."""
+
+    def fmt(snapshot):
+        rss = "—" if snapshot["rss_mb"] is None else f"{snapshot['rss_mb']:.0f} MB"
+        return f"{rss}, {snapshot['threads']} threads ({snapshot['python_threads']} Python)"
+
+    lines = [f"Memory now: {fmt(now)}"]
+    if idle is not None:
+        when = time.strftime("%H:%M:%S", time.localtime(idle["at"]))
+        lines.append(f"Idle, resources released at {when}: {fmt(idle)}")
+    return "\n".join(lines)
@@ -0,0 +1,194 @@
+import math
+
+import numpy as np
+
+SAMPLE_RATE = 16_000
+DC_CUTOFF_HZ = 20.0
+AGC_FRAME = 160  # samples (10 ms) per gain decision
+AGC_TARGET_DB = -20.0  # speech level the gain aims for
+AGC_MAX_GAIN_DB = 24.0
+AGC_FLOOR_DB = -55.0  # frames below this are treated as silence and leave the gain alone
+
+
+def level_db(pcm) -> float:
+    """RMS level of PCM16 bytes in dBFS, -120 for silence."""
+    x = np.frombuffer(pcm, dtype=np.int16)
+    if not x.size:
+        return -120.0
+    x = x.astype(np.float32)
+    return 10 * math.log10(max(float(np.dot(x, x)) / x.size / 32768.0 ** 2, 1e-12))
+
+
+class StreamingResampler:
+    """Polyphase windowed-sinc resampler from `in_rate` to `out_rate`, fed chunk by chunk.
+
+    The ratio is reduced to L/M; output sample n is the dot product of the last
+    `taps` input samples up to floor(n * M / L) with filter phase n * M mod L. Its
+    position depends only on n, never on where chunks begin or end, so any
+    chunking of the same input gives the same output. The Kaiser-windowed
+    prototype passes up to 90% of the output Nyquist frequency and attenuates
+    everything from Nyquist up by `attenuation_db`. Causal: nothing is held back
+    except the filter's history.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = SAMPLE_RATE, attenuation_db: float = 80.0):
+        g = math.gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // g, in_rate // g
+        nyquist = min(in_rate, out_rate) / 2
+        transition = 0.1 * nyquist
+        cutoff = nyquist - transition / 2  # -6 dB point, halfway through the transition band
+        # Kaiser's estimate of the length for this attenuation and transition width, at the input rate.
+        self.taps = math.ceil((attenuation_db - 8) / (2.285 * 2 * math.pi * transition / in_rate)) + 1
+        beta = 0.1102 * (attenuation_db - 8.7)
+        total = self.taps * self.up
+        t = (np.arange(total) - (total - 1) / 2) / (in_rate * self.up)
+        h = 2 * cutoff / in_rate * np.sinc(2 * cutoff * t) * np.kaiser(total, beta)
+        # phases[p, i] weighs input sample base - (taps - 1) + i, i.e. windows are read oldest first.
+        self._phases = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1])
+        self._history = np.zeros(self.taps - 1)  # input samples before the chunk, starting at index _start
+        self._start = -(self.taps - 1)
+        self._received = 0  # input samples so far
+        self._next = 0  # index of the next output sample
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        """Feed float64 input samples; return every output sample they complete."""
+        buf = np.concatenate((self._history, x))
+        self._received += x.size
+        end = (self._received * self.up + self.down - 1) // self.down  # outputs with base < received
+        out = np.empty(end - self._next)
+        if out.size:
+            windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+            for q in range(min(self.up, out.size)):
+                n = self._next + q
+                base = n * self.down // self.up
+                first = base - (self.taps - 1) - self._start
+                count = len(range(q, out.size, self.up))
+                rows = windows[first:first + (count - 1) * self.down + 1:self.down]
+                out[q::self.up] = rows @ self._phases[n * self.down % self.up]
+        self._next = end
+        keep_from = self._next * self.down // self.up - (self.taps - 1)  # oldest sample the next output needs
+        self._history = buf[keep_from - self._start:]
+        self._start = keep_from
+        return out
+
+
+class DcBlocker:
+    """One-pole high-pass y[n] = x[n] - x[n-1] + r * y[n-1], removing a mic's DC offset.
+
+    Runs in blocks: within a block the recursion is a matrix product with the
+    precomputed impulse response, and only the last output carries over.
+    """
+
+    def __init__(self, rate: int = SAMPLE_RATE, cutoff_hz: float = DC_CUTOFF_HZ, block: int = 160):
+        self._r = 1.0 - 2 * math.pi * cutoff_hz / rate
+        lags = np.arange(block)[:, None] - np.arange(block)[None, :]
+        self._response = np.tril(self._r ** np.maximum(lags, 0))  # response[i, k] = r^(i-k), k <= i
+        self._carry = self._r ** np.arange(1, block + 1)
+        self._block = block
+        self._x = 0.0  # last input
+        self._y = 0.0  # last output
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        if not x.size:
+            return x
+        d = np.diff(x, prepend=self._x)
+        self._x = x[-1]
+        y = np.empty_like(d)
+        b = self._block
+        full = d.size // b * b
+        if full:
+            blocks = d[:full].reshape(-1, b) @ self._response.T
+            for row in blocks:
+                row += self._carry * self._y
+                self._y = row[-1]
+            y[:full] = blocks.ravel()
+        if full < d.size:
+            n = d.size - full
+            y[full:] = self._response[:n, :n] @ d[full:] + self._carry[:n] * self._y
+            self._y = y[-1]
+        return y
+
+
+class AutoGain:
+    """Slow automatic gain control that brings quiet microphones up to a speech level.
+
+    The gain is decided once per AGC_FRAME samples at fixed positions in the
+    stream, from the level of the frames before, so it doesn't depend on how the
+    audio is chunked. It falls fast when the level overshoots or the signal
+    would clip, rises slowly, never exceeds AGC_MAX_GAIN_DB, and holds still
+    through silence so background noise isn't pumped up between words.
+    """
+
+    def __init__(self, target_db: float = AGC_TARGET_DB, max_gain_db: float = AGC_MAX_GAIN_DB,
+                 floor_db: float = AGC_FLOOR_DB, attack: float = 0.3, release: float = 0.01):
+        self._target = 10 ** (target_db / 20)
+        self._max_gain = 10 ** (max_gain_db / 20)
+        self._floor = 10 ** (floor_db / 20)
+        self._attack = attack  # share of the way to the wanted gain per frame when lowering it
+        self._release = release  # ... and when raising it
+        self.gain = 1.0
+        self._energy = 0.0  # sum of squares of the current frame so far
+        self._peak = 0.0
+        self._filled = 0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        y = np.empty_like(x)
+        pos = 0
+        while pos < x.size:
+            n = min(AGC_FRAME - self._filled, x.size - pos)
+            seg = x[pos:pos + n]
+            y[pos:pos + n] = seg * self.gain
+            self._energy += float(np.dot(seg, seg))
+            self._peak = max(self._peak, float(np.max(np.abs(seg))))
+            self._filled += n
+            pos += n
+            if self._filled == AGC_FRAME:
+                self._update(math.sqrt(self._energy / AGC_FRAME), self._peak)
+                self._energy = self._peak = 0.0
+                self._filled = 0
+        return y
+
+    def _update(self, level: float, peak: float):
+        if level < self._floor:
+            return
+        wanted = min(self._max_gain, self._target / level, 0.9 / max(peak, 1e-9))
+        rate = self._attack if wanted < self.gain else self._release
+        self.gain += (wanted - self.gain) * rate
+
+
+class FrontEnd:
+    """Turns raw capture buffers into the 16 kHz mono PCM16 the rest of the app uses.
+
+    Input is interleaved `dtype` samples (int16 or float32) with `channels`
+    channels at `in_rate`. Channels are averaged, then resampled, DC-blocked and
+    optionally gain-controlled, all vectorized and with state kept across
+    buffers. When the input is already 16 kHz mono int16 and no stage is
+    enabled, buffers pass through untouched.
+    """
+
+    def __init__(self, in_rate: int = SAMPLE_RATE, dtype=np.int16, channels: int = 1,
+                 dc_block: bool = True, agc: bool = False):
+        self._dtype = np.dtype(dtype)
+        self._scale = 32768.0 if self._dtype == np.int16 else 1.0
+        self._channels = channels
+        self._resampler = StreamingResampler(in_rate) if in_rate != SAMPLE_RATE else None
+        self._dc = DcBlocker() if dc_block else None
+        self._agc = AutoGain()
+        self.agc = agc
+        self.passthrough = (self._resampler is None and self._dtype == np.int16
+                            and channels == 1 and not dc_block)
+
+    def process(self, data) -> bytes:
+        """One capture buffer in; the PCM16 bytes it yields out (possibly empty)."""
+        if self.passthrough and not self.agc:
+            return data
+        x = np.frombuffer(data, dtype=self._dtype).astype(np.float64) / self._scale
+        if self._channels > 1:
+            x = x[:x.size // self._channels * self._channels].reshape(-1, self._channels).mean(axis=1)
+        if self._resampler is not None:
+            x = self._resampler.process(x)
+        if self._dc is not None:
+            x = self._dc.process(x)
+        if self.agc:
+            x = self._agc.process(x)
+        return np.clip(np.rint(x * 32768.0), -32768, 32767).astype(np.int16).tobytes()
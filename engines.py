@@ -0,0 +1,188 @@
+import asyncio
+import json
+import threading
+
+import realtime
+from audio import PcmRingBuffer
+from diagnostics import SessionTrace
+from health import EndpointHealth
+from realtime import StandbySession, audio_stream
+from vad import VoiceActivityGate
+
+try:
+    import vosk
+except ImportError:  # optional: only needed for the local engine
+    vosk = None
+
+ENGINES = ("mistral", "local", "auto")
+FALLBACK_CONNECT_MS = 1500  # auto mode: switch to the local engine if no session by then
+
+
+class Engine:
+    """A streaming speech-to-text backend driven by TranscriptionWorker.
+
+    `run` consumes PCM16 chunks from `audio_queue` while `is_running()` holds and
+    reports progress through `on_status` ("connecting", "listening", ...) and
+    `on_text(delta)`. It returns when the audio ends and raises on failure.
+    """
+
+    name = ""
+
+    async def run(
+        self,
+        audio_queue: PcmRingBuffer,
+        is_running: callable,
+        *,
+        gate: VoiceActivityGate | None = None,
+        trace: SessionTrace | None = None,
+        on_status: callable = None,
+        on_text: callable = None,
+    ):
+        raise NotImplementedError
+
+
+class MistralEngine(Engine):
+    """Mistral's realtime transcription API over a websocket."""
+
+    name = "mistral"
+
+    def __init__(
+        self,
+        api_key: str,
+        warmup: str = "adaptive",
+        standby: StandbySession | None = None,
+        reconnect_attempts: int = realtime.RECONNECT_ATTEMPTS,
+        health: EndpointHealth | None = None,
+        connect_timeout: float = realtime.CONNECT_TIMEOUT,
+        first_event_timeout: float = realtime.FIRST_EVENT_TIMEOUT,
+    ):
+        self._api_key = api_key
+        self._warmup = warmup
+        self._standby = standby
+        self._reconnect_attempts = reconnect_attempts
+        self._health = health
+        self._connect_timeout = connect_timeout
+        self._first_event_timeout = first_event_timeout
+
+    async def run(self, audio_queue, is_running, *, gate=None, trace=None, on_status=None, on_text=None):
+        await realtime.run_session(
+            self._api_key,
+            audio_queue,
+            is_running,
+            warmup=self._warmup,
+            gate=gate,
+            trace=trace,
+            standby=self._standby,
+            reconnect_attempts=self._reconnect_attempts,
+            health=self._health,
+            connect_timeout=self._connect_timeout,
+            first_event_timeout=self._first_event_timeout,
+            on_status=on_status,
+            on_text=on_text,
+        )
+
+
+_models: dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def load_local_model(path: str):
+    """Load (once) and return the Vosk model at `path`. Blocking; safe to call from any thread."""
+    if vosk is None:
+        raise RuntimeError("The local engine needs the 'vosk' package (pip install vosk)")
+    if not path:
+        raise RuntimeError("Set the local model folder in Settings")
+    with _models_lock:
+        if path not in _models:
+            vosk.SetLogLevel(-1)
+            _models[path] = vosk.Model(path)
+        return _models[path]
+
+
+class LocalEngine(Engine):
+    """Offline recognition on the CPU with a Vosk (Kaldi) model, fed incrementally.
+
+    Typed text can't be taken back, so only finalized utterances are emitted,
+    not Vosk's revisable partial hypotheses.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path: str):
+        self._model_path = model_path
+
+    async def run(self, audio_queue, is_running, *, gate=None, trace=None, on_status=None, on_text=None):
+        loop = asyncio.get_running_loop()
+        model = await loop.run_in_executor(None, load_local_model, self._model_path)
+        recognizer = vosk.KaldiRecognizer(model, realtime.SAMPLE_RATE)
+        if trace is not None:
+            trace.mark("session_created")
+        if on_status is not None:
+            on_status("listening")
+
+        emitted = False
+
+        def emit(result_json: str):
+            nonlocal emitted
+            text = json.loads(result_json).get("text", "")
+            if not text:
+                return
+            if trace is not None:
+                trace.text_received()
+            if on_text is not None:
+                on_text((" " if emitted else "") + text)
+            emitted = True
+
+        async for chunk in audio_stream(audio_queue, is_running, "off", gate, trace):
+            # The chunk may be a view into the ring, only valid until the next read.
+            final = await loop.run_in_executor(None, recognizer.AcceptWaveform, bytes(chunk))
+            if final:
+                emit(recognizer.Result())
+        emit(await loop.run_in_executor(None, recognizer.FinalResult))
+
+
+async def run_with_fallback(
+    primary: Engine,
+    fallback: Engine,
+    threshold: float,
+    audio_queue: PcmRingBuffer,
+    is_running: callable,
+    *,
+    gate: VoiceActivityGate | None = None,
+    trace: SessionTrace | None = None,
+    on_status: callable = None,
+    on_text: callable = None,
+):
+    """Run `primary`, switching to `fallback` if it isn't listening within `threshold` seconds.
+
+    Mic audio waits in the ring until a session is ready (the realtime SDK only
+    reads audio after the handshake), so nothing is lost by the switch. A primary
+    that fails before it is listening also falls back.
+    """
+    ready = asyncio.Event()
+
+    def status(state: str):
+        if state == "listening":
+            ready.set()
+        if on_status is not None:
+            on_status(state)
+
+    task = asyncio.ensure_future(primary.run(
+        audio_queue, is_running, gate=gate, trace=trace, on_status=status, on_text=on_text,
+    ))
+    waiter = asyncio.ensure_future(ready.wait())
+    await asyncio.wait({task, waiter}, timeout=threshold, return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
+    if ready.is_set() or (task.done() and not task.cancelled() and task.exception() is None):
+        await task
+        return
+
+    task.cancel()
+    await asyncio.wait({task})  # let it close its connection; its outcome no longer matters
+    if trace is not None:
+        trace.extra["fallback"] = f"{primary.name} -> {fallback.name}"
+    if on_status is not None:
+        on_status("fallback")
+    await fallback.run(
+        audio_queue, is_running, gate=gate, trace=trace, on_status=on_status, on_text=on_text,
+    )
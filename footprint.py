@@ -0,0 +1,116 @@
+"""Process memory and thread counts, and handing memory freed while idle back to the OS."""
+import ctypes
+import gc
+import os
+import sys
+import threading
+import time
+
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    class _MemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    class _ThreadEntry(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ThreadID", wintypes.DWORD),
+            ("th32OwnerProcessID", wintypes.DWORD),
+            ("tpBasePri", wintypes.LONG),
+            ("tpDeltaPri", wintypes.LONG),
+            ("dwFlags", wintypes.DWORD),
+        ]
+
+    TH32CS_SNAPTHREAD = 0x4
+    INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+
+    _kernel32 = ctypes.windll.kernel32
+    _kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    _kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    _kernel32.CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+    _kernel32.Thread32First.argtypes = [wintypes.HANDLE, ctypes.POINTER(_ThreadEntry)]
+    _kernel32.Thread32Next.argtypes = [wintypes.HANDLE, ctypes.POINTER(_ThreadEntry)]
+    _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    _kernel32.SetProcessWorkingSetSize.argtypes = [wintypes.HANDLE, ctypes.c_size_t, ctypes.c_size_t]
+    _psapi = ctypes.windll.psapi
+    _psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(_MemoryCounters), wintypes.DWORD]
+
+
+def rss_bytes() -> int | None:
+    """Memory resident in RAM (the working set on Windows), or None where it can't be read."""
+    if sys.platform == "win32":
+        counters = _MemoryCounters(cb=ctypes.sizeof(_MemoryCounters))
+        if _psapi.GetProcessMemoryInfo(_kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def thread_count() -> int:
+    """Native threads of this process, including ones Python doesn't know about (Qt, audio, DLLs)."""
+    if sys.platform == "win32":
+        snapshot = _kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPTHREAD, 0)
+        if snapshot == INVALID_HANDLE_VALUE:
+            return threading.active_count()
+        entry = _ThreadEntry(dwSize=ctypes.sizeof(_ThreadEntry))
+        pid, count = os.getpid(), 0
+        ok = _kernel32.Thread32First(snapshot, ctypes.byref(entry))
+        while ok:
+            count += entry.th32OwnerProcessID == pid
+            ok = _kernel32.Thread32Next(snapshot, ctypes.byref(entry))
+        _kernel32.CloseHandle(snapshot)
+        return count
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return threading.active_count()
+
+
+def snapshot() -> dict:
+    """Current RSS (MB, None if unknown), native and Python thread counts."""
+    rss = rss_bytes()
+    return {
+        "at": time.time(),
+        "rss_mb": None if rss is None else round(rss / (1024 * 1024), 1),
+        "threads": thread_count(),
+        "python_threads": threading.active_count(),
+    }
+
+
+def trim():
+    """Collect garbage and give free memory back to the OS, e.g. after releasing idle resources.
+
+    On Windows this empties the working set: pages still in use come back on
+    first touch, the rest stay out of RAM. With glibc, free heap pages are
+    returned with malloc_trim. Elsewhere only the garbage collection applies.
+    """
+    gc.collect()
+    if sys.platform == "win32":
+        _kernel32.SetProcessWorkingSetSize(_kernel32.GetCurrentProcess(), ctypes.c_size_t(-1).value,
+                                           ctypes.c_size_t(-1).value)
+        return
+    try:
+        ctypes.CDLL(None).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # not glibc
@@ -0,0 +1,110 @@
+import asyncio
+import collections
+import threading
+import time
+
+from diagnostics import percentile
+
+FAILURE_THRESHOLD = 2  # consecutive connect failures that open the breaker
+PROBE_INTERVAL = 2.0  # first delay between probes while the breaker is open
+PROBE_INTERVAL_MAX = 30.0
+
+
+class EndpointDown(Exception):
+    """Rejected without trying: the endpoint failed recently and hasn't come back yet."""
+
+
+class EndpointHealth:
+    """Recent connect latencies and failures of the realtime endpoint, plus a circuit breaker.
+
+    After `failure_threshold` connects in a row fail, the breaker opens: `check`
+    raises EndpointDown at once instead of letting the next dictation wait out
+    another timeout. While open, `probe` (an async callable that raises when
+    the endpoint is unreachable) runs in the background with backoff, and the
+    first success closes the breaker again. Recording and probing happen on the
+    event loop thread; the other methods may be called from any thread.
+    """
+
+    def __init__(
+        self,
+        probe: callable,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        probe_interval: float = PROBE_INTERVAL,
+        history: int = 20,
+    ):
+        self._probe = probe
+        self._failure_threshold = failure_threshold
+        self._probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._latencies: collections.deque[float] = collections.deque(maxlen=history)
+        self._failures: collections.deque[tuple[float, str]] = collections.deque(maxlen=history)
+        self._probes: collections.deque[float] = collections.deque(maxlen=history)  # successful probe latencies
+        self._consecutive = 0
+        self._opened_at: float | None = None
+        self._prober: asyncio.Task | None = None
+        self.last_error = ""
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def check(self):
+        """Raise EndpointDown while the breaker is open."""
+        if self._opened_at is not None:
+            raise EndpointDown(f"Offline: {self.last_error}")
+
+    def record_success(self, latency: float):
+        """A connect that got as far as the session; `latency` in seconds."""
+        with self._lock:
+            self._latencies.append(latency)
+            self._consecutive = 0
+            self._opened_at = None
+
+    def record_probe(self, latency: float):
+        """A background probe that reached the endpoint; closes the breaker without counting as a connect."""
+        with self._lock:
+            self._probes.append(latency)
+            self._consecutive = 0
+            self._opened_at = None
+
+    def record_failure(self, reason: str):
+        """A connect that failed or timed out; may open the breaker and start probing."""
+        with self._lock:
+            self._failures.append((time.time(), reason))
+            self._consecutive += 1
+            self.last_error = reason
+            if self._opened_at is None and self._consecutive >= self._failure_threshold:
+                self._opened_at = time.monotonic()
+        if self._opened_at is not None and (self._prober is None or self._prober.done()):
+            self._prober = asyncio.get_running_loop().create_task(self._probe_until_up())
+
+    async def _probe_until_up(self):
+        interval = self._probe_interval
+        while self._opened_at is not None:
+            await asyncio.sleep(interval)
+            started = time.monotonic()
+            try:
+                await self._probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                with self._lock:
+                    self.last_error = str(e) or type(e).__name__
+                interval = min(PROBE_INTERVAL_MAX, interval * 2)
+                continue
+            self.record_probe(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            failures = list(self._failures)
+            probes = list(self._probes)
+        return {
+            "state": "open" if self.is_open else "closed",
+            "connects": len(latencies),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "recent_failures": failures,
+            "probes": len(probes),
+            "probe_latency_p50": percentile(probes, 50),
+        }
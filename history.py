@@ -0,0 +1,409 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import config
+
+HISTORY_DIR = os.path.join(config.CONFIG_DIR, "history")
+SEGMENT_BYTES = 1_000_000  # the active segment is sealed (indexed on disk) past this size
+COMPACT_FANOUT = 4  # this many sealed segments of one size tier are merged into one
+
+_FRAME = struct.Struct("<II")  # payload length, crc32
+_IDX_HEADER = struct.Struct("<8sQQQ")  # magic, records, postings, reserved
+_IDX_MAGIC = b"DHIDX001"
+_WORD = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+def _scan(path: str) -> tuple[list[int], int]:
+    """Offsets of the intact records of a segment file, and where the intact part ends."""
+    offsets = []
+    pos = 0
+    with open(path, "rb") as f:
+        data = f.read()
+    while pos + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, pos)
+        payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            break  # torn write at the end (crash while appending)
+        offsets.append(pos)
+        pos += _FRAME.size + length
+    return offsets, pos
+
+
+class _Sealed:
+    """An immutable segment: the record file and its index, both memory-mapped.
+
+    The index holds the record offsets (plus the end) and the postings as two
+    parallel arrays sorted by token hash: token hash, record number within the segment.
+    """
+
+    def __init__(self, seg_path: str, idx_path: str, first_id: int, generation: int):
+        self.seg_path, self.idx_path = seg_path, idx_path
+        self.first_id, self.generation = first_id, generation
+        self.size = os.path.getsize(seg_path)
+        self._seg_file = open(seg_path, "rb")
+        self._idx_file = open(idx_path, "rb")
+        self._seg = mmap.mmap(self._seg_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._idx = mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, records, postings, _ = _IDX_HEADER.unpack_from(self._idx, 0)
+        if magic != _IDX_MAGIC:
+            raise ValueError(f"Not a history index: {idx_path}")
+        pos = _IDX_HEADER.size
+        self.offsets = np.frombuffer(self._idx, dtype="<u8", count=records + 1, offset=pos)
+        pos += 8 * (records + 1)
+        self.hashes = np.frombuffer(self._idx, dtype="<u8", count=postings, offset=pos)
+        pos += 8 * postings
+        self.locals = np.frombuffer(self._idx, dtype="<u4", count=postings, offset=pos)
+        self.count = records
+
+    @staticmethod
+    def write(idx_path: str, offsets, hashes: np.ndarray, locals_: np.ndarray):
+        order = np.lexsort((locals_, hashes))
+        with open(idx_path + ".tmp", "wb") as f:
+            f.write(_IDX_HEADER.pack(_IDX_MAGIC, len(offsets) - 1, len(hashes), 0))
+            f.write(np.asarray(offsets, dtype="<u8").tobytes())
+            f.write(hashes[order].astype("<u8").tobytes())
+            f.write(locals_[order].astype("<u4").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(idx_path + ".tmp", idx_path)
+
+    def read(self, local: int) -> dict:
+        start = int(self.offsets[local]) + _FRAME.size
+        return json.loads(self._seg[start:int(self.offsets[local + 1])])
+
+    def matches(self, hashes: list[int], limit: int) -> np.ndarray:
+        """Up to `limit` record numbers whose postings contain every hash, newest first.
+
+        Walks the rarest hash's postings from the end in blocks and keeps the
+        records found, by binary search, in every other hash's postings, so the
+        cost follows the number of hits wanted rather than the posting lengths.
+        """
+        spans = []
+        for h in hashes:
+            lo, hi = np.searchsorted(self.hashes, h, side="left"), np.searchsorted(self.hashes, h, side="right")
+            if lo == hi:
+                return np.empty(0, dtype=np.uint32)
+            spans.append(self.locals[lo:hi])
+        spans.sort(key=len)
+        found, total, end, block = [], 0, len(spans[0]), 64
+        while end > 0 and total < limit:
+            candidates = spans[0][max(0, end - block):end][::-1]
+            for postings in spans[1:]:
+                pos = np.minimum(np.searchsorted(postings, candidates), len(postings) - 1)
+                candidates = candidates[postings[pos] == candidates]
+            found.append(candidates)
+            total += len(candidates)
+            end -= block
+            block *= 4
+        return np.concatenate(found)[:limit] if found else np.empty(0, dtype=np.uint32)
+
+    def close(self):
+        # Views into the index must go before the map can close.
+        self.offsets = self.hashes = self.locals = None
+        self._seg.close()
+        self._idx.close()
+        self._seg_file.close()
+        self._idx_file.close()
+
+
+class TranscriptHistory:
+    """Append-only, indexed log of dictated text, in segment files under `path`.
+
+    Records (JSON with the text, start time and latency stats) are appended to
+    the active segment with a length and CRC frame, so a torn write at the end
+    is dropped on the next open. Its postings (token hash, record) are kept in
+    memory in flat arrays. Past `segment_bytes` it is sealed: the postings are
+    sorted into an index file, and segment and index are then only read through
+    mmap, searched by binary search. Sealed segments are merged in the
+    background once `fanout` of one size tier pile up, so a search touches
+    O(log n) segments and memory holds only the active segment's postings.
+
+    Search matches whole words (every word of the query, in any order) and
+    returns the newest records first. Thread-safe.
+    """
+
+    def __init__(self, path: str = HISTORY_DIR, segment_bytes: int = SEGMENT_BYTES,
+                 fanout: int = COMPACT_FANOUT, background: bool = True):
+        self._path = path
+        self._segment_bytes = segment_bytes
+        self._fanout = fanout
+        self._background = background
+        self._lock = threading.Lock()
+        self._compactor: threading.Thread | None = None
+        self._sealed: list[_Sealed] = []
+        os.makedirs(path, exist_ok=True)
+        self._open_segments()
+
+    # -- files ---------------------------------------------------------------
+
+    def _name(self, first_id: int, generation: int, ext: str) -> str:
+        return os.path.join(self._path, f"{first_id:010d}-{generation}.{ext}")
+
+    def _open_segments(self):
+        """Load the segments on disk, finishing or undoing whatever a crash interrupted."""
+        found = {}
+        for name in os.listdir(self._path):
+            stem, ext = os.path.splitext(name)
+            if ext == ".tmp":
+                os.remove(os.path.join(self._path, name))
+                continue
+            if ext not in (".seg", ".idx"):
+                continue
+            first, _, generation = stem.partition("-")
+            found.setdefault((int(first), int(generation)), set()).add(ext)
+        # Newest generation first for the same first id, so a finished merge wins over its inputs.
+        segments = sorted(found.items(), key=lambda item: (item[0][0], -item[0][1]))
+        covered_to = -1
+        active = None
+        for (first, generation), exts in segments:
+            seg, idx = self._paths(first, generation)
+            if first <= covered_to or ".seg" not in exts or (generation and ".idx" not in exts):
+                # Already merged into a newer segment, or half-written by an interrupted merge.
+                for path in (seg, idx):
+                    if os.path.exists(path):
+                        os.remove(path)
+                continue
+            if ".idx" not in exts:
+                if (first, generation) == segments[-1][0]:
+                    active = (first, generation)
+                    continue
+                self._seal_file(first, generation)  # interrupted while sealing
+            sealed = _Sealed(seg, idx, first, generation)
+            self._sealed.append(sealed)
+            covered_to = first + sealed.count - 1
+        self._next_id = covered_to + 1
+        self._start_active(active)
+
+    def _paths(self, first: int, generation: int) -> tuple[str, str]:
+        return self._name(first, generation, "seg"), self._name(first, generation, "idx")
+
+    def _seal_file(self, first: int, generation: int):
+        """Write the index of a segment file that has none."""
+        seg, idx = self._paths(first, generation)
+        offsets, end = _scan(seg)
+        with open(seg, "rb") as f:
+            data = f.read(end)
+        hashes, locals_ = array.array("Q"), array.array("I")
+        for local, offset in enumerate(offsets):
+            length, _ = _FRAME.unpack_from(data, offset)
+            record = json.loads(data[offset + _FRAME.size:offset + _FRAME.size + length])
+            for token in _tokens(record["text"]):
+                hashes.append(_token_hash(token))
+                locals_.append(local)
+        with open(seg, "r+b") as f:
+            f.truncate(end)
+        _Sealed.write(idx, offsets + [end], np.frombuffer(hashes, dtype=np.uint64),
+                      np.frombuffer(locals_, dtype=np.uint32))
+
+    def _start_active(self, existing: tuple[int, int] | None):
+        """Open (and re-index in memory) the active segment, or start a new one at the next id."""
+        if existing is None:
+            existing = (self._next_id, 0)
+        self._active_first = existing[0]
+        seg = self._paths(*existing)[0]
+        self._active_offsets: list[int] = []
+        self._active_hashes = array.array("Q")
+        self._active_locals = array.array("I")
+        end = 0
+        if os.path.exists(seg):
+            self._active_offsets, end = _scan(seg)
+            with open(seg, "r+b") as f:
+                f.truncate(end)  # drop a torn record
+                for local, offset in enumerate(self._active_offsets):
+                    f.seek(offset)
+                    length, _ = _FRAME.unpack(f.read(_FRAME.size))
+                    self._index_active(local, json.loads(f.read(length))["text"])
+        self._active_path = seg
+        self._active_end = end
+        self._writer = open(seg, "ab")
+        self._reader = open(seg, "rb")
+        self._next_id = self._active_first + len(self._active_offsets)
+
+    def _index_active(self, local: int, text: str):
+        for token in _tokens(text):
+            self._active_hashes.append(_token_hash(token))
+            self._active_locals.append(local)
+
+    # -- writing -------------------------------------------------------------
+
+    def append(self, text: str, started: float | None = None, stats: dict | None = None) -> int:
+        """Store one dictation's final text; returns its id."""
+        with self._lock:
+            record_id = self._next_id
+            record = {"id": record_id, "started": time.time() if started is None else started, "text": text}
+            if stats:
+                record["stats"] = stats
+            payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+            self._writer.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._writer.flush()
+            local = len(self._active_offsets)
+            self._active_offsets.append(self._active_end)
+            self._active_end += _FRAME.size + len(payload)
+            self._index_active(local, text)
+            self._next_id += 1
+            sealed = self._active_end >= self._segment_bytes
+            if sealed:
+                self._seal_active()
+        if sealed:
+            if not self._background:
+                self.compact()
+            elif self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self.compact, name="history-compact", daemon=True)
+                self._compactor.start()
+        return record_id
+
+    def _seal_active(self):
+        """Under the lock: index the active segment on disk, map it, and start a new one."""
+        self._writer.close()
+        self._reader.close()
+        seg, idx = self._paths(self._active_first, 0)
+        _Sealed.write(idx, self._active_offsets + [self._active_end],
+                      np.frombuffer(self._active_hashes, dtype=np.uint64),
+                      np.frombuffer(self._active_locals, dtype=np.uint32))
+        self._sealed.append(_Sealed(seg, idx, self._active_first, 0))
+        self._start_active(None)
+
+    def _tier(self, sealed: _Sealed) -> int:
+        tier, size = 0, self._segment_bytes * self._fanout
+        while sealed.size >= size:
+            tier, size = tier + 1, size * self._fanout
+        return tier
+
+    def compact(self):
+        """Merge runs of `fanout` sealed segments of the same size tier until none is left."""
+        while True:
+            with self._lock:
+                group = None
+                for start in range(len(self._sealed) - self._fanout + 1):
+                    run = self._sealed[start:start + self._fanout]
+                    if len({self._tier(s) for s in run}) == 1:
+                        group = run
+                        break
+                if group is None:
+                    return
+            merged = self._merge(group)  # outside the lock: sealed segments are immutable
+            with self._lock:
+                start = self._sealed.index(group[0])
+                self._sealed[start:start + len(group)] = [merged]
+                for old in group:
+                    old.close()
+                    os.remove(old.seg_path)
+                    os.remove(old.idx_path)
+
+    def _merge(self, group: list[_Sealed]) -> _Sealed:
+        first = group[0].first_id
+        generation = max(s.generation for s in group) + 1
+        seg, idx = self._paths(first, generation)
+        offsets, hashes, locals_ = [], [], []
+        base = 0
+        with open(seg + ".tmp", "wb") as f:
+            for s in group:
+                with open(s.seg_path, "rb") as src:
+                    shutil.copyfileobj(src, f)
+                offsets.append(s.offsets[:-1].astype(np.int64) + base)
+                hashes.append(np.array(s.hashes))
+                locals_.append(s.locals.astype(np.int64) + (s.first_id - first))
+                base += s.size
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(seg + ".tmp", seg)
+        _Sealed.write(idx, np.concatenate(offsets + [np.array([base])]), np.concatenate(hashes),
+                      np.concatenate(locals_))
+        return _Sealed(seg, idx, first, generation)
+
+    # -- reading -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._next_id - (self._sealed[0].first_id if self._sealed else self._active_first)
+
+    def _read_active(self, local: int) -> dict:
+        self._reader.seek(self._active_offsets[local])
+        length, _ = _FRAME.unpack(self._reader.read(_FRAME.size))
+        return json.loads(self._reader.read(length))
+
+    def last(self) -> dict | None:
+        """The most recent record, or None if the history is empty."""
+        with self._lock:
+            if self._active_offsets:
+                return self._read_active(len(self._active_offsets) - 1)
+            if self._sealed:
+                return self._sealed[-1].read(self._sealed[-1].count - 1)
+            return None
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        """The newest `limit` records, newest first."""
+        results = []
+        with self._lock:
+            for local in range(len(self._active_offsets) - 1, -1, -1):
+                if len(results) >= limit:
+                    return results
+                results.append(self._read_active(local))
+            for sealed in reversed(self._sealed):
+                for local in range(sealed.count - 1, -1, -1):
+                    if len(results) >= limit:
+                        return results
+                    results.append(sealed.read(local))
+        return results
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        """Records containing every word of `query`, newest first."""
+        words = _tokens(query)
+        if not words:
+            return []
+        # As numpy scalars: comparing a uint64 array with a Python int past 2**63 converts the whole array.
+        hashes = [np.uint64(h) for h in sorted(_token_hash(w) for w in words)]
+        results = []
+        with self._lock:
+            if self._active_offsets:
+                active_hashes = np.frombuffer(self._active_hashes, dtype=np.uint64)
+                active_locals = np.frombuffer(self._active_locals, dtype=np.uint32)
+                found = None
+                for h in hashes:
+                    hits = np.unique(active_locals[active_hashes == h])
+                    found = hits if found is None else np.intersect1d(found, hits, assume_unique=True)
+                del active_hashes, active_locals  # an array.array can't grow while a view exports it
+                self._collect(found[::-1], self._read_active, words, limit, results)
+            for sealed in reversed(self._sealed):
+                if len(results) >= limit:
+                    break
+                self._collect(sealed.matches(hashes, limit - len(results)), sealed.read, words, limit, results)
+        return results
+
+    @staticmethod
+    def _collect(locals_, read, words: set[str], limit: int, results: list[dict]):
+        for local in locals_:
+            if len(results) >= limit:
+                return
+            record = read(int(local))
+            if words <= _tokens(record["text"]):  # rules out hash collisions
+                results.append(record)
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._writer.close()
+            self._reader.close()
+            for sealed in self._sealed:
+                sealed.close()
+            self._sealed = []
@@ -0,0 +1,51 @@
+import time
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication, QDialog, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+
+from history import TranscriptHistory
+
+RESULTS = 50
+
+
+class HistoryDialog(QDialog):
+    """Search box over the transcript history; Enter or double-click copies a dictation."""
+
+    def __init__(self, history: TranscriptHistory, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Dictation History")
+        self.resize(520, 400)
+        self._history = history
+
+        layout = QVBoxLayout(self)
+        self._query_edit = QLineEdit()
+        self._query_edit.setPlaceholderText("Search words...")
+        self._query_edit.textChanged.connect(self._refresh)
+        self._query_edit.returnPressed.connect(self._copy_current)
+        layout.addWidget(self._query_edit)
+
+        self._list = QListWidget()
+        self._list.setWordWrap(True)
+        self._list.itemActivated.connect(self._copy)
+        layout.addWidget(self._list)
+
+        self._refresh("")
+
+    def _refresh(self, query: str):
+        records = self._history.search(query, RESULTS) if query.strip() else self._history.recent(RESULTS)
+        self._list.clear()
+        for record in records:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(record["started"]))
+            item = QListWidgetItem(f"{when}  {record['text']}")
+            item.setData(Qt.ItemDataRole.UserRole, record["text"])
+            self._list.addItem(item)
+        if self._list.count():
+            self._list.setCurrentRow(0)
+
+    def _copy_current(self):
+        if self._list.currentItem() is not None:
+            self._copy(self._list.currentItem())
+
+    def _copy(self, item: QListWidgetItem):
+        QApplication.clipboard().setText(item.data(Qt.ItemDataRole.UserRole))
+        self.accept()
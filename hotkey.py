@@ -1,9 +1,37 @@
+import ctypes
+import sys
 import time
 
 import keyboard
 
 from PySide6.QtCore import QObject, Signal
 
+MOD_CTRL = 1
+MOD_SHIFT = 2
+MOD_ALT = 4
+MOD_WIN = 8
+_MODIFIER_BITS = {"ctrl": MOD_CTRL, "shift": MOD_SHIFT, "alt": MOD_ALT, "win": MOD_WIN}
+
+# Modifier keys as the hook reports them: by English name, or by scan code
+# when the layout localizes key names.
+_MODIFIER_NAMES = {
+    "ctrl": MOD_CTRL, "left ctrl": MOD_CTRL, "right ctrl": MOD_CTRL,
+    "shift": MOD_SHIFT, "left shift": MOD_SHIFT, "right shift": MOD_SHIFT,
+    "alt": MOD_ALT, "left alt": MOD_ALT, "right alt": MOD_ALT, "alt gr": MOD_ALT,
+    "windows": MOD_WIN, "left windows": MOD_WIN, "right windows": MOD_WIN,
+}
+_MODIFIER_SCAN_CODES = {
+    29: MOD_CTRL, 42: MOD_SHIFT, 54: MOD_SHIFT, 56: MOD_ALT, 91: MOD_WIN, 92: MOD_WIN,
+}
+ESCAPE_SCAN_CODE = 1
+REPEAT_WINDOW = 1.0  # a key-down this soon after the last, with no key-up between, is auto-repeat
+
+# Per-combo behaviour; see config.get_hotkey_options
+HOTKEY_DEFAULTS = {"mode": "toggle", "repeat": "ignore"}
+HOTKEY_MODES = ("toggle", "hold")
+DEBOUNCE_MS = {"toggle": 1000, "hold": 50}  # per mode; a hold only needs to ride out key bounce
+REPEAT_POLICIES = ("ignore", "retrigger")
+
 
 def _parse_combo(combo: str):
     """Parse 'Ctrl+Shift+F23' into (frozenset of modifier names, key name)."""
@@ -15,59 +43,191 @@ def _parse_combo(combo: str):
     return modifiers, keys[0]
 
 
-def _get_active_modifiers() -> set[str]:
-    """Return the set of currently held modifier names."""
-    active = set()
-    if keyboard.is_pressed("ctrl"):
-        active.add("ctrl")
-    if keyboard.is_pressed("shift"):
-        active.add("shift")
-    if keyboard.is_pressed("alt"):
-        active.add("alt")
-    # Check left/right win keys by scan code
-    if keyboard.is_pressed(91) or keyboard.is_pressed(92):
-        active.add("win")
-    return active
+def _modifier_mask(modifiers) -> int:
+    mask = 0
+    for name in modifiers:
+        mask |= _MODIFIER_BITS[name]
+    return mask
+
+
+def _event_time(event: keyboard.KeyboardEvent) -> float:
+    """The event's timestamp (time.time(), taken in the hook) on the time.monotonic() clock."""
+    now = time.monotonic()
+    return now - max(0.0, time.time() - event.time) if event.time else now
+
+
+_MODIFIER_VKS = (  # virtual-key code -> MOD_* bit, for GetAsyncKeyState
+    (0x11, MOD_CTRL), (0x10, MOD_SHIFT), (0x12, MOD_ALT), (0x5B, MOD_WIN), (0x5C, MOD_WIN),
+)
+
+
+def _os_modifier_mask() -> int | None:
+    """The modifiers physically held right now per GetAsyncKeyState, or None off Windows."""
+    if sys.platform != "win32":
+        return None
+    get_state = ctypes.windll.user32.GetAsyncKeyState
+    get_state.restype = ctypes.c_short
+    mask = 0
+    for vk, bit in _MODIFIER_VKS:
+        if get_state(vk) & 0x8000:
+            mask |= bit
+    return mask
+
+
+class _ComboMatcher:
+    """Hook-side state of GlobalHotkey, matching key events against the compiled combos.
+
+    Runs for every keystroke on the machine, so modifier state is tracked from
+    the events themselves and a combo is a single dict lookup; the OS is never
+    queried here. A modifier whose key-up went missing (e.g. to the secure
+    desktop on Win+L) is dropped by `resync`. Kept off the QObject, whose
+    attribute access costs several times more.
+
+    Each combo has options (HOTKEY_DEFAULTS): "toggle" combos call
+    `on_trigger(at, False)` on key-down; "hold" combos call
+    `on_trigger(at, True)` on key-down and `on_release(at)` on the key's
+    key-up, `at` being the event's time.monotonic() stamp. A press within
+    `debounce_ms` (default DEBOUNCE_MS) of the last trigger or hold release is
+    swallowed, and auto-repeat of a held combo key triggers again only with
+    repeat "retrigger" (toggle combos). Times are the events' own timestamps.
+    """
+
+    __slots__ = ("dispatch", "keys", "held", "mods", "last_trigger", "last_release", "on_trigger",
+                 "on_release", "on_escape", "watch_escape", "down_key", "down_at", "holding")
+
+    def __init__(self, combos: list[str], on_trigger: callable, on_escape: callable,
+                 options: dict[str, dict] | None = None, on_release: callable = None):
+        # (key name, modifier mask) -> (combo, hold, debounce in s, retrigger on repeat)
+        self.dispatch: dict[tuple[str, int], tuple[str, bool, float, bool]] = {}
+        for combo in combos:
+            modifiers, key = _parse_combo(combo)
+            opts = {**HOTKEY_DEFAULTS, **(options or {}).get(combo, {})}
+            hold = opts["mode"] == "hold"
+            debounce = opts.get("debounce_ms", DEBOUNCE_MS[opts["mode"]]) / 1000
+            self.dispatch[key, _modifier_mask(modifiers)] = (
+                combo, hold, debounce, not hold and opts["repeat"] == "retrigger",
+            )
+        self.keys = {key for key, _ in self.dispatch}  # key names used by any combo
+        self.held: dict[tuple[int, str], int] = {}  # modifier keys down -> their MOD_* bit
+        self.mods = 0
+        self.last_trigger = 0.0
+        self.last_release = 0.0
+        self.on_trigger = on_trigger
+        self.on_release = on_release
+        self.on_escape = on_escape
+        self.watch_escape = False
+        self.down_key: str | None = None  # combo key (as the hook names it) down and not up yet
+        self.down_at = 0.0
+        self.holding = False  # a hold combo's key is down and its trigger was accepted
+
+    def on_event(self, event: keyboard.KeyboardEvent) -> bool:
+        """Return False to suppress the event (a combo's key), True to pass it through."""
+        name = event.name
+        if not name:
+            return True
+        bit = _MODIFIER_NAMES.get(name) or _MODIFIER_SCAN_CODES.get(event.scan_code)
+        if bit:
+            if event.event_type == "down":
+                self.held[event.scan_code, name] = bit
+            else:
+                self.held.pop((event.scan_code, name), None)
+            mods = 0
+            for held in self.held.values():
+                mods |= held
+            self.mods = mods
+            return True
+        if event.event_type != "down":
+            if name == self.down_key:
+                self._key_up(event)
+            return True
+        if self.watch_escape and event.scan_code == ESCAPE_SCAN_CODE:
+            self.on_escape()
+            return True
+        name = name.lower()
+        if name not in self.keys or not self.mods and (name, 0) not in self.dispatch:
+            return True
+        binding = self.dispatch.get((name, self.mods))
+        if binding is None:
+            return True
+        _, hold, debounce, retrigger = binding
+        at = _event_time(event)
+        repeat = event.name == self.down_key and at - self.down_at < REPEAT_WINDOW
+        self.down_key, self.down_at = event.name, at
+        if repeat and not retrigger or at - max(self.last_trigger, self.last_release) <= debounce:
+            return False  # swallowed, like the press it repeats
+        self.last_trigger = at
+        self.holding = hold
+        self.on_trigger(at, hold)
+        return False  # suppress the key (initial and repeats)
+
+    def _key_up(self, event: keyboard.KeyboardEvent):
+        self.down_key = None
+        if self.holding:
+            self.holding = False
+            self.last_release = _event_time(event)
+            if self.on_release is not None:
+                self.on_release(self.last_release)
+
+    def resync(self, actual: int):
+        """Forget tracked modifiers that `actual`, the OS's view, says are up.
+
+        Safe to call off the hook thread: `held` and `mods` are replaced, not mutated.
+        """
+        self.held = {key: bit for key, bit in self.held.items() if bit & actual}
+        mods = 0
+        for bit in self.held.values():
+            mods |= bit
+        self.mods = mods
 
 
 class GlobalHotkey(QObject):
-    """Registers system-wide hotkeys and emits `triggered` when any is pressed."""
+    """Registers system-wide hotkeys and emits `triggered` when any is pressed.
 
-    triggered = Signal()
+    `triggered` carries the key-down's time.monotonic() stamp and whether the
+    combo is in "hold" mode (push-to-talk, see `options`); for those it also
+    emits `released`, with the key-up's stamp, when the combo's key comes back
+    up. The payload is taken in the hook, so it holds even when the slot runs
+    late.
 
-    def __init__(self, combos: list[str] | None = None, parent=None):
+    While `set_watch_escape(True)` is in effect it also emits `escape_pressed`
+    for Esc key presses, which are passed through as usual.
+    """
+
+    triggered = Signal(float, bool)  # time.monotonic() of the key-down, hold combo
+    released = Signal(float)  # time.monotonic() of a hold combo's key-up
+    escape_pressed = Signal()
+
+    def __init__(self, combos: list[str] | None = None, options: dict[str, dict] | None = None,
+                 parent=None):
         super().__init__(parent)
         self._combos = combos or []
-        self._parsed: list[tuple[frozenset[str], str]] = []
-        self._last_trigger = 0.0
+        self._options = options or {}
+        self._matcher = _ComboMatcher([], self.triggered.emit, self.escape_pressed.emit)
         self._hook = None
 
     def start(self):
         """Register the hotkeys via low-level keyboard hook."""
-        self._parsed = [_parse_combo(c) for c in self._combos]
-        self._last_trigger = 0.0
-        if self._parsed:
-            self._hook = keyboard.hook(self._on_event, suppress=True)
-
-    def _on_event(self, event: keyboard.KeyboardEvent):
-        """Intercept every key event; suppress and fire on matching combo, pass others through."""
-        if not event.name:
-            return True
-        name = event.name.lower()
-        if event.event_type != "down":
-            return True
-        now = time.monotonic()
-        active = None
-        for modifiers, key in self._parsed:
-            if name == key:
-                if active is None:
-                    active = _get_active_modifiers()
-                if active == modifiers:
-                    if now - self._last_trigger > 1.0:
-                        self._last_trigger = now
-                        self.triggered.emit()
-                    return False  # suppress the key (initial and repeats)
-        return True  # pass through
+        watch_escape = self._matcher.watch_escape
+        self._matcher = _ComboMatcher(
+            self._combos, self.triggered.emit, self.escape_pressed.emit, self._options,
+            self.released.emit,
+        )
+        self._matcher.watch_escape = watch_escape
+        if self._matcher.dispatch:
+            self._hook = keyboard.hook(self._matcher.on_event, suppress=True)
+
+    def resync_modifiers(self):
+        """Drop modifiers the hook saw go down but not up, per the OS's key state.
+
+        Call when key-ups may have gone elsewhere, e.g. after the session is
+        unlocked; not per key event, where the query would cost every keystroke.
+        """
+        actual = _os_modifier_mask()
+        if actual is not None:
+            self._matcher.resync(actual)
+
+    def set_watch_escape(self, enabled: bool):
+        self._matcher.watch_escape = enabled
 
     def stop(self):
         """Unregister the hotkey."""
@@ -75,6 +235,7 @@ class GlobalHotkey(QObject):
             keyboard.unhook(self._hook)
             self._hook = None
 
-    def update_combos(self, combos: list[str]):
-        """Change the hotkey combos."""
+    def update_combos(self, combos: list[str], options: dict[str, dict] | None = None):
+        """Change the hotkey combos and their options."""
         self._combos = combos
+        self._options = options or {}
@@ -1,109 +1,286 @@
-import ctypes
+import collections
+import importlib
 import os
 import signal
+import socket
 import sys
-import winsound
+import threading
 
-from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QObject, QTimer, Slot
-
-VK_ESCAPE = 0x1B
+from PySide6.QtWidgets import QApplication, QMessageBox, QSystemTrayIcon
+from PySide6.QtCore import QObject, QSocketNotifier, Qt, QTimer, Signal, Slot
 
 import config
-from audio import AudioCapture
-from transcription import TranscriptionWorker
-from typing_output import type_text
+import diagnostics
 from hotkey import GlobalHotkey
-from overlay import OverlayWidget
 from tray import TrayIcon
-from settings import SettingsDialog
+from wakeups import TimerWakeupCounter
+
+# Not needed for the tray and hotkey to come up; imported on a background thread
+# right after (mistralai, numpy and miniaudio alone take over a second).
+DEFERRED_MODULES = ("dsp", "audio", "vad", "health", "realtime", "engines", "transcription", "typing_output",
+                    "overlay", "session_lock", "settings", "history", "history_dialog", "archive", "core",
+                    "daemon", "footprint")
+
+
+def _play_sound(name: str):
+    import winsound
+
+    _windir = os.environ.get("WINDIR", r"C:\Windows")
+    winsound.PlaySound(os.path.join(_windir, "Media", name), winsound.SND_FILENAME | winsound.SND_ASYNC)
 
 
 class App(QObject):
-    """Central controller wiring hotkey -> audio -> transcription -> typing."""
+    """The tray app: hotkey, overlay and typing around a DictationCore.
+
+    Only the tray and the hotkey are set up in the constructor. The other
+    components are built once their modules have been preloaded in the
+    background, or on first use if that comes sooner. The UI follows the
+    core's signals, so dictations started and stopped by IPC clients
+    (daemon.py, when enabled) show and type the same way as the hotkey's.
+
+    After `idle_release_timeout` seconds without a dictation, what only
+    dictations need is released (the event loop thread and its executor, the
+    mic, the overlay and its timers) and freed memory handed back to the OS;
+    each is rebuilt on first use, so the next hotkey works as before.
+    """
+
+    _preloaded = Signal()
+    _audio_loss = Signal(bool)  # from the capture thread: audio started / stopped being lost
+    _audio_level = Signal(float)  # from the capture thread: input level in dBFS while recording
 
     def __init__(self):
         super().__init__()
         self._config = config.load()
-        self._recording = False
-        self._chars_typed = 0
+        self._reconnecting = False  # overlay shows "Reconnecting..." until the next "listening"
+        self._held = False  # the dictation was started by a hold-to-talk combo and ends on its key-up
+        self._components_ready = False
+        self._history = None  # TranscriptHistory while the history is turned on
+        self._server = None  # DictationServer once IPC clients were allowed
+        self._overlay_widget = None  # built on first use, dropped on idle release
+        self._idle_footprint: dict | None = None  # footprint.snapshot() after the last idle release
+        # Sessions whose text is still to be typed, oldest first; the typing thread pops them.
+        self._traces: collections.deque[diagnostics.SessionTrace] = collections.deque()
 
-        # Components
-        self._audio = AudioCapture()
-        self._transcription = TranscriptionWorker()
-        self._overlay = OverlayWidget()
         combos = config.get_hotkey_combos(self._config)
         self._tray = TrayIcon(hotkey=", ".join(combos))
-        self._hotkey = GlobalHotkey(combos=combos)
+        self._hotkey = GlobalHotkey(combos=combos, options=config.get_hotkey_options(self._config))
+        self._wakeups = TimerWakeupCounter(QApplication.instance(), self)
 
-        # Escape key polling timer
-        self._esc_timer = QTimer(self)
-        self._esc_timer.setInterval(50)
-        self._esc_timer.timeout.connect(self._poll_escape)
-
-        # Connections
         self._hotkey.triggered.connect(self._on_hotkey)
-        self._overlay.clicked.connect(self._on_overlay_clicked)
-        self._transcription.text_delta.connect(self._on_text_delta)
-        self._transcription.error.connect(self._on_error)
-        self._transcription.finished.connect(self._on_transcription_finished)
+        self._hotkey.released.connect(self._on_hotkey_released)
+        self._hotkey.escape_pressed.connect(self._on_escape)
         self._tray.settings_requested.connect(self._open_settings)
+        self._tray.diagnostics_requested.connect(self._show_diagnostics)
+        self._tray.retype_requested.connect(self._retype_last)
+        self._tray.history_requested.connect(self._show_history)
         self._tray.quit_requested.connect(QApplication.quit)
 
-        # Start
         self._hotkey.start()
         self._tray.show()
 
+        self._preloaded.connect(self._ensure_components)
+        threading.Thread(target=self._preload, name="preload", daemon=True).start()
+
+    def _preload(self):
+        for name in DEFERRED_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # raised again where the module is used
+        self._preloaded.emit()
+
+    @property
+    def _recording(self) -> bool:
+        return self._components_ready and self._core.recording
+
+    @Slot()
+    def _ensure_components(self):
+        """Build the dictation core, typing and overlay components if not done yet."""
+        if self._components_ready:
+            return
+        from core import DictationCore
+        from session_lock import SessionLockWatcher
+        from typing_output import TypingWorker
+
+        self._core = DictationCore(on_loss=self._audio_loss.emit, on_level=self._audio_level.emit)
+        self._components_ready = True
+        self._typer = TypingWorker()
+        self._typer.on_typed = self._on_typed
+        self._lock_watcher = SessionLockWatcher(self)
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._release_idle)
+
+        transcription = self._core.transcription
+        # Queued even from this thread: the UI is updated after the transcription has started.
+        self._core.session_started.connect(self._on_session_started, Qt.ConnectionType.QueuedConnection)
+        self._core.recording_stopped.connect(self._on_recording_stopped)
+        transcription.text_delta.connect(self._on_text_delta)
+        transcription.status_changed.connect(self._on_status)
+        self._audio_loss.connect(self._on_audio_loss)
+        transcription.error.connect(self._on_error)
+        transcription.session_finished.connect(self._on_session_finished)
+        self._lock_watcher.locked.connect(self._core.release)
+        self._lock_watcher.unlocked.connect(self._core.hold_preroll)
+        self._lock_watcher.unlocked.connect(self._hotkey.resync_modifiers)  # key-ups went to the lock screen
+
+        self._typer.start()
+        self._apply_config()
+
         # Prompt for API key on first run
-        if not self._config.get("api_key"):
+        if not self._config.get("api_key") and self._config.get("engine") != "local":
             self._open_settings()
 
-    @Slot()
-    def _on_hotkey(self):
+    @property
+    def _overlay(self):
+        """The overlay, built on first use (again after an idle release)."""
+        if self._overlay_widget is None:
+            from overlay import OverlayWidget
+
+            self._overlay_widget = OverlayWidget()
+            self._overlay_widget.clicked.connect(self._on_overlay_clicked)
+            self._audio_level.connect(self._overlay_widget.set_level)
+        return self._overlay_widget
+
+    @Slot(float, bool)
+    def _on_hotkey(self, at: float, hold: bool):
+        self._ensure_components()
         if not self._recording:
-            self._start_recording()
+            self._start_recording(hotkey_at=at)
+            self._held = self._recording and hold
         else:
-            self._stop_recording()
+            self._stop_recording(at=at)
+
+    @Slot(float)
+    def _on_hotkey_released(self, at: float):
+        if self._recording and self._held:
+            self._stop_recording(at=at)
+
+    def _start_recording(self, hotkey_at: float | None = None):
+        from core import NO_API_KEY
 
-    def _start_recording(self):
-        api_key = self._config.get("api_key", "")
-        if not api_key:
-            self._overlay.show_status("Set API key first", auto_hide_ms=2000)
+        problem = self._core.readiness()
+        if problem == NO_API_KEY:
+            self._overlay.show_status(problem, auto_hide_ms=2000)
             self._open_settings()
             return
+        if problem is not None:
+            self._overlay.show_status(problem, auto_hide_ms=2500)
+            return
+        self._core.start(hotkey_at)
+
+    def _stop_recording(self, at: float | None = None):
+        """End the dictation; `at` (time.monotonic()) is the key event that ended it, if any."""
+        self._core.stop(at)
 
-        self._recording = True
-        self._chars_typed = 0
-        _windir = os.environ.get("WINDIR", r"C:\Windows")
-        winsound.PlaySound(os.path.join(_windir, "Media", "Speech On.wav"), winsound.SND_FILENAME | winsound.SND_ASYNC)
-        self._audio.start()
-        self._transcription.start(api_key, self._audio.queue)
+    @Slot(object)
+    def _on_session_started(self, trace: diagnostics.SessionTrace):
+        self._idle_timer.stop()
+        self._reconnecting = False
+        self._traces.append(trace)
+        _play_sound("Speech On.wav")
         self._tray.set_recording(True)
+        self._overlay.reset_live()
         self._overlay.show_status("🎙️ Listening...", recording=True)
-        self._esc_timer.start()
+        self._hotkey.set_watch_escape(True)
+        self._wakeups.set_state("recording")
 
-    def _stop_recording(self):
-        self._esc_timer.stop()
-        self._recording = False
-        self._audio.stop()
-        self._transcription.stop()
+    @Slot(str)
+    def _on_recording_stopped(self, reason: str):
+        self._hotkey.set_watch_escape(False)
+        self._wakeups.set_state("idle")
+        self._held = False
         self._tray.set_recording(False)
-        _windir = os.environ.get("WINDIR", r"C:\Windows")
-        winsound.PlaySound(os.path.join(_windir, "Media", "Speech Off.wav"), winsound.SND_FILENAME | winsound.SND_ASYNC)
-
-        if self._chars_typed > 0:
-            self._overlay.show_status("Done", auto_hide_ms=1500)
-        else:
-            self._overlay.show_status("No speech detected", auto_hide_ms=1500)
+        if reason != "error":  # _on_error shows what went wrong
+            _play_sound("Speech Off.wav")
+            self._overlay.show_status("Finishing...")
 
     @Slot(str)
     def _on_text_delta(self, delta: str):
-        if self._chars_typed == 0:  # Mistral often returns leading space in first chunk
-            delta = delta.lstrip()
-            if not delta:
-                return
-        self._chars_typed += len(delta)
-        type_text(delta)
+        self._typer.type(delta)
+        self._overlay.append_preview(delta)
+
+    def _on_typed(self, chars: int):
+        # Typing thread; SessionTrace is thread-safe.
+        if self._traces:
+            self._traces[0].text_typed(chars)
+
+    @Slot(object)
+    def _on_session_finished(self, trace: diagnostics.SessionTrace | None):
+        """A session, possibly drained after a newer one started, has emitted all of its text."""
+        if self._recording:
+            # Drained behind the dictation now recording: don't cover its overlay.
+            if trace is not None and "error" in trace.extra:
+                self._tray.showMessage("Dictation Hotkey", f"The previous dictation failed: {trace.extra['error']}",
+                                       QSystemTrayIcon.MessageIcon.Warning, 4000)
+        else:
+            if trace is not None and "error" in trace.extra:
+                self._overlay.show_status("Error", auto_hide_ms=2000)
+            elif trace is not None and trace.deltas > 0:
+                self._overlay.show_status("Done", auto_hide_ms=1500)
+            else:
+                self._overlay.show_status("No speech detected", auto_hide_ms=1500)
+        if trace is not None:
+            self._finish_trace(trace)
+        if not self._recording:
+            self._arm_idle_release()
+
+    def _finish_trace(self, trace: diagnostics.SessionTrace):
+        """Write the session record once everything it produced has been typed."""
+        trace.mark("end")
+        history = self._history
+
+        def write():
+            if self._traces and self._traces[0] is trace:
+                self._traces.popleft()
+            record = trace.record()
+            try:
+                diagnostics.append_record(record)
+            except OSError:
+                pass
+            text = "".join(trace.text).strip()
+            if history is not None and text:
+                del record["started"]
+                try:
+                    history.append(text, trace.started, record)
+                except (OSError, ValueError):
+                    pass
+
+        self._typer.call_after_pending(write)
+
+    @Slot()
+    def _retype_last(self):
+        """Type the most recent dictation again, e.g. after it went to the wrong window."""
+        self._ensure_components()
+        if self._recording or self._traces or self._history is None:
+            return
+        record = self._history.last()
+        if record is not None:
+            self._typer.type(record["text"])
+
+    @Slot()
+    def _show_history(self):
+        from history_dialog import HistoryDialog
+
+        self._ensure_components()
+        if self._history is None:
+            QMessageBox.information(None, "Dictation History", "The history is turned off in Settings.")
+            return
+        HistoryDialog(self._history).exec()
+
+    @Slot()
+    def _show_diagnostics(self):
+        import footprint
+
+        text = diagnostics.summarize(diagnostics.load_records())
+        rates = self._wakeups.rates()
+        text += "\n\nTimer wakeups/min: " + ", ".join(
+            f"{state} {rate:.0f}" for state, rate in sorted(rates.items())
+        )
+        if self._components_ready:
+            text += "\n" + diagnostics.summarize_endpoint(self._core.transcription.endpoint_stats())
+        text += "\n" + diagnostics.summarize_footprint(footprint.snapshot(), self._idle_footprint)
+        QMessageBox.information(None, "Diagnostics", text)
 
     @Slot()
     def _on_overlay_clicked(self):
@@ -111,46 +288,146 @@ class App(QObject):
             self._stop_recording()
 
     @Slot()
-    def _poll_escape(self):
-        if ctypes.windll.user32.GetAsyncKeyState(VK_ESCAPE) & 0x8000:
-            if self._recording:
-                self._stop_recording()
+    def _on_escape(self):
+        if self._recording:
+            self._stop_recording()
+
+    @Slot(bool)
+    def _on_audio_loss(self, losing: bool):
+        if not self._recording or self._reconnecting:
+            return
+        if losing:
+            self._overlay.show_status("⚠️ Connection too slow, audio is being lost", recording=True)
+        else:
+            self._overlay.show_status("🎙️ Listening...", recording=True)
+
+    @Slot(str)
+    def _on_status(self, status: str):
+        if not self._recording:
+            return
+        if status == "fallback":
+            self._overlay.show_status("🎙️ Listening (offline)...", recording=True)
+        elif status == "reconnecting":
+            self._reconnecting = True
+            self._overlay.show_status("🎙️ Reconnecting...", recording=True)
+        elif status == "listening" and self._reconnecting:
+            self._reconnecting = False
+            self._overlay.show_status("🎙️ Listening...", recording=True)
 
     @Slot(str)
     def _on_error(self, msg: str):
-        self._overlay.show_status("Error", auto_hide_ms=2000)
-        if self._recording:
-            self._recording = False
-            self._audio.stop()
-            self._tray.set_recording(False)
+        # The core has already stopped the recording (recording_stopped "error").
+        self._overlay.show_status("Offline" if self._core.transcription.endpoint_down else "Error",
+                                  auto_hide_ms=2000)
+
+    def _apply_config(self):
+        self._core.apply_config(self._config)
+        if self._config.get("history", True):
+            if self._history is None:
+                from history import TranscriptHistory
+
+                try:
+                    self._history = TranscriptHistory()
+                except (OSError, ValueError):
+                    pass
+        elif self._history is not None:
+            history, self._history = self._history, None
+            self._typer.call_after_pending(history.close)  # after any session still being written
+        self._typer.configure(
+            self._config.get("typing_pacing", "batched"),
+            int(self._config.get("paste_threshold", 200)),
+        )
+        if self._config.get("ipc_server", False):
+            if self._server is None:
+                from daemon import DictationServer
+
+                self._server = DictationServer(self._core)
+            if not self._server.listening:
+                try:
+                    self._server.start()
+                except OSError:
+                    pass  # e.g. another instance serves the address
+        elif self._server is not None and self._server.listening:
+            self._server.close()
+        if not self._recording:
+            self._arm_idle_release()
+
+    def _arm_idle_release(self):
+        """(Re)start the countdown to the idle release, or stop it if that's turned off."""
+        timeout = int(self._config.get("idle_release_timeout", 900))
+        if timeout > 0:
+            self._idle_timer.start(timeout * 1000)
+        else:
+            self._idle_timer.stop()
+
+    @Slot()
+    def _release_idle(self):
+        """Release what only dictations need; each part is rebuilt on its next use."""
+        import realtime
+
+        if self._recording or self._traces or not self._core.transcription.idle:
+            self._arm_idle_release()  # still busy, e.g. a standby session is kept warm; try again later
+            return
+        self._core.release()
+        if self._overlay_widget is not None and not self._overlay_widget.isVisible():
+            self._overlay_widget.deleteLater()
+            self._overlay_widget = None
+        if self._server is None or not self._server.listening:
+            realtime.stop_event_loop()
+        # Once the overlay has actually been deleted (deferred to the event loop).
+        QTimer.singleShot(0, self._trim_idle)
 
     @Slot()
-    def _on_transcription_finished(self):
+    def _trim_idle(self):
+        import footprint
+
         if self._recording:
-            self._stop_recording()
+            return
+        footprint.trim()
+        self._idle_footprint = footprint.snapshot()
 
     @Slot()
     def _open_settings(self):
+        from settings import SettingsDialog
+
+        self._ensure_components()
         dlg = SettingsDialog(self._config)
         if dlg.exec() == SettingsDialog.DialogCode.Accepted:
             old_combos = config.get_hotkey_combos(self._config)
+            old_options = config.get_hotkey_options(self._config)
             self._config = dlg.get_config()
+            self._apply_config()
             new_combos = config.get_hotkey_combos(self._config)
-            if new_combos != old_combos:
+            new_options = config.get_hotkey_options(self._config)
+            if new_combos != old_combos or new_options != old_options:
                 self._hotkey.stop()
-                self._hotkey.update_combos(new_combos)
+                self._hotkey.update_combos(new_combos, new_options)
                 self._hotkey.start()
                 self._tray.update_hotkey(", ".join(new_combos))
 
 
+def _install_sigint_handler(app: QApplication) -> tuple:
+    """Quit on Ctrl+C without polling.
+
+    Python only runs signal handlers between bytecodes, which never happens while
+    Qt's loop sleeps. The signal's wakeup fd wakes the loop through a socket
+    notifier instead (Windows only accepts a socket there). Keep the returned
+    objects alive.
+    """
+    rsock, wsock = socket.socketpair()
+    rsock.setblocking(False)
+    wsock.setblocking(False)
+    signal.set_wakeup_fd(wsock.fileno())
+    notifier = QSocketNotifier(rsock.fileno(), QSocketNotifier.Type.Read)
+    notifier.activated.connect(lambda: rsock.recv(64))
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    return rsock, wsock, notifier
+
+
 def main():
-    signal.signal(signal.SIGINT, signal.SIG_DFL)
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
-    # Timer lets Python's signal handler run inside Qt's event loop
-    tick = QTimer()
-    tick.start(500)
-    tick.timeout.connect(lambda: None)
+    sigint = _install_sigint_handler(app)  # kept alive for the app's lifetime
     controller = App()
     sys.exit(app.exec())
 
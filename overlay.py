@@ -1,24 +1,27 @@
-from PySide6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, Signal
+import math
+import time
+
+from PySide6.QtCore import Qt, QTimer, Signal, Slot
 from PySide6.QtGui import QColor, QPainter, QBrush, QFont, QMouseEvent
-from PySide6.QtWidgets import QWidget, QLabel, QHBoxLayout, QApplication, QGraphicsOpacityEffect
+from PySide6.QtWidgets import QWidget, QLabel, QHBoxLayout, QVBoxLayout, QApplication, QGraphicsOpacityEffect
+
+PREVIEW_CHARS = 80  # transcript characters kept for the rolling preview
+METER_FLOOR_DB = -60.0  # level shown as an empty meter
+METER_DECAY_DB = 1.5  # per frame; the meter falls back smoothly instead of flickering
 
 
 class RecordingDot(QWidget):
-    """Pulsing red dot indicator."""
+    """Pulsing red dot indicator; the owner calls `pulse` once per frame while it's shown."""
+
+    PERIOD = 1.6  # seconds from full to faint and back
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFixedSize(12, 12)
         self._opacity_effect = QGraphicsOpacityEffect(self)
         self.setGraphicsEffect(self._opacity_effect)
-        self._animation = QPropertyAnimation(self._opacity_effect, b"opacity")
-        self._animation.setDuration(800)
-        self._animation.setStartValue(1.0)
-        self._animation.setEndValue(0.3)
-        self._animation.setEasingCurve(QEasingCurve.Type.InOutSine)
-        self._animation.setLoopCount(-1)
-        # Reverse each cycle
-        self._animation.finished.connect(self._animation.start)
+        self._started = 0.0
+        self.pulsing = False
 
     def paintEvent(self, event):
         p = QPainter(self)
@@ -28,21 +31,66 @@ class RecordingDot(QWidget):
         p.drawEllipse(1, 1, 10, 10)
         p.end()
 
+    def pulse(self):
+        """Set the opacity for the current point in the pulse (1.0 down to 0.3, eased)."""
+        phase = (time.monotonic() - self._started) / self.PERIOD
+        self._opacity_effect.setOpacity(0.65 + 0.35 * math.cos(2 * math.pi * phase))
+
     def start(self):
         self.show()
-        self._animation.start()
+        if not self.pulsing:
+            self._started = time.monotonic()
+            self.pulsing = True
 
     def stop(self):
-        self._animation.stop()
+        self.pulsing = False
         self._opacity_effect.setOpacity(1.0)
         self.hide()
 
 
+class LevelMeter(QWidget):
+    """Row of bars showing the mic input level."""
+
+    BARS = 8
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(self.BARS * 4, 14)
+        self._lit = 0
+
+    def set_fraction(self, fraction: float):
+        """Light `fraction` (0..1) of the bars; repaints only if that changes what's drawn."""
+        lit = round(max(0.0, min(1.0, fraction)) * self.BARS)
+        if lit != self._lit:
+            self._lit = lit
+            self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.setPen(Qt.PenStyle.NoPen)
+        for i in range(self.BARS):
+            height = 4 + i
+            color = QColor(74, 222, 128) if i < self._lit else QColor(255, 255, 255, 50)
+            p.setBrush(QBrush(color))
+            p.drawRect(i * 4, self.height() - height, 3, height)
+        p.end()
+
+
 class OverlayWidget(QWidget):
-    """Small always-on-top translucent status overlay positioned near the caret."""
+    """Small always-on-top translucent status overlay positioned near the caret.
+
+    While recording it also shows the input level and the last PREVIEW_CHARS
+    characters transcribed. `set_level` and `append_preview` may be called at
+    any rate: they only record the new state, which a frame timer applies once
+    per display frame together with the dot's pulse, so a burst of updates costs
+    at most one repaint per frame. The timer stops when there is nothing left to
+    animate.
+    """
 
     clicked = Signal()
     WINDOW_OPACITY = 0.7
+    COMPACT_SIZE = (220, 44)
+    PREVIEW_SIZE = (360, 68)
 
     def __init__(self):
         super().__init__()
@@ -53,11 +101,14 @@ class OverlayWidget(QWidget):
         )
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setWindowOpacity(self.WINDOW_OPACITY)
-        self.setFixedSize(220, 44)
+        self.setFixedSize(*self.COMPACT_SIZE)
 
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(16, 8, 16, 8)
+        outer = QVBoxLayout(self)
+        outer.setContentsMargins(16, 8, 16, 8)
+        outer.setSpacing(4)
+        layout = QHBoxLayout()
         layout.setSpacing(8)
+        outer.addLayout(layout)
 
         self._dot = RecordingDot(self)
         self._dot.hide()
@@ -66,12 +117,34 @@ class OverlayWidget(QWidget):
         self._label = QLabel("Ready")
         self._label.setFont(QFont("Segoe UI", 11, QFont.Weight.DemiBold))
         self._label.setStyleSheet("color: white;")
-        layout.addWidget(self._label)
+        layout.addWidget(self._label, 1)
+
+        self._meter = LevelMeter(self)
+        self._meter.hide()
+        layout.addWidget(self._meter)
+
+        self._preview_label = QLabel()
+        self._preview_label.setFont(QFont("Segoe UI", 9))
+        self._preview_label.setStyleSheet("color: rgba(255, 255, 255, 190);")
+        self._preview_label.hide()
+        outer.addWidget(self._preview_label)
 
         self._hide_timer = QTimer(self)
         self._hide_timer.setSingleShot(True)
         self._hide_timer.timeout.connect(self.hide)
 
+        # Live state, applied by _flush at most once per frame
+        self._level_db = METER_FLOOR_DB
+        self._shown_db = METER_FLOOR_DB
+        self._preview = ""
+        self._preview_dirty = False
+        self._dirty = False
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._frame_timer.timeout.connect(self._on_frame)
+        rate = QApplication.primaryScreen().refreshRate() if QApplication.primaryScreen() else 0
+        self._frame_timer.setInterval(max(1, round(1000 / (rate if rate > 0 else 60))))
+
     def paintEvent(self, event):
         p = QPainter(self)
         p.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -96,9 +169,70 @@ class OverlayWidget(QWidget):
         self._label.setText(text)
         if recording:
             self._dot.start()
+            self._meter.show()
+            self._frame_timer.start()
         else:
             self._dot.stop()
+            self._meter.hide()
         self._position_center_bottom()
         self.show()
         if auto_hide_ms > 0:
             self._hide_timer.start(auto_hide_ms)
+
+    def reset_live(self):
+        """Clear the level meter and the transcript preview, e.g. when a dictation starts."""
+        self._level_db = self._shown_db = METER_FLOOR_DB
+        self._preview = ""
+        self._preview_dirty = True
+        self._schedule()
+
+    @Slot(float)
+    def set_level(self, level_db: float):
+        """Latest input level in dBFS."""
+        self._level_db = level_db
+        self._schedule()
+
+    @Slot(str)
+    def append_preview(self, text: str):
+        """Add transcribed text to the rolling preview."""
+        self._preview = (self._preview + text.replace("\n", " "))[-PREVIEW_CHARS:]
+        self._preview_dirty = True
+        self._schedule()
+
+    def _schedule(self):
+        self._dirty = True
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def _on_frame(self):
+        if self._dot.pulsing:
+            self._dot.pulse()
+        if self._dirty:
+            self._dirty = False
+            self._flush()
+        if not self._dot.pulsing and not self._dirty:
+            self._frame_timer.stop()
+
+    def _flush(self):
+        """Apply the pending live state in one go."""
+        if self._level_db >= self._shown_db:
+            self._shown_db = self._level_db
+        else:
+            self._shown_db = max(self._level_db, self._shown_db - METER_DECAY_DB)
+            if self._shown_db > self._level_db:
+                self._schedule()  # keep decaying over the next frames
+        self._meter.set_fraction(1 - self._shown_db / METER_FLOOR_DB)
+        if self._preview_dirty:
+            self._preview_dirty = False
+            self._set_preview_visible(bool(self._preview))
+            metrics = self._preview_label.fontMetrics()
+            self._preview_label.setText(
+                metrics.elidedText(self._preview.strip(), Qt.TextElideMode.ElideLeft, self.width() - 32)
+            )
+
+    def _set_preview_visible(self, visible: bool):
+        if visible == self._preview_label.isVisible():
+            return
+        self._preview_label.setVisible(visible)
+        self.setFixedSize(*(self.PREVIEW_SIZE if visible else self.COMPACT_SIZE))
+        self._position_center_bottom()
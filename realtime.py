@@ -0,0 +1,562 @@
+import asyncio
+import collections
+import concurrent.futures
+import os
+import re
+import threading
+import time
+from typing import AsyncIterator
+from urllib.parse import urlencode
+
+from mistralai import Mistral
+from mistralai.extra.realtime import UnknownRealtimeEvent
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus
+from mistralai.models import (
+    AudioFormat,
+    RealtimeTranscriptionError,
+    RealtimeTranscriptionSessionCreated,
+    TranscriptionStreamDone,
+    TranscriptionStreamTextDelta,
+)
+
+from audio import PcmRingBuffer
+from diagnostics import SessionTrace
+from health import EndpointHealth
+from vad import VoiceActivityGate
+
+SAMPLE_RATE = 16_000
+WARMUP_DURATION = 2.0  # seconds of silence
+WARMUP_POLICIES = ("adaptive", "burst", "paced", "off")
+# Overridable so benchmarks (or a proxy) can point the app at another endpoint
+MODEL = os.environ.get("DICTATION_MODEL", "voxtral-mini-transcribe-realtime-2602")
+BASE_URL = os.environ.get("DICTATION_BASE_URL", "wss://api.mistral.ai")
+STANDBY_IDLE_TIMEOUT = 300.0  # seconds without dictation before the standby session is dropped
+STANDBY_RETRY_MAX = 30.0  # cap on the backoff when reopening a failed standby
+RECONNECT_ATTEMPTS = 4  # consecutive failed reconnects before a dictation gives up
+RECONNECT_BACKOFF_MAX = 4.0  # seconds
+REPLAY_MAX_SECONDS = 15.0  # cap on the audio kept for replay after a drop
+REPLAY_MARGIN = 1.5  # seconds of audio before the latest text that are still replayed
+CONNECT_TIMEOUT = 5.0  # seconds for the websocket handshake
+FIRST_EVENT_TIMEOUT = 8.0  # seconds from connecting until the session is created
+
+# Shared event loop
+_event_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Get or create the shared asyncio event loop running in a background thread."""
+    global _event_loop, _loop_thread
+    with _loop_lock:
+        if _event_loop is None or not _event_loop.is_running():
+            _event_loop = asyncio.new_event_loop()
+            running = threading.Event()
+            _loop_thread = threading.Thread(target=_run_loop, args=(_event_loop, running), name="event-loop",
+                                            daemon=True)
+            _loop_thread.start()
+            running.wait()
+    return _event_loop
+
+
+def has_event_loop() -> bool:
+    """Whether the shared event loop thread has been started."""
+    return _event_loop is not None and _event_loop.is_running()
+
+
+def stop_event_loop(timeout: float = 2.0):
+    """Stop the shared event loop and end its thread and executor threads; the next get_event_loop starts anew.
+
+    Anything still scheduled on the loop is cancelled, so only call this when
+    nothing uses it (no session, standby or server).
+    """
+    global _event_loop, _loop_thread
+    with _loop_lock:
+        if not has_event_loop():
+            return
+        loop, thread = _event_loop, _loop_thread
+        _event_loop = _loop_thread = None
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+            await loop.shutdown_default_executor()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        except concurrent.futures.TimeoutError:
+            pass  # e.g. an executor job still running; its thread ends on its own
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop, running: threading.Event):
+    asyncio.set_event_loop(loop)
+    loop.call_soon(running.set)
+    loop.run_forever()
+
+
+async def _warmup(is_running: callable, policy: str = "paced", duration: float = WARMUP_DURATION) -> AsyncIterator[bytes]:
+    """Async generator yielding `duration` of silence, paced at 2x real time or as a burst."""
+    if policy == "off":
+        return
+    chunk_samples = int(SAMPLE_RATE * 0.1)
+    chunk_bytes = b'\x00' * (chunk_samples * 2)  # 2 bytes per int16 sample
+    num_chunks = int(round(duration / 0.1))
+    for _ in range(num_chunks):
+        if not is_running():
+            return
+        yield chunk_bytes
+        if policy == "paced":
+            await asyncio.sleep(0.05)
+
+
+class ReplayBuffer:
+    """Mic audio sent in a dictation that may not have been transcribed yet.
+
+    Chunks are copied out of the ring buffer as they are sent. `acknowledge`
+    (called when text arrives) drops audio sent more than `margin` seconds
+    earlier; what is left, at most `max_seconds`, is resent when a dropped
+    session is reopened.
+    """
+
+    def __init__(self, max_seconds: float = REPLAY_MAX_SECONDS, margin: float = REPLAY_MARGIN):
+        self._chunks: collections.deque[tuple[float, bytes]] = collections.deque()
+        self._bytes = 0
+        self._max_bytes = int(max_seconds * SAMPLE_RATE * 2)
+        self._margin = margin
+
+    @property
+    def seconds(self) -> float:
+        return self._bytes / (SAMPLE_RATE * 2)
+
+    def append(self, chunk: bytes | memoryview):
+        data = bytes(chunk)
+        self._chunks.append((time.monotonic(), data))
+        self._bytes += len(data)
+        while self._bytes > self._max_bytes:
+            self._bytes -= len(self._chunks.popleft()[1])
+
+    def acknowledge(self):
+        cutoff = time.monotonic() - self._margin
+        while self._chunks and self._chunks[0][0] < cutoff:
+            self._bytes -= len(self._chunks.popleft()[1])
+
+    def resend(self) -> list[bytes]:
+        """The buffered chunks, oldest first, restamped as sent now."""
+        now = time.monotonic()
+        self._chunks = collections.deque((now, data) for _, data in self._chunks)
+        return [data for _, data in self._chunks]
+
+
+_WORD = re.compile(r"\S+")
+
+
+def _norm(word: str) -> str:
+    return word.strip(".,;:!?\"'()¿¡…-").lower()
+
+
+class OverlapFilter:
+    """Drops the start of a reopened session's text that repeats what was already emitted.
+
+    Replayed audio overlaps the audio behind the last emitted words, so the new
+    session's text normally starts somewhere inside `emitted`'s tail. Text is
+    held back until it either runs past the end of the tail (the overlapping
+    words are dropped) or stops matching it (nothing overlapped).
+    """
+
+    def __init__(self, emitted: str, max_words: int = 40):
+        self._tail = [_norm(w) for w in emitted.split()][-max_words:]
+        self._space_needed = bool(emitted) and not emitted[-1].isspace()
+        self._pending = ""
+        self._done = not self._tail
+
+    def feed(self, delta: str) -> str:
+        """Return the part of `delta` (plus held-back text) that is new."""
+        if self._done:
+            return delta
+        self._pending += delta
+        return self._resolve(final=False)
+
+    def flush(self) -> str:
+        """The session ended: return whatever held-back text is new."""
+        if self._done:
+            return ""
+        return self._resolve(final=True)
+
+    def _resolve(self, final: bool) -> str:
+        words = list(_WORD.finditer(self._pending))
+        norm = [_norm(m.group()) for m in words]
+        # The last word may still be growing unless followed by whitespace.
+        complete = len(words) if final or self._pending[-1:].isspace() else len(words) - 1
+        resolved, open_ = [], []
+        for start in range(len(self._tail)):
+            remaining = len(self._tail) - start
+            n = min(complete, remaining)
+            if norm[:n] != self._tail[start:start + n]:
+                continue
+            if n == remaining:
+                resolved.append(start)  # the new text runs past the end of the tail
+            elif n < len(norm) and not self._tail[start + n].startswith(norm[n]):
+                continue
+            else:
+                open_.append(start)
+        if not final and open_ and (not resolved or open_[0] < resolved[0]):
+            return ""  # a longer overlap is still possible
+        self._done = True
+        pending, self._pending = self._pending, ""
+        if resolved:
+            skip = len(self._tail) - resolved[0]
+            return pending[words[skip - 1].end():] if skip else pending
+        if open_:
+            return ""  # everything repeated text that was already emitted
+        if self._space_needed and pending and not pending[0].isspace():
+            pending = " " + pending
+        return pending
+
+
+async def audio_stream(
+    audio_queue: PcmRingBuffer,
+    is_running: callable,
+    warmup: str = "paced",
+    gate: VoiceActivityGate | None = None,
+    trace: SessionTrace | None = None,
+    replay: ReplayBuffer | None = None,
+) -> AsyncIterator[bytes | memoryview]:
+    """Async generator yielding audio: warmup silence then raw mic chunks as views into the ring.
+
+    `warmup` is one of WARMUP_POLICIES. "adaptive" relies on the SDK only pulling
+    audio once `RealtimeTranscriptionSessionCreated` has arrived: mic audio
+    buffered by then already gives the model leading context, so only the
+    remainder of WARMUP_DURATION is sent as silence, in one burst. The buffered
+    backlog is then forwarded as fast as the socket accepts it.
+
+    With a `gate`, mic chunks pass through voice activity detection first and the
+    stream ends once the gate expires. A `trace` gets every chunk as it goes out.
+    With a `replay` buffer, its audio is resent after the warmup and every mic
+    chunk is recorded into it.
+    """
+    resend = replay.resend() if replay is not None else []
+    duration = WARMUP_DURATION
+    if warmup == "adaptive":
+        buffered = audio_queue.buffered_bytes() / (SAMPLE_RATE * 2)
+        if replay is not None:
+            buffered += replay.seconds
+        duration = max(0.0, WARMUP_DURATION - buffered)
+        warmup = "burst"
+    async for chunk in _warmup(is_running, warmup, duration):
+        if trace is not None:
+            trace.chunk_sent(None)
+        yield chunk
+    for chunk in resend:
+        yield chunk
+
+    while is_running():
+        chunk = await audio_queue.get()
+        if chunk is None:
+            return
+        out_chunks = (chunk,) if gate is None else gate.process(chunk)
+        if trace is not None and out_chunks:
+            trace.chunk_sent(audio_queue.last_captured_at)
+        for out in out_chunks:
+            if replay is not None:
+                replay.append(out)
+            yield out
+        if gate is not None and gate.expired:
+            return
+
+
+def open_stream(api_key: str, stream: AsyncIterator[bytes | memoryview], connect_timeout: float = CONNECT_TIMEOUT):
+    """Open a realtime transcription session fed by `stream`, returning its event iterator."""
+    client = Mistral(api_key=api_key, server_url=BASE_URL)
+    audio_format = AudioFormat(encoding="pcm_s16le", sample_rate=SAMPLE_RATE)
+    return client.audio.realtime.transcribe_stream(
+        audio_stream=stream,
+        model=MODEL,
+        audio_format=audio_format,
+        timeout_ms=int(connect_timeout * 1000),
+    )
+
+
+async def probe_endpoint(timeout: float = CONNECT_TIMEOUT):
+    """Raise unless the realtime endpoint at BASE_URL answers a websocket handshake within `timeout`.
+
+    No API key is sent: a handshake refused by the application (401, 403,
+    404) still shows the server is up. A 5xx means it isn't, and raises.
+    """
+    url = BASE_URL.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+    url = f"{url.rstrip('/')}/v1/audio/transcriptions/realtime?{urlencode({'model': MODEL})}"
+    try:
+        async with connect(url, open_timeout=timeout, close_timeout=1):
+            pass
+    except InvalidStatus as e:
+        if not 400 <= e.response.status_code < 500:
+            raise
+
+
+def new_endpoint_health() -> EndpointHealth:
+    """Health tracker for BASE_URL, probing it with `probe_endpoint` while down."""
+    return EndpointHealth(probe_endpoint)
+
+
+async def _first_event_within(events: AsyncIterator, timeout: float) -> AsyncIterator:
+    """Pass `events` through, raising ConnectionLost if the first one takes longer than `timeout`."""
+    try:
+        first = await asyncio.wait_for(anext(events), timeout)
+    except StopAsyncIteration:
+        return
+    except asyncio.TimeoutError:
+        raise ConnectionLost(f"no response from the server within {timeout:g} s") from None
+    yield first
+    async for event in events:
+        yield event
+
+
+class StandbySession:
+    """A realtime session connected and warmed up ahead of the next hotkey press.
+
+    Runs on the shared event loop. Events are buffered until `claim` attaches the
+    mic ring buffer, after which the session behaves like a freshly opened one.
+    """
+
+    def __init__(self, api_key: str, warmup: str, on_closed: callable):
+        self.api_key = api_key
+        # Nothing is buffered before the claim, so adaptive warmup means a full burst.
+        self._warmup = "burst" if warmup == "adaptive" else warmup
+        self.created = False
+        self._on_closed = on_closed
+        self._claimed = False
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._source: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._task = asyncio.ensure_future(self._run())
+
+    @property
+    def available(self) -> bool:
+        return not self._claimed and not self._task.done()
+
+    async def _stream(self) -> AsyncIterator[bytes | memoryview]:
+        async for chunk in _warmup(lambda: True, self._warmup):
+            yield chunk
+        audio_queue, is_running, gate, trace, replay = await self._source
+        async for chunk in audio_stream(audio_queue, is_running, "off", gate, trace, replay):
+            yield chunk
+
+    async def _run(self):
+        try:
+            async for event in open_stream(self.api_key, self._stream()):
+                if isinstance(event, RealtimeTranscriptionSessionCreated):
+                    self.created = True
+                self._events.put_nowait(event)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._events.put_nowait(e)
+        finally:
+            self._events.put_nowait(None)
+            if not self._claimed:
+                self._on_closed(self)
+
+    def claim(
+        self,
+        audio_queue: PcmRingBuffer,
+        is_running: callable,
+        gate: VoiceActivityGate | None = None,
+        trace: SessionTrace | None = None,
+        replay: ReplayBuffer | None = None,
+    ) -> AsyncIterator:
+        """Hand the session the live mic buffer and return its event iterator."""
+        self._claimed = True
+        self._source.set_result((audio_queue, is_running, gate, trace, replay))
+        return self._iter_events()
+
+    async def _iter_events(self):
+        while True:
+            item = await self._events.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        self._task.cancel()
+
+
+class SessionError(Exception):
+    """The realtime endpoint reported an error for the session."""
+
+
+class ConnectionLost(Exception):
+    """The realtime connection failed or dropped before the session finished."""
+
+
+def _is_rejection(exc: BaseException) -> bool:
+    """Whether `exc` comes from the server refusing the handshake (bad key, model...), not the network."""
+    while exc is not None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+        if status is not None:
+            return 400 <= status < 500 and status not in (408, 429)
+        exc = exc.__cause__
+    return False
+
+
+async def _stream_once(
+    api_key: str,
+    audio_queue: PcmRingBuffer,
+    is_running: callable,
+    *,
+    warmup: str,
+    gate: VoiceActivityGate | None,
+    trace: SessionTrace | None,
+    standby: StandbySession | None,
+    replay: ReplayBuffer | None,
+    health: EndpointHealth | None,
+    connect_timeout: float,
+    first_event_timeout: float,
+    on_status: callable,
+    on_text: callable,
+):
+    """One realtime connection; raises ConnectionLost if it ends without transcription.done."""
+    if health is not None:
+        health.check()
+    if trace is not None:
+        trace.mark("connect")
+    connecting = time.monotonic()
+    created = False
+    if standby is not None:
+        events = standby.claim(audio_queue, is_running, gate, trace, replay)
+    else:
+        on_status("connecting")
+        stream = audio_stream(audio_queue, is_running, warmup, gate, trace, replay)
+        events = _first_event_within(open_stream(api_key, stream, connect_timeout), first_event_timeout)
+
+    try:
+        async for event in events:
+            if not is_running():
+                return
+
+            if isinstance(event, RealtimeTranscriptionSessionCreated):
+                created = True
+                if health is not None and standby is None:
+                    health.record_success(time.monotonic() - connecting)
+                if trace is not None:
+                    trace.mark("session_created")
+                on_status("listening")
+            elif isinstance(event, TranscriptionStreamTextDelta):
+                if trace is not None:
+                    trace.text_received()
+                on_text(event.text)
+            elif isinstance(event, TranscriptionStreamDone):
+                return
+            elif isinstance(event, RealtimeTranscriptionError):
+                raise SessionError(str(event.error))
+            elif isinstance(event, UnknownRealtimeEvent):
+                continue
+    except (SessionError, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        if _is_rejection(e):
+            raise SessionError(str(e)) from e
+        reason = str(e) or type(e).__name__
+        if health is not None and not created:
+            health.record_failure(reason)
+        raise ConnectionLost(reason) from e
+    if is_running():
+        if health is not None and not created:
+            health.record_failure("connection closed during the handshake")
+        raise ConnectionLost("connection closed before the transcription was done")
+
+
+async def run_session(
+    api_key: str,
+    audio_queue: PcmRingBuffer,
+    is_running: callable,
+    *,
+    warmup: str = "adaptive",
+    gate: VoiceActivityGate | None = None,
+    trace: SessionTrace | None = None,
+    standby: StandbySession | None = None,
+    reconnect_attempts: int = RECONNECT_ATTEMPTS,
+    health: EndpointHealth | None = None,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    first_event_timeout: float = FIRST_EVENT_TIMEOUT,
+    on_status: callable = None,
+    on_text: callable = None,
+):
+    """Transcribe `audio_queue` in realtime until the audio or the session ends.
+
+    Uses the warmed-up `standby` session when given, otherwise connects. Calls
+    `on_status("connecting" / "listening" / "reconnecting")` and `on_text(delta)`
+    as events arrive. Raises SessionError when the server reports an error.
+
+    When the connection drops, a new one is opened with exponential backoff (up
+    to `reconnect_attempts` failures in a row) and the audio that may not have
+    been transcribed yet is replayed; text repeating what was already emitted is
+    dropped, so the output continues without gaps or repeats. Raises
+    ConnectionLost when out of attempts.
+
+    Connecting gives up after `connect_timeout` seconds for the handshake or
+    `first_event_timeout` seconds until the session is created. Connect results
+    go into `health`, whose breaker, once open, makes this raise EndpointDown
+    right away.
+    """
+    replay = ReplayBuffer() if reconnect_attempts > 0 else None
+    emitted = ""  # tail of the text passed on, to spot repeats after a reconnect
+    overlap: OverlapFilter | None = None
+    connected = False
+    failures = 0
+
+    def status(value: str):
+        nonlocal connected
+        if value == "listening":
+            connected = True
+        if on_status is not None:
+            on_status(value)
+
+    def text(delta: str):
+        nonlocal emitted
+        if replay is not None:
+            replay.acknowledge()
+        if overlap is not None:
+            delta = overlap.feed(delta)
+        if delta:
+            emitted = (emitted + delta)[-500:]
+            if on_text is not None:
+                on_text(delta)
+
+    while True:
+        connected = False
+        try:
+            await _stream_once(
+                api_key, audio_queue, is_running,
+                warmup=warmup, gate=gate, trace=trace, standby=standby, replay=replay,
+                health=health, connect_timeout=connect_timeout, first_event_timeout=first_event_timeout,
+                on_status=status, on_text=text,
+            )
+        except ConnectionLost:
+            if overlap is not None:
+                # Held-back text already acknowledged its audio, so no replay brings it back.
+                text(overlap.flush())
+                overlap = None
+            failures = 0 if connected else failures + 1
+            if replay is None or failures > reconnect_attempts or not is_running():
+                raise
+            if health is not None:
+                health.check()  # don't wait out the backoff for an endpoint known to be down
+            standby = None
+            overlap = OverlapFilter(emitted)
+            if trace is not None:
+                trace.extra["reconnects"] = trace.extra.get("reconnects", 0) + 1
+            status("reconnecting")
+            await asyncio.sleep(min(RECONNECT_BACKOFF_MAX, 0.25 * 2 ** failures))
+            continue
+        if overlap is not None:
+            text(overlap.flush())
+        return
@@ -0,0 +1,50 @@
+import ctypes
+from ctypes import wintypes
+
+from PySide6.QtCore import QAbstractNativeEventFilter, QObject, Signal
+from PySide6.QtGui import QWindow
+from PySide6.QtWidgets import QApplication
+
+WM_WTSSESSION_CHANGE = 0x02B1
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+
+
+class _Filter(QAbstractNativeEventFilter):
+    def __init__(self, watcher: "SessionLockWatcher"):
+        super().__init__()
+        self._watcher = watcher
+
+    def nativeEventFilter(self, event_type, message):
+        if bytes(event_type) == b"windows_generic_MSG":
+            msg = wintypes.MSG.from_address(int(message))
+            if msg.message == WM_WTSSESSION_CHANGE:
+                if msg.wParam == WTS_SESSION_LOCK:
+                    self._watcher.locked.emit()
+                elif msg.wParam == WTS_SESSION_UNLOCK:
+                    self._watcher.unlocked.emit()
+        return False, 0
+
+
+class SessionLockWatcher(QObject):
+    """Emits `locked` / `unlocked` when the Windows session is locked or unlocked.
+
+    Session change notifications are delivered to a window, so the watcher owns
+    a hidden native window of its own that lives as long as it does.
+    """
+
+    locked = Signal()
+    unlocked = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._window = QWindow()
+        self._hwnd = int(self._window.winId())  # creates the native window; it is never shown
+        self._filter = _Filter(self)
+        QApplication.instance().installNativeEventFilter(self._filter)
+        ctypes.windll.wtsapi32.WTSRegisterSessionNotification(wintypes.HWND(self._hwnd), NOTIFY_FOR_THIS_SESSION)
+
+    def close(self):
+        ctypes.windll.wtsapi32.WTSUnRegisterSessionNotification(wintypes.HWND(self._hwnd))
+        QApplication.instance().removeNativeEventFilter(self._filter)
@@ -1,10 +1,13 @@
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
     QDialog, QFormLayout, QLineEdit, QPushButton,
-    QDialogButtonBox, QLabel, QCheckBox, QGroupBox, QVBoxLayout,
+    QDialogButtonBox, QLabel, QCheckBox, QGroupBox, QVBoxLayout, QComboBox,
+    QSpinBox, QHBoxLayout, QFileDialog,
 )
 
 import config
+from audio import PREROLL_MAX_MSEC
+from hotkey import DEBOUNCE_MS, HOTKEY_DEFAULTS
 
 
 class SettingsDialog(QDialog):
@@ -22,6 +25,38 @@ class SettingsDialog(QDialog):
         self._api_key_edit.setPlaceholderText("Enter Mistral API key")
         layout.addRow("API Key:", self._api_key_edit)
 
+        # Engine
+        engine_group = QGroupBox("Engine")
+        engine_layout = QFormLayout(engine_group)
+
+        self._engine_combo = QComboBox()
+        self._engine_combo.addItem("Mistral (cloud)", "mistral")
+        self._engine_combo.addItem("Local (offline, CPU)", "local")
+        self._engine_combo.addItem("Mistral, local when slow or offline", "auto")
+        index = self._engine_combo.findData(self._config.get("engine", "mistral"))
+        self._engine_combo.setCurrentIndex(max(index, 0))
+        engine_layout.addRow("Engine:", self._engine_combo)
+
+        self._model_edit = QLineEdit(self._config.get("local_model_path", ""))
+        self._model_edit.setPlaceholderText("Folder of a Vosk model")
+        browse = QPushButton("Browse...")
+        browse.clicked.connect(self._browse_model)
+        model_row = QHBoxLayout()
+        model_row.addWidget(self._model_edit)
+        model_row.addWidget(browse)
+        engine_layout.addRow("Local model:", model_row)
+
+        self._fallback_spin = QSpinBox()
+        self._fallback_spin.setRange(100, 30_000)
+        self._fallback_spin.setSingleStep(100)
+        self._fallback_spin.setSuffix(" ms")
+        self._fallback_spin.setValue(int(self._config.get("fallback_connect_ms", 1500)))
+        engine_layout.addRow("Fall back after:", self._fallback_spin)
+
+        self._engine_combo.currentIndexChanged.connect(self._update_engine_fields)
+        self._update_engine_fields()
+        layout.addRow(engine_group)
+
         # Hotkey group
         hotkey_group = QGroupBox("Hotkeys")
         hotkey_layout = QVBoxLayout(hotkey_group)
@@ -29,16 +64,19 @@ class SettingsDialog(QDialog):
         self._copilot_cb = QCheckBox("Use Copilot key (Win+C, Win+Shift+F23)")
         self._copilot_cb.setChecked(self._config.get("hotkey_copilot", False))
         hotkey_layout.addWidget(self._copilot_cb)
+        self._copilot_options = self._add_hotkey_options(hotkey_layout, config.COPILOT_COMBOS[0])
 
         self._win_h_cb = QCheckBox("Replace Windows dictation (Win+H)")
         self._win_h_cb.setChecked(self._config.get("hotkey_win_h", True))
         hotkey_layout.addWidget(self._win_h_cb)
+        self._win_h_options = self._add_hotkey_options(hotkey_layout, "Win+H")
 
         self._custom_edit = QLineEdit(self._config.get("hotkey_custom", ""))
         self._custom_edit.setPlaceholderText("e.g. Win+Y")
         custom_form = QFormLayout()
         custom_form.addRow("Custom shortcut:", self._custom_edit)
         hotkey_layout.addLayout(custom_form)
+        self._custom_options = self._add_hotkey_options(hotkey_layout, self._custom_edit.text().strip())
 
         layout.addRow(hotkey_group)
 
@@ -47,6 +85,120 @@ class SettingsDialog(QDialog):
         self._language_edit.setPlaceholderText("e.g. en (leave blank for auto)")
         layout.addRow("Language:", self._language_edit)
 
+        # Warmup silence sent before mic audio
+        self._warmup_combo = QComboBox()
+        self._warmup_combo.addItem("Adaptive (recommended)", "adaptive")
+        self._warmup_combo.addItem("Burst", "burst")
+        self._warmup_combo.addItem("Paced (1 s delay)", "paced")
+        self._warmup_combo.addItem("Off", "off")
+        index = self._warmup_combo.findData(self._config.get("warmup_policy", "adaptive"))
+        self._warmup_combo.setCurrentIndex(max(index, 0))
+        layout.addRow("Warmup:", self._warmup_combo)
+
+        # Voice activity detection
+        self._vad_cb = QCheckBox("Skip silence (voice activity detection)")
+        self._vad_cb.setChecked(self._config.get("vad", False))
+        layout.addRow(self._vad_cb)
+
+        self._auto_stop_spin = QSpinBox()
+        self._auto_stop_spin.setRange(0, 600)
+        self._auto_stop_spin.setSuffix(" s")
+        self._auto_stop_spin.setSpecialValueText("Never")
+        self._auto_stop_spin.setValue(int(self._config.get("vad_auto_stop", 0)))
+        self._auto_stop_spin.setEnabled(self._vad_cb.isChecked())
+        self._vad_cb.toggled.connect(self._auto_stop_spin.setEnabled)
+        layout.addRow("Stop after silence:", self._auto_stop_spin)
+
+        # Typing
+        self._pacing_combo = QComboBox()
+        self._pacing_combo.addItem("Batched", "batched")
+        self._pacing_combo.addItem("One character at a time", "per_char")
+        self._pacing_combo.addItem("As fast as possible", "burst")
+        index = self._pacing_combo.findData(self._config.get("typing_pacing", "batched"))
+        self._pacing_combo.setCurrentIndex(max(index, 0))
+        layout.addRow("Typing:", self._pacing_combo)
+
+        self._paste_spin = QSpinBox()
+        self._paste_spin.setRange(0, 100_000)
+        self._paste_spin.setSuffix(" chars")
+        self._paste_spin.setSpecialValueText("Never")
+        self._paste_spin.setValue(int(self._config.get("paste_threshold", 200)))
+        layout.addRow("Paste bursts of at least:", self._paste_spin)
+
+        self._drain_spin = QSpinBox()
+        self._drain_spin.setRange(0, 30_000)
+        self._drain_spin.setSingleStep(500)
+        self._drain_spin.setSuffix(" ms")
+        self._drain_spin.setSpecialValueText("Don't wait")
+        self._drain_spin.setValue(int(self._config.get("drain_timeout_ms", 4000)))
+        layout.addRow("After stopping, finish within:", self._drain_spin)
+
+        # Pre-roll
+        self._preroll_spin = QSpinBox()
+        self._preroll_spin.setRange(0, PREROLL_MAX_MSEC)
+        self._preroll_spin.setSingleStep(100)
+        self._preroll_spin.setSuffix(" ms")
+        self._preroll_spin.setSpecialValueText("Off")
+        self._preroll_spin.setValue(int(self._config.get("preroll_ms", 0)))
+        self._preroll_spin.setToolTip("Keeps the microphone open between dictations and includes the audio from just before the hotkey")
+        layout.addRow("Pre-roll (keeps mic open):", self._preroll_spin)
+
+        # Automatic gain
+        self._agc_cb = QCheckBox("Boost quiet microphones (automatic gain)")
+        self._agc_cb.setChecked(self._config.get("agc", False))
+        layout.addRow(self._agc_cb)
+
+        # Transcript history
+        self._history_cb = QCheckBox("Keep a searchable history of dictations")
+        self._history_cb.setChecked(self._config.get("history", True))
+        layout.addRow(self._history_cb)
+
+        # Audio archive
+        self._archive_cb = QCheckBox("Keep the audio of dictations (for replay)")
+        self._archive_cb.setChecked(self._config.get("archive_audio", False))
+        layout.addRow(self._archive_cb)
+
+        self._archive_spin = QSpinBox()
+        self._archive_spin.setRange(10, 100_000)
+        self._archive_spin.setSingleStep(100)
+        self._archive_spin.setSuffix(" MB")
+        self._archive_spin.setValue(int(self._config.get("archive_max_mb", 500)))
+        self._archive_spin.setToolTip("The oldest recordings are deleted beyond this (about 2 MB per minute)")
+        self._archive_spin.setEnabled(self._archive_cb.isChecked())
+        self._archive_cb.toggled.connect(self._archive_spin.setEnabled)
+        layout.addRow("Keep up to:", self._archive_spin)
+
+        # Local IPC server (daemon.py)
+        self._ipc_cb = QCheckBox("Let other programs receive dictation")
+        self._ipc_cb.setChecked(self._config.get("ipc_server", False))
+        self._ipc_cb.setToolTip("Streams the text to local programs and lets them start and stop dictations")
+        layout.addRow(self._ipc_cb)
+
+        # Idle release
+        self._idle_spin = QSpinBox()
+        self._idle_spin.setRange(0, 24 * 60)
+        self._idle_spin.setSuffix(" min")
+        self._idle_spin.setSpecialValueText("Never")
+        self._idle_spin.setValue(int(self._config.get("idle_release_timeout", 900)) // 60)
+        self._idle_spin.setToolTip("Frees memory and background threads between dictations; the next one starts as usual")
+        layout.addRow("Free resources when idle for:", self._idle_spin)
+
+        # Capture backlog
+        self._overflow_combo = QComboBox()
+        self._overflow_combo.addItem("Buffer to disk (recommended)", "spill")
+        self._overflow_combo.addItem("Drop the oldest audio", "drop-oldest")
+        self._overflow_combo.addItem("Drop the newest audio", "drop-newest")
+        self._overflow_combo.addItem("Pause until it catches up", "pause")
+        index = self._overflow_combo.findData(self._config.get("capture_overflow", "spill"))
+        self._overflow_combo.setCurrentIndex(max(index, 0))
+        self._overflow_combo.setToolTip("What to do with new audio when the connection can't keep up for 20 s")
+        layout.addRow("If the upload falls behind:", self._overflow_combo)
+
+        # Standby connection
+        self._standby_cb = QCheckBox("Keep a connection warmed up (faster start)")
+        self._standby_cb.setChecked(self._config.get("standby", False))
+        layout.addRow(self._standby_cb)
+
         # Start with Windows
         self._startup_cb = QCheckBox("Start with Windows")
         self._startup_cb.setChecked(self._config.get("start_with_windows", False))
@@ -60,12 +212,86 @@ class SettingsDialog(QDialog):
         buttons.rejected.connect(self.reject)
         layout.addRow(buttons)
 
+    def _add_hotkey_options(self, layout: QVBoxLayout, combo: str) -> tuple[QComboBox, QSpinBox, QComboBox]:
+        """Add a mode / debounce / repeat row for `combo`, filled in from its stored options."""
+        stored = {**HOTKEY_DEFAULTS, **self._config.get("hotkey_options", {}).get(combo, {})}
+        mode = QComboBox()
+        mode.addItem("Press to start, press to stop", "toggle")
+        mode.addItem("Hold to talk", "hold")
+        mode.setCurrentIndex(max(mode.findData(stored["mode"]), 0))
+        debounce = QSpinBox()
+        debounce.setRange(0, 5000)
+        debounce.setSingleStep(50)
+        debounce.setSuffix(" ms")
+        debounce.setValue(int(stored.get("debounce_ms", DEBOUNCE_MS[mode.currentData()])))
+        debounce.setToolTip("Ignore presses this soon after the last one")
+        repeat = QComboBox()
+        repeat.addItem("Ignore key repeat", "ignore")
+        repeat.addItem("Key repeat toggles again", "retrigger")
+        repeat.setCurrentIndex(max(repeat.findData(stored["repeat"]), 0))
+        repeat.setEnabled(mode.currentData() == "toggle")
+
+        def on_mode_changed():
+            debounce.setValue(DEBOUNCE_MS[mode.currentData()])
+            repeat.setEnabled(mode.currentData() == "toggle")
+
+        mode.currentIndexChanged.connect(on_mode_changed)
+        row = QHBoxLayout()
+        row.setContentsMargins(20, 0, 0, 0)
+        row.addWidget(mode)
+        row.addWidget(debounce)
+        row.addWidget(repeat)
+        layout.addLayout(row)
+        return mode, debounce, repeat
+
+    def _update_engine_fields(self):
+        engine = self._engine_combo.currentData()
+        self._model_edit.setEnabled(engine != "mistral")
+        self._fallback_spin.setEnabled(engine == "auto")
+
+    def _browse_model(self):
+        path = QFileDialog.getExistingDirectory(self, "Local model folder", self._model_edit.text())
+        if path:
+            self._model_edit.setText(path)
+
     def _on_ok(self):
         self._config["api_key"] = self._api_key_edit.text().strip()
+        self._config["engine"] = self._engine_combo.currentData()
+        self._config["local_model_path"] = self._model_edit.text().strip()
+        self._config["fallback_connect_ms"] = self._fallback_spin.value()
         self._config["hotkey_copilot"] = self._copilot_cb.isChecked()
         self._config["hotkey_win_h"] = self._win_h_cb.isChecked()
         self._config["hotkey_custom"] = self._custom_edit.text().strip()
+        options = dict(self._config.get("hotkey_options", {}))
+        custom = [self._config["hotkey_custom"]] if self._config["hotkey_custom"] else []
+        for combos, (mode, debounce, repeat) in (
+            (config.COPILOT_COMBOS, self._copilot_options),
+            (["Win+H"], self._win_h_options),
+            (custom, self._custom_options),
+        ):
+            for combo in combos:
+                options[combo] = {
+                    "mode": mode.currentData(),
+                    "debounce_ms": debounce.value(),
+                    "repeat": repeat.currentData(),
+                }
+        self._config["hotkey_options"] = options
         self._config["language"] = self._language_edit.text().strip()
+        self._config["warmup_policy"] = self._warmup_combo.currentData()
+        self._config["vad"] = self._vad_cb.isChecked()
+        self._config["vad_auto_stop"] = self._auto_stop_spin.value()
+        self._config["typing_pacing"] = self._pacing_combo.currentData()
+        self._config["paste_threshold"] = self._paste_spin.value()
+        self._config["standby"] = self._standby_cb.isChecked()
+        self._config["drain_timeout_ms"] = self._drain_spin.value()
+        self._config["preroll_ms"] = self._preroll_spin.value()
+        self._config["capture_overflow"] = self._overflow_combo.currentData()
+        self._config["agc"] = self._agc_cb.isChecked()
+        self._config["history"] = self._history_cb.isChecked()
+        self._config["archive_audio"] = self._archive_cb.isChecked()
+        self._config["archive_max_mb"] = self._archive_spin.value()
+        self._config["ipc_server"] = self._ipc_cb.isChecked()
+        self._config["idle_release_timeout"] = self._idle_spin.value() * 60
         new_startup = self._startup_cb.isChecked()
         if new_startup != self._config.get("start_with_windows", False):
             config.set_startup_shortcut(new_startup)
@@ -1,136 +1,328 @@
 import asyncio
-import base64
-import queue
-import threading
-import time
-from typing import AsyncIterator
 
 from PySide6.QtCore import QObject, Signal
 
-from mistralai import Mistral
-from mistralai.extra.realtime import UnknownRealtimeEvent
-from mistralai.models import (
-    AudioFormat,
-    RealtimeTranscriptionError,
-    RealtimeTranscriptionSessionCreated,
-    TranscriptionStreamDone,
-    TranscriptionStreamTextDelta,
+from audio import PcmRingBuffer
+from diagnostics import SessionTrace
+from engines import FALLBACK_CONNECT_MS, LocalEngine, MistralEngine, load_local_model, run_with_fallback
+from realtime import (
+    CONNECT_TIMEOUT,
+    FIRST_EVENT_TIMEOUT,
+    RECONNECT_ATTEMPTS,
+    STANDBY_IDLE_TIMEOUT,
+    STANDBY_RETRY_MAX,
+    WARMUP_POLICIES,
+    StandbySession,
+    get_event_loop,
+    has_event_loop,
+    new_endpoint_health,
 )
+from vad import VoiceActivityGate
 
-SAMPLE_RATE = 16_000
-WARMUP_DURATION = 2.0  # seconds of silence
-MODEL = "voxtral-mini-transcribe-realtime-2602"
-BASE_URL = "wss://api.mistral.ai"
-
-# Shared event loop
-_event_loop = None
-_loop_thread = None
-_loop_lock = threading.Lock()
-
-
-def _get_event_loop():
-    """Get or create the shared asyncio event loop running in a background thread."""
-    global _event_loop, _loop_thread
-    with _loop_lock:
-        if _event_loop is None or not _event_loop.is_running():
-            _event_loop = asyncio.new_event_loop()
-            _loop_thread = threading.Thread(target=_run_loop, daemon=True)
-            _loop_thread.start()
-            time.sleep(0.1)
-    return _event_loop
-
-
-def _run_loop():
-    asyncio.set_event_loop(_event_loop)
-    _event_loop.run_forever()
-
-
-async def _audio_stream(audio_queue: queue.Queue, is_running: callable) -> AsyncIterator[bytes]:
-    """Async generator yielding audio bytes: warmup silence then real mic data."""
-    chunk_samples = int(SAMPLE_RATE * 0.1)
-    chunk_bytes = b'\x00' * (chunk_samples * 2)  # 2 bytes per int16 sample
-    num_chunks = int(WARMUP_DURATION / 0.1)
-    for _ in range(num_chunks):
-        if not is_running():
-            return
-        yield chunk_bytes
-        await asyncio.sleep(0.05)
 
-    while is_running():
-        try:
-            b64_chunk = audio_queue.get_nowait()
-            yield base64.b64decode(b64_chunk)
-        except queue.Empty:
-            await asyncio.sleep(0.05)
+class _Session:
+    """Per-session state; a stopped session keeps draining alongside newer ones."""
+
+    def __init__(self, trace: SessionTrace | None, gate: VoiceActivityGate | None):
+        self.trace = trace
+        self.gate = gate
+        self.running = True  # False once hard-stopped
+        self.task: asyncio.Task | None = None
+        self.deadline: asyncio.TimerHandle | None = None
+        self.pending: list[str] = []  # text held back until earlier sessions are done
+        self.delivered = False
+        self.done = False
 
 
 class TranscriptionWorker(QObject):
-    """Manages a Mistral realtime transcription session."""
+    """Runs transcription sessions on the selected engine (Mistral realtime, local, or auto fallback).
+
+    Stopping a session with a drain timeout lets it finish transcribing the audio
+    already captured while a new session starts. Text is emitted in session order:
+    a newer session's text is held back until the draining one is done.
+    """
 
     text_delta = Signal(str)
     status_changed = Signal(str)
     error = Signal(str)
-    finished = Signal()
+    finished = Signal()  # any session ended
+    active_ended = Signal(object)  # the recording session's trace, when it ended without `stop`
+    session_finished = Signal(object)  # a session's trace, after all of its text was emitted
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._running = False
-        self._task = None
+        self._active: _Session | None = None
+        self._sessions: list[_Session] = []  # event loop thread only, in start order
+        # Standby state is only touched on the event loop thread.
+        self._standby: StandbySession | None = None
+        self._standby_key: str | None = None
+        self._standby_idle_timeout = STANDBY_IDLE_TIMEOUT
+        self._standby_expiry: asyncio.TimerHandle | None = None
+        self._standby_failures = 0
+        self._warmup = "adaptive"
+        self._vad_enabled = False
+        self._vad_auto_stop = 0.0
+        self._gate: VoiceActivityGate | None = None
+        self._engine = "mistral"
+        self._local_model_path = ""
+        self._fallback_after = FALLBACK_CONNECT_MS / 1000
+        self._reconnect_attempts = RECONNECT_ATTEMPTS
+        self._health = new_endpoint_health()
+        self._connect_timeout = CONNECT_TIMEOUT
+        self._first_event_timeout = FIRST_EVENT_TIMEOUT
 
     @property
     def is_running(self) -> bool:
-        return self._running
-
-    def start(self, api_key: str, audio_queue: queue.Queue):
-        """Start transcription on the shared event loop."""
-        self._running = True
-        loop = _get_event_loop()
-        self._task = asyncio.run_coroutine_threadsafe(
-            self._handle(api_key, audio_queue), loop
-        )
-
-    def stop(self):
-        """Signal the transcription to stop."""
-        self._running = False
-        if self._task is not None:
-            self._task.cancel()
-            self._task = None
-
-    async def _handle(self, api_key: str, audio_queue: queue.Queue):
+        """Whether a session is recording; sessions draining after `stop` don't count."""
+        return self._active is not None
+
+    @property
+    def idle(self) -> bool:
+        """Whether nothing runs on the event loop for this worker: no session, standby or endpoint probing."""
+        return (self._active is None and not self._sessions and self._standby is None
+                and self._standby_expiry is None and not self._health.is_open)
+
+    def set_warmup_policy(self, policy: str):
+        """Choose how warmup silence is sent before mic audio; one of WARMUP_POLICIES."""
+        if policy not in WARMUP_POLICIES:
+            raise ValueError(f"Unknown warmup policy: {policy}")
+        self._warmup = policy
+
+    def set_engine(self, engine: str, local_model_path: str = "", fallback_ms: int = FALLBACK_CONNECT_MS):
+        """Select "mistral", "local", or "auto" (Mistral, falling back to local after `fallback_ms`)."""
+        self._engine = engine
+        self._local_model_path = local_model_path
+        self._fallback_after = fallback_ms / 1000
+
+    def set_reconnect_attempts(self, attempts: int):
+        """How many times in a row a dropped realtime connection is reopened (0: never)."""
+        self._reconnect_attempts = max(0, attempts)
+
+    def set_timeouts(self, connect: float = CONNECT_TIMEOUT, first_event: float = FIRST_EVENT_TIMEOUT):
+        """Seconds allowed for the websocket handshake, and from connecting until the session is created."""
+        self._connect_timeout = connect
+        self._first_event_timeout = first_event
+
+    @property
+    def endpoint_down(self) -> bool:
+        """Whether the realtime endpoint's circuit breaker is open (dictations would fail at once)."""
+        return self._health.is_open
+
+    def endpoint_stats(self) -> dict:
+        """Recent connect latencies and failures of the realtime endpoint."""
+        return self._health.stats()
+
+    def _preload_local_model(self, path: str, trace: SessionTrace | None):
+        # Executor thread. A failed load isn't cached: LocalEngine hits the error again if it takes over.
+        try:
+            load_local_model(path)
+        except Exception as e:
+            if trace is not None:
+                trace.extra["local_model_error"] = str(e) or type(e).__name__
+
+    def set_vad(self, enabled: bool, auto_stop: float = 0.0):
+        """Gate mic audio through voice activity detection; end sessions after `auto_stop` s without speech."""
+        self._vad_enabled = enabled
+        self._vad_auto_stop = auto_stop
+
+    @property
+    def vad_stats(self) -> dict | None:
+        """Counters of the current or last session's VAD gate (bytes captured vs sent)."""
+        return self._gate.stats() if self._gate is not None else None
+
+    def start(self, api_key: str, audio_queue: PcmRingBuffer, trace: SessionTrace | None = None):
+        """Start transcription on the shared event loop, stamping progress into `trace`."""
+        self._gate = VoiceActivityGate(auto_stop=self._vad_auto_stop) if self._vad_enabled else None
+        session = _Session(trace, self._gate)
+        self._active = session
+        loop = get_event_loop()
+        if self._engine == "auto" and self._local_model_path:
+            # Load the fallback model while Mistral connects, not at startup: the event loop
+            # and the model's memory are only taken once dictation is actually used.
+            loop.call_soon_threadsafe(loop.run_in_executor, None, self._preload_local_model,
+                                      self._local_model_path, trace)
+        asyncio.run_coroutine_threadsafe(self._handle(api_key, audio_queue, session), loop)
+
+    def stop(self, drain_timeout: float = 0.0):
+        """Stop the current session.
+
+        With a `drain_timeout`, the session keeps going until the server has
+        transcribed the audio already captured (the caller closes the ring buffer
+        to end the stream), but no longer than `drain_timeout` seconds. Without
+        one it is cancelled right away.
+        """
+        session, self._active = self._active, None
+        if session is None:
+            return
+        if session.trace is not None:
+            session.trace.mark("stop")
+        get_event_loop().call_soon_threadsafe(self._drain, session, drain_timeout)
+
+    def _drain(self, session: _Session, timeout: float):
+        if session.done:
+            return
+        if timeout > 0:
+            session.deadline = asyncio.get_running_loop().call_later(timeout, self._cancel, session)
+        else:
+            self._cancel(session)
+
+    def _cancel(self, session: _Session):
+        session.running = False
+        if session.task is not None:
+            session.task.cancel()
+
+    def _deliver(self, session: _Session, text: str):
+        if not session.delivered:  # Mistral often returns leading space in first chunk
+            text = text.lstrip()
+            if not text:
+                return
+            session.delivered = True
+        session.pending.append(text)
+        self._pump()
+
+    def _pump(self):
+        """Emit held-back text of the oldest sessions, retiring those that are done."""
+        while self._sessions:
+            head = self._sessions[0]
+            pending, head.pending = head.pending, []
+            for text in pending:
+                if head.trace is not None:
+                    head.trace.text.append(text)
+                self.text_delta.emit(text)
+            if not head.done:
+                return
+            self._sessions.pop(0)
+            self.session_finished.emit(head.trace)
+
+    def _on_session_status(self, session: _Session, status: str):
+        if session is self._active:
+            self.status_changed.emit(status)
+
+    def set_standby(self, api_key: str | None, idle_timeout: float = STANDBY_IDLE_TIMEOUT):
+        """Keep one warmed-up session ready for `api_key`, or drop it when None.
+
+        The standby is closed after `idle_timeout` seconds without a dictation and
+        reopened on the next one.
+        """
+        if api_key is None and not has_event_loop():
+            return  # nothing to tear down, don't spin up the loop thread
+        loop = get_event_loop()
+        loop.call_soon_threadsafe(self._configure_standby, api_key, idle_timeout)
+
+    def _configure_standby(self, api_key: str | None, idle_timeout: float):
+        self._standby_key = api_key or None
+        self._standby_idle_timeout = idle_timeout
+        if self._standby is not None and self._standby.api_key != self._standby_key:
+            self._standby.close()
+            self._standby = None
+        self._refresh_standby()
+
+    def _refresh_standby(self):
+        """Open a standby session if enabled and none is available, and re-arm the idle timeout."""
+        loop = asyncio.get_running_loop()
+        if self._standby_expiry is not None:
+            self._standby_expiry.cancel()
+            self._standby_expiry = None
+        if self._standby_key is None:
+            return
+        if self._standby is None or not self._standby.available:
+            self._standby = StandbySession(self._standby_key, self._warmup, self._on_standby_closed)
+        self._standby_expiry = loop.call_later(self._standby_idle_timeout, self._expire_standby)
+
+    def _expire_standby(self):
+        self._standby_expiry = None
+        if self._standby is not None:
+            self._standby.close()
+            self._standby = None
+
+    def _on_standby_closed(self, standby: StandbySession):
+        """Reopen a standby the server closed, backing off if it never got a session."""
+        if standby is not self._standby or self._standby_expiry is None:
+            return
+        self._standby = None
+        self._standby_failures = 0 if standby.created else self._standby_failures + 1
+        delay = min(STANDBY_RETRY_MAX, 2 ** self._standby_failures - 1)
+        asyncio.get_running_loop().call_later(delay, self._reopen_standby)
+
+    def _reopen_standby(self):
+        if self._standby is None and self._standby_expiry is not None and self._standby_key:
+            self._standby = StandbySession(self._standby_key, self._warmup, self._on_standby_closed)
+
+    def _take_standby(self, api_key: str) -> StandbySession | None:
+        standby = self._standby
+        if standby is None or not standby.available or standby.api_key != api_key:
+            return None
+        self._standby = None
+        return standby
+
+    async def _handle(self, api_key: str, audio_queue: PcmRingBuffer, session: _Session):
         """Core transcription coroutine."""
+        session.task = asyncio.current_task()
+        self._sessions.append(session)
+        trace = session.trace
+        standby = None
         try:
-            client = Mistral(api_key=api_key, server_url=BASE_URL)
-            audio_format = AudioFormat(encoding="pcm_s16le", sample_rate=SAMPLE_RATE)
-            stream = _audio_stream(audio_queue, lambda: self._running)
-
-            self.status_changed.emit("connecting")
-
-            async for event in client.audio.realtime.transcribe_stream(
-                audio_stream=stream,
-                model=MODEL,
-                audio_format=audio_format,
-            ):
-                if not self._running:
-                    break
-
-                if isinstance(event, RealtimeTranscriptionSessionCreated):
-                    self.status_changed.emit("listening")
-                elif isinstance(event, TranscriptionStreamTextDelta):
-                    self.text_delta.emit(event.text)
-                elif isinstance(event, TranscriptionStreamDone):
-                    break
-                elif isinstance(event, RealtimeTranscriptionError):
-                    self.error.emit(str(event.error))
-                    break
-                elif isinstance(event, UnknownRealtimeEvent):
-                    continue
+            if not session.running:
+                return  # stopped before it got going
+            offline = self._engine == "auto" and self._health.is_open
+            if self._engine == "local" or offline:
+                engine = LocalEngine(self._local_model_path)
+            else:
+                standby = self._take_standby(api_key)
+                if self._standby_key is not None:
+                    self._refresh_standby()
+                engine = MistralEngine(
+                    api_key, self._warmup, standby, self._reconnect_attempts,
+                    health=self._health,
+                    connect_timeout=self._connect_timeout,
+                    first_event_timeout=self._first_event_timeout,
+                )
+            if trace is not None:
+                trace.extra["engine"] = self._engine
+                if offline:
+                    trace.extra["fallback"] = "mistral -> local (endpoint down)"
+            if offline:
+                self._on_session_status(session, "fallback")
 
+            callbacks = dict(
+                gate=session.gate,
+                trace=trace,
+                on_status=lambda status: self._on_session_status(session, status),
+                on_text=lambda text: self._deliver(session, text),
+            )
+            if self._engine == "auto" and not offline:
+                await run_with_fallback(
+                    engine, LocalEngine(self._local_model_path), self._fallback_after,
+                    audio_queue, lambda: session.running, **callbacks,
+                )
+            else:
+                await engine.run(audio_queue, lambda: session.running, **callbacks)
         except asyncio.CancelledError:
-            pass
+            if trace is not None and session.deadline is not None:
+                trace.extra["drain_timed_out"] = True
         except Exception as e:
             msg = str(e) if str(e) else type(e).__name__
             if "CancelledError" not in msg:
-                self.error.emit(msg)
+                if trace is not None:
+                    trace.extra["error"] = msg
+                if session is self._active:
+                    self.error.emit(msg)
+                # A draining session's error is reported with session_finished, through its trace.
         finally:
-            self._running = False
+            if standby is not None:
+                standby.close()
+            if session.deadline is not None:
+                session.deadline.cancel()
+            if trace is not None and session.gate is not None:
+                trace.extra["vad"] = session.gate.stats()
+            if trace is not None:
+                trace.extra["capture"] = audio_queue.stats()
+            session.running = False
+            session.done = True
+            ended = self._active is session
+            if ended:
+                self._active = None
             self.finished.emit()
+            if ended:
+                self.active_ended.emit(trace)
+            self._pump()
@@ -18,6 +18,9 @@ def _make_icon(color: str) -> QIcon:
 
 class TrayIcon(QSystemTrayIcon):
     settings_requested = Signal()
+    diagnostics_requested = Signal()
+    retype_requested = Signal()
+    history_requested = Signal()
     quit_requested = Signal()
 
     def __init__(self, hotkey: str = "", parent=None):
@@ -29,10 +32,24 @@ class TrayIcon(QSystemTrayIcon):
         self._update_tooltip(recording=False)
 
         menu = QMenu()
+        retype_action = QAction("Type last dictation again", menu)
+        retype_action.triggered.connect(self.retype_requested.emit)
+        menu.addAction(retype_action)
+
+        history_action = QAction("Search history...", menu)
+        history_action.triggered.connect(self.history_requested.emit)
+        menu.addAction(history_action)
+
+        menu.addSeparator()
+
         settings_action = QAction("Settings...", menu)
         settings_action.triggered.connect(self.settings_requested.emit)
         menu.addAction(settings_action)
 
+        diagnostics_action = QAction("Diagnostics...", menu)
+        diagnostics_action.triggered.connect(self.diagnostics_requested.emit)
+        menu.addAction(diagnostics_action)
+
         menu.addSeparator()
 
         quit_action = QAction("Quit", menu)
@@ -1,6 +1,9 @@
 import ctypes
 import ctypes.wintypes
+import queue
+import threading
 import time
+import traceback
 
 # Constants
 INPUT_KEYBOARD = 1
@@ -52,24 +55,230 @@ class INPUT(ctypes.Structure):
     ]
 
 
-_SendInput = ctypes.windll.user32.SendInput
-_SendInput.argtypes = [ctypes.c_uint, ctypes.POINTER(INPUT), ctypes.c_int]
-_SendInput.restype = ctypes.c_uint
-
-
-def type_text(text: str, char_delay: float = 0.005):
-    """Type text into the focused window using SendInput with Unicode events."""
-    for char in text:
-        code = ord(char)
-        inputs = (INPUT * 2)()
-        inputs[0].type = INPUT_KEYBOARD
-        inputs[0].ki.wVk = 0
-        inputs[0].ki.wScan = code
-        inputs[0].ki.dwFlags = KEYEVENTF_UNICODE
-        inputs[1].type = INPUT_KEYBOARD
-        inputs[1].ki.wVk = 0
-        inputs[1].ki.wScan = code
-        inputs[1].ki.dwFlags = KEYEVENTF_UNICODE | KEYEVENTF_KEYUP
-        _SendInput(2, inputs, ctypes.sizeof(INPUT))
-        if char_delay > 0:
-            time.sleep(char_delay)
+VK_CONTROL = 0x11
+VK_V = 0x56
+CF_TEXT = 1
+CF_OEMTEXT = 7
+CF_UNICODETEXT = 13
+CF_LOCALE = 16
+TEXT_FORMATS = (CF_TEXT, CF_OEMTEXT, CF_UNICODETEXT, CF_LOCALE)  # Windows synthesizes these from each other
+GMEM_MOVEABLE = 0x0002
+
+PACING_POLICIES = ("batched", "per_char", "burst")
+BATCH_CHARS = 32  # characters per SendInput call when batched
+BATCH_DELAY = 0.01  # pause between batched SendInput calls
+CHAR_DELAY = 0.005  # pause between characters in per_char mode
+PASTE_THRESHOLD = 200  # paste via clipboard when a merged batch is at least this long (0 = never)
+
+
+class SendInputBackend:
+    """Delivers keyboard INPUT arrays through user32.SendInput and pastes via the clipboard."""
+
+    def __init__(self):
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        self._send_input = user32.SendInput
+        self._send_input.argtypes = [ctypes.c_uint, ctypes.POINTER(INPUT), ctypes.c_int]
+        self._send_input.restype = ctypes.c_uint
+        self._user32 = user32
+        self._kernel32 = kernel32
+        user32.OpenClipboard.argtypes = [ctypes.wintypes.HWND]
+        user32.GetClipboardData.restype = ctypes.wintypes.HANDLE
+        user32.SetClipboardData.argtypes = [ctypes.wintypes.UINT, ctypes.wintypes.HANDLE]
+        user32.EnumClipboardFormats.argtypes = [ctypes.wintypes.UINT]
+        user32.EnumClipboardFormats.restype = ctypes.wintypes.UINT
+        kernel32.GlobalAlloc.restype = ctypes.wintypes.HGLOBAL
+        kernel32.GlobalLock.argtypes = [ctypes.wintypes.HGLOBAL]
+        kernel32.GlobalLock.restype = ctypes.c_void_p
+        kernel32.GlobalUnlock.argtypes = [ctypes.wintypes.HGLOBAL]
+
+    def send(self, inputs, count: int) -> int:
+        return self._send_input(count, inputs, ctypes.sizeof(INPUT))
+
+    def _clipboard_has_only_text(self) -> bool:
+        fmt = self._user32.EnumClipboardFormats(0)
+        while fmt:
+            if fmt not in TEXT_FORMATS:
+                return False
+            fmt = self._user32.EnumClipboardFormats(fmt)
+        return True
+
+    def _get_clipboard_text(self) -> str | None:
+        handle = self._user32.GetClipboardData(CF_UNICODETEXT)
+        if not handle:
+            return None
+        ptr = self._kernel32.GlobalLock(handle)
+        try:
+            return ctypes.wstring_at(ptr)
+        finally:
+            self._kernel32.GlobalUnlock(handle)
+
+    def _set_clipboard_text(self, text: str):
+        data = text.encode("utf-16-le") + b"\x00\x00"
+        handle = self._kernel32.GlobalAlloc(GMEM_MOVEABLE, len(data))
+        ptr = self._kernel32.GlobalLock(handle)
+        ctypes.memmove(ptr, data, len(data))
+        self._kernel32.GlobalUnlock(handle)
+        self._user32.EmptyClipboard()
+        self._user32.SetClipboardData(CF_UNICODETEXT, handle)
+
+    def paste(self, text: str):
+        """Put `text` on the clipboard, press Ctrl+V, then restore the previous clipboard text.
+
+        Raises OSError if the clipboard is busy or holds anything besides text
+        (an image, files, rich text), which restoring only the text would lose.
+        """
+        if not self._user32.OpenClipboard(None):
+            raise OSError("Clipboard is busy")
+        try:
+            if not self._clipboard_has_only_text():
+                raise OSError("Clipboard holds non-text data")
+            previous = self._get_clipboard_text()
+            self._set_clipboard_text(text)
+        finally:
+            self._user32.CloseClipboard()
+
+        keys = (INPUT * 4)()
+        for i, (vk, up) in enumerate(((VK_CONTROL, False), (VK_V, False), (VK_V, True), (VK_CONTROL, True))):
+            keys[i].type = INPUT_KEYBOARD
+            keys[i].ki.wVk = vk
+            keys[i].ki.dwFlags = KEYEVENTF_KEYUP if up else 0
+        self.send(keys, 4)
+
+        if previous is not None:
+            time.sleep(0.1)  # the target window reads the clipboard asynchronously
+            if self._user32.OpenClipboard(None):
+                try:
+                    self._set_clipboard_text(previous)
+                finally:
+                    self._user32.CloseClipboard()
+
+
+class TypingWorker:
+    """Types text into the focused window from a background thread.
+
+    Deltas queued while a batch is being typed are merged into the next one.
+    Each batch is written into a reusable INPUT array and sent with as few
+    SendInput calls as the pacing policy allows; batches of at least
+    `paste_threshold` characters are pasted through the clipboard instead.
+    """
+
+    def __init__(self, backend=None, pacing: str = "batched", paste_threshold: int = PASTE_THRESHOLD,
+                 batch_chars: int = BATCH_CHARS):
+        self._backend = backend
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._pending = 0  # deltas queued but not yet typed
+        self._idle = threading.Condition()
+        self._batch_chars = batch_chars
+        self.on_typed: callable | None = None  # called on the typing thread with each batch's length
+        # Two events (down/up) per UTF-16 code unit; room for a surrogate pair at the end.
+        self._inputs = (INPUT * (2 * batch_chars + 2))()
+        for i, inp in enumerate(self._inputs):
+            inp.type = INPUT_KEYBOARD
+            inp.ki.dwFlags = KEYEVENTF_UNICODE | (KEYEVENTF_KEYUP if i % 2 else 0)
+        self.configure(pacing, paste_threshold)
+
+    def configure(self, pacing: str, paste_threshold: int = PASTE_THRESHOLD):
+        if pacing not in PACING_POLICIES:
+            raise ValueError(f"Unknown pacing policy: {pacing}")
+        self._pacing = pacing
+        self._paste_threshold = paste_threshold
+
+    def start(self):
+        if self._thread is None:
+            if self._backend is None:
+                self._backend = SendInputBackend()
+            self._thread = threading.Thread(target=self._run, name="typing", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def type(self, text: str):
+        """Queue `text` to be typed; returns immediately."""
+        if text:
+            with self._idle:
+                self._pending += 1
+            self._queue.put(text)
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until everything queued so far has been typed."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def call_after_pending(self, callback: callable):
+        """Run `callback` on the typing thread once everything queued before it is typed."""
+        with self._idle:
+            self._pending += 1
+        self._queue.put(callback)
+
+    def _run(self):
+        held = []  # an item taken off the queue while merging that ends the batch
+        while True:
+            item = held.pop() if held else self._queue.get()
+            if item is None:
+                return
+            if callable(item):
+                try:
+                    item()
+                except Exception:
+                    traceback.print_exc()
+                self._done(1)
+                continue
+            parts = [item]
+            while True:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if not isinstance(more, str):
+                    held.append(more)
+                    break
+                parts.append(more)
+            text = "".join(parts)
+            try:
+                self._type_batch(text)
+                if self.on_typed is not None:
+                    self.on_typed(len(text))
+            except Exception:
+                traceback.print_exc()  # keep the thread alive for the next batch
+            self._done(len(parts))
+
+    def _done(self, items: int):
+        with self._idle:
+            self._pending -= items
+            self._idle.notify_all()
+
+    def _type_batch(self, text: str):
+        if self._paste_threshold and len(text) >= self._paste_threshold:
+            try:
+                self._backend.paste(text)
+                return
+            except OSError:
+                pass  # clipboard busy or holding other data; fall back to key events
+        units = text.encode("utf-16-le")
+        codes = [int.from_bytes(units[i:i + 2], "little") for i in range(0, len(units), 2)]
+        if self._pacing == "per_char":
+            step, delay = 1, CHAR_DELAY
+        elif self._pacing == "batched":
+            step, delay = self._batch_chars, BATCH_DELAY
+        else:
+            step, delay = self._batch_chars, 0.0
+        pos = 0
+        while pos < len(codes):
+            end = min(pos + step, len(codes))
+            if 0xD800 <= codes[end - 1] <= 0xDBFF and end < len(codes):
+                end += 1  # keep surrogate pairs in the same call
+            n = 0
+            for code in codes[pos:end]:
+                self._inputs[n].ki.wScan = code
+                self._inputs[n + 1].ki.wScan = code
+                n += 2
+            self._backend.send(self._inputs, n)
+            pos = end
+            if delay > 0 and pos < len(codes):
+                time.sleep(delay)
@@ -0,0 +1,99 @@
+import collections
+
+import numpy as np
+
+SAMPLE_RATE = 16_000
+CHUNK_SECONDS = 0.1
+
+
+class VoiceActivityGate:
+    """Energy / zero-crossing voice activity detector sitting between capture and the stream.
+
+    Speech chunks are forwarded as-is. After speech stops, `hangover` seconds of
+    silence still go out so the last word is not clipped; further silence is held
+    back, keeping only the last `preroll` seconds to send ahead of the next speech
+    onset. A pause therefore reaches the model as at most hangover + preroll of
+    silence. With `auto_stop` > 0, `expired` turns True after that many seconds
+    without speech.
+    """
+
+    def __init__(
+        self,
+        threshold_db: float = -45.0,
+        zcr_max: float = 0.35,
+        hangover: float = 0.3,
+        preroll: float = 0.2,
+        auto_stop: float = 0.0,
+    ):
+        self.threshold_db = threshold_db
+        self.zcr_max = zcr_max
+        self.hangover = hangover
+        self.auto_stop = auto_stop
+        self._preroll: collections.deque[bytes] = collections.deque()
+        self._preroll_bytes = int(preroll * SAMPLE_RATE) * 2
+        self._held_bytes = 0
+        # Counted in bytes: summing chunk durations in seconds drifts (10 x 0.1 < 1.0).
+        self._hangover_bytes = int(hangover * SAMPLE_RATE) * 2
+        self._auto_stop_bytes = int(auto_stop * SAMPLE_RATE) * 2
+        self._since_speech = 0  # bytes captured since the last speech chunk
+        self._hangover_left = 0  # bytes of silence still sent after speech
+        self.bytes_captured = 0
+        self.bytes_sent = 0
+        self.speech_chunks = 0
+        self.chunks = 0
+
+    @property
+    def expired(self) -> bool:
+        return self.auto_stop > 0 and self._since_speech >= self._auto_stop_bytes
+
+    def stats(self) -> dict:
+        return {
+            "bytes_captured": self.bytes_captured,
+            "bytes_sent": self.bytes_sent,
+            "speech_chunks": self.speech_chunks,
+            "chunks": self.chunks,
+        }
+
+    def is_speech(self, chunk) -> bool:
+        """Classify one chunk of PCM16 by RMS level and zero-crossing rate."""
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        if samples.size < 2:
+            return False
+        x = samples.astype(np.float32)
+        rms = np.sqrt(np.dot(x, x) / x.size)
+        db = 20.0 * np.log10(rms / 32768.0 + 1e-12)
+        if db < self.threshold_db:
+            return False
+        zcr = np.count_nonzero(np.signbit(x[1:]) != np.signbit(x[:-1])) / (x.size - 1)
+        # High ZCR at low level is hiss; loud fricatives are still speech.
+        return zcr <= self.zcr_max or db >= self.threshold_db + 15.0
+
+    def process(self, chunk) -> list:
+        """Feed one captured chunk; return the chunks to send upstream, in order."""
+        n = len(chunk)
+        self.bytes_captured += n
+        self.chunks += 1
+
+        if self.is_speech(chunk):
+            self.speech_chunks += 1
+            self._since_speech = 0
+            self._hangover_left = self._hangover_bytes
+            out = list(self._preroll)
+            out.append(chunk)
+            self._preroll.clear()
+            self._held_bytes = 0
+        else:
+            self._since_speech += n
+            if self._hangover_left > 0:
+                self._hangover_left -= n
+                out = [chunk]
+            else:
+                # Held chunks outlive the caller's buffer, so keep a copy.
+                self._preroll.append(bytes(chunk))
+                self._held_bytes += n
+                while self._held_bytes > self._preroll_bytes and self._preroll:
+                    self._held_bytes -= len(self._preroll.popleft())
+                out = []
+
+        self.bytes_sent += sum(len(c) for c in out)
+        return out
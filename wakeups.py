@@ -0,0 +1,40 @@
+import time
+
+from PySide6.QtCore import QEvent, QObject
+
+
+class TimerWakeupCounter(QObject):
+    """Counts timer events delivered on the GUI thread, split by app state.
+
+    Installed as an application-wide event filter, so it sees every QTimer,
+    animation tick and single-shot timer. `rates()` gives wakeups per minute for
+    each state ("idle", "recording") since the counter was created.
+    """
+
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self._state = "idle"
+        self._since = time.monotonic()
+        self._counts: dict[str, int] = {}
+        self._seconds: dict[str, float] = {}
+        app.installEventFilter(self)
+
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() == QEvent.Type.Timer:
+            self._counts[self._state] = self._counts.get(self._state, 0) + 1
+        return False
+
+    def set_state(self, state: str):
+        now = time.monotonic()
+        self._seconds[self._state] = self._seconds.get(self._state, 0.0) + now - self._since
+        self._state = state
+        self._since = now
+
+    def rates(self) -> dict[str, float]:
+        """Timer wakeups per minute in each state seen so far."""
+        self.set_state(self._state)  # fold in the time spent in the current state
+        return {
+            state: self._counts.get(state, 0) * 60 / seconds
+            for state, seconds in self._seconds.items()
+            if seconds > 0
+        }